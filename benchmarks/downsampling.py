@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Copyright (c) 2021, ETH Zurich, Computer Engineering Group (TEC)
+
+Benchmark of the power profiling downsampling methods of the visualization (visualization.downsampleIdx): runtime and preservation of short current spikes.
+
+Usage: python benchmarks/downsampling.py [<number of samples>] [<downsampling factor>]
+"""
+
+import sys
+import time
+import numpy as np
+
+from flocklab.visualization import downsampleIdx, downsamplingMethods
+
+###############################################################################
+
+def syntheticPower(numSamples, numSpikes=300, seed=0):
+    '''Synthetic power trace (64 kHz): noisy baseline with short (single sample) spikes (e.g. radio TX bursts).
+    '''
+    rng = np.random.default_rng(seed)
+    t = np.arange(numSamples) / 64000.
+    p = 1. + 0.05*rng.standard_normal(numSamples)
+    spikes = rng.choice(numSamples, numSpikes, replace=False)
+    p[spikes] += 20.
+    return t, p, spikes
+
+
+def envelopeError(p, idx, numWindows=1000):
+    '''Max deviation between the maximum of the original and the downsampled trace per time window.
+    '''
+    w = len(p) // numWindows
+    trueMax = p[:w*numWindows].reshape(numWindows, w).max(axis=1)
+    dsMax = np.full(numWindows, -np.inf)
+    np.maximum.at(dsMax, np.minimum(idx // w, numWindows - 1), p[idx])
+    return np.max(trueMax - dsMax)
+
+
+if __name__ == "__main__":
+    numSamples = int(float(sys.argv[1])) if len(sys.argv) > 1 else 10000000
+    factor = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    t, p, spikes = syntheticPower(numSamples)
+
+    print('samples: {:d}, factor: {:d}'.format(numSamples, factor))
+    for method in downsamplingMethods:
+        start = time.perf_counter()
+        idx = downsampleIdx(t, p, factor, method=method)
+        duration = time.perf_counter() - start
+        print('{:7s} points: {:8d}  time: {:.3f} s  spikes kept: {:5.1f} %  envelope error: {:.3f}'.format(
+            method, len(idx), duration, 100.*np.isin(spikes, idx).mean(), envelopeError(p, idx)))
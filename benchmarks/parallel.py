@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Copyright (c) 2021, ETH Zurich, Computer Engineering Group (TEC)
+
+Benchmark of the per-node data preparation of the visualization in a process pool (prepareVisualizationData processes) for a synthetic test result
+(power profiling and GPIO tracing of multiple nodes) with LTTB downsampling of the power data.
+
+Usage: python benchmarks/parallel.py [<number of nodes>] [<number of power samples per node>] [<downsampling factor>]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+from bokeh.plotting import output_file
+
+from flocklab.visualization import prepareVisualizationData, plotAll, createAbsoluteTimeFormatter
+
+###############################################################################
+
+def writeSyntheticResult(resultPath, numNodes, numSamples, numEdges=2000, seed=0):
+    '''Writes synthetic power profiling (powerprofiling.csv) and GPIO tracing data (gpiotracing.csv) in the format of a FlockLab test result.
+    '''
+    rng = np.random.default_rng(seed)
+    t = 1600000000. + np.arange(numSamples) / 64000.
+    powerList = []
+    gpioList = []
+    for nodeId in range(1, numNodes + 1):
+        i = 1. + 0.05*rng.standard_normal(numSamples)
+        i[rng.choice(numSamples, 300, replace=False)] += 20.
+        powerList.append(pd.DataFrame({'timestamp': t, 'observer_id': nodeId, 'node_id': nodeId, 'current_mA': i, 'voltage_V': 3.3}))
+        tEdges = np.sort(rng.uniform(t[0], t[-1], numEdges))
+        gpioList.append(pd.DataFrame({'timestamp': tEdges, 'observer_id': nodeId, 'node_id': nodeId, 'pin_name': 'LED1', 'value': 1 - np.arange(numEdges) % 2}))
+    pd.concat(powerList, ignore_index=True).sort_values('timestamp', kind='stable').to_csv(os.path.join(resultPath, 'powerprofiling.csv'), index=False, float_format='%.7f')
+    pd.concat(gpioList, ignore_index=True).sort_values('timestamp', kind='stable').to_csv(os.path.join(resultPath, 'gpiotracing.csv'), index=False, float_format='%.7f')
+
+
+if __name__ == "__main__":
+    numNodes = int(float(sys.argv[1])) if len(sys.argv) > 1 else 30
+    numSamples = int(float(sys.argv[2])) if len(sys.argv) > 2 else 100000
+    factor = int(float(sys.argv[3])) if len(sys.argv) > 3 else 10
+
+    print('nodes:          {:d}'.format(numNodes))
+    print('power samples:  {:d} per node'.format(numSamples))
+    print('CPUs:           {:d}'.format(os.cpu_count() or 1))
+    with tempfile.TemporaryDirectory() as tmpDir:
+        writeSyntheticResult(tmpDir, numNodes, numSamples)
+        for processes in [1, None]:
+            start = time.perf_counter()
+            gpioData, powerData, datatraceData, serialData, refTime = prepareVisualizationData(tmpDir, downsamplingFactor=factor, downsamplingMethod='lttb', processes=processes)
+            tPrepare = time.perf_counter() - start
+            output_file(os.path.join(tmpDir, 'benchmark.html'))
+            plotAll(gpioData, powerData, datatraceData, 'benchmark', createAbsoluteTimeFormatter(refTime), serialData=serialData)
+            label = 'processes={}:'.format(processes if processes is not None else os.cpu_count() or 1)
+            print('{:<15} {:.2f} s (preparation: {:.2f} s)'.format(label, time.perf_counter() - start, tPrepare))
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Copyright (c) 2021, ETH Zurich, Computer Engineering Group (TEC)
+
+Benchmark of the headless PNG rendering (raster.rasterizeTraces) against the bokeh html pipeline (plotAll + save) for synthetic GPIO and power traces of multiple nodes.
+
+Usage: python benchmarks/raster.py [<number of nodes>] [<number of power samples per node>] [<number of GPIO edges per node>]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from bokeh.plotting import output_file
+
+from flocklab.raster import rasterizeTraces, writePng
+from flocklab.visualization import prepareGpioData, plotAll, createAbsoluteTimeFormatter
+
+###############################################################################
+
+def syntheticData(numNodes, numSamples, numEdges, seed=0):
+    '''Synthetic GPIO (2 pins) and power traces (64 kHz) of multiple nodes in the format of readGpioTracing() and readPowerProfiling().
+    '''
+    rng = np.random.default_rng(seed)
+    duration = numSamples / 64000.
+    gpioList = []
+    powerList = []
+    for nodeId in range(1, numNodes + 1):
+        for pin in ['LED1', 'INT1']:
+            t = np.sort(rng.uniform(0, duration, numEdges // 2 * 2))
+            gpioList.append(pd.DataFrame({'timestamp': t, 'observer_id': nodeId, 'node_id': nodeId, 'pin_name': pin, 'value': 1 - np.arange(len(t)) % 2}))
+        i = 1. + 0.05*rng.standard_normal(numSamples)
+        i[rng.choice(numSamples, 300, replace=False)] += 20.
+        powerList.append(pd.DataFrame({'timestamp': np.arange(numSamples) / 64000., 'observer_id': nodeId, 'node_id': nodeId, 'current_mA': i, 'voltage_V': 3.3}))
+    return pd.concat(gpioList, ignore_index=True), pd.concat(powerList, ignore_index=True)
+
+
+if __name__ == "__main__":
+    numNodes = int(float(sys.argv[1])) if len(sys.argv) > 1 else 10
+    numSamples = int(float(sys.argv[2])) if len(sys.argv) > 2 else 1000000
+    numEdges = int(float(sys.argv[3])) if len(sys.argv) > 3 else 100000
+    gpioDf, powerDf = syntheticData(numNodes, numSamples, numEdges)
+
+    print('nodes:          {:d}'.format(numNodes))
+    print('power samples:  {:d} per node'.format(numSamples))
+    print('GPIO edges:     {:d} per node and pin'.format(numEdges // 2 * 2))
+    with tempfile.TemporaryDirectory() as tmpDir:
+        start = time.perf_counter()
+        writePng(os.path.join(tmpDir, 'benchmark.png'), rasterizeTraces(gpioDf=gpioDf, powerDf=powerDf))
+        print('{:<15} {:.2f} s'.format('raster (png):', time.perf_counter() - start))
+
+        start = time.perf_counter()
+        gpioData = prepareGpioData(gpioDf, 0.)
+        powerData = OrderedDict([(nodeId, {'t': grp.timestamp.to_numpy(), 'i': grp.current_mA.to_numpy(), 'v': grp.voltage_V.to_numpy()}) for nodeId, grp in powerDf.groupby('node_id')])
+        output_file(os.path.join(tmpDir, 'benchmark.html'))
+        plotAll(gpioData, powerData, OrderedDict(), 'benchmark', createAbsoluteTimeFormatter(0.))
+        print('{:<15} {:.2f} s'.format('bokeh (html):', time.perf_counter() - start))
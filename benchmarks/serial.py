@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Copyright (c) 2021, ETH Zurich, Computer Engineering Group (TEC)
+
+Benchmark of the vectorized serial log parser (traces.readSerial) against Flocklab.serial2Df for a synthetic serial log (messages with commas) of multiple nodes.
+
+Usage: python benchmarks/serial.py [<number of lines>] [<number of nodes>]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+
+from flocklab import Flocklab
+from flocklab.traces import readSerial
+
+###############################################################################
+
+def writeSyntheticSerial(resultPath, numLines, numNodes, seed=0):
+    '''Writes a synthetic serial log (serial.csv) in the format of a FlockLab test result.
+    '''
+    rng = np.random.default_rng(seed)
+    nodes = rng.integers(1, numNodes + 1, numLines)
+    df = pd.DataFrame({
+        'timestamp': np.char.mod('%.6f', 1600000000 + np.sort(rng.uniform(0, 600, numLines))),
+        'observer_id': (nodes + 100).astype(str),
+        'node_id': nodes.astype(str),
+        'direction': 'r',
+        'output': np.array(['boot ok', 'rx pkt,len=12,rssi=-80', 'tx done', 'ERR timeout, retry'])[rng.integers(0, 4, numLines)],
+    })
+    with open(os.path.join(resultPath, 'serial.csv'), 'w') as f:
+        f.write(','.join(df.columns) + '\n')
+        f.write('\n'.join((df.timestamp + ',' + df.observer_id + ',' + df.node_id + ',' + df.direction + ',' + df.output).tolist()) + '\n')
+
+
+if __name__ == "__main__":
+    numLines = int(float(sys.argv[1])) if len(sys.argv) > 1 else 1000000
+    numNodes = int(float(sys.argv[2])) if len(sys.argv) > 2 else 30
+
+    print('lines:          {:d}'.format(numLines))
+    print('nodes:          {:d}'.format(numNodes))
+    with tempfile.TemporaryDirectory() as tmpDir:
+        writeSyntheticSerial(tmpDir, numLines, numNodes)
+        start = time.perf_counter()
+        dfRef = Flocklab.serial2Df(tmpDir)
+        print('{:<15} {:.2f} s'.format('serial2Df:', time.perf_counter() - start))
+
+        start = time.perf_counter()
+        df = readSerial(tmpDir)
+        print('{:<15} {:.2f} s'.format('readSerial:', time.perf_counter() - start))
+        pd.testing.assert_frame_equal(dfRef, df)
+
+        start = time.perf_counter()
+        df = readSerial(tmpDir, regex='ERR')
+        print('{:<15} {:.2f} s ({:d} lines)'.format('regex filter:', time.perf_counter() - start, len(df)))
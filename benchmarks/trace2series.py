@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Copyright (c) 2021, ETH Zurich, Computer Engineering Group (TEC)
+
+Benchmark of the GPIO trace to plot series conversion (visualization.trace2series) against the previous (loop based) implementation.
+
+Usage: python benchmarks/trace2series.py [<number of edges>]
+"""
+
+import sys
+import time
+import numpy as np
+
+from flocklab.visualization import trace2series
+
+###############################################################################
+
+def trace2seriesLoop(t, v):
+    '''Previous (loop based) implementation of trace2series (reference).
+    '''
+    tNew = np.repeat(t, 2, axis=0)
+    vInv = [0 if e else 1 for e in v]
+    vInv[0] = 0
+    vNew = np.vstack((vInv, v)).reshape((-1,),order='F')
+    tNewNew = []
+    vNewNew = []
+    for i in range(len(tNew)-1):
+        tNewNew.append(tNew[i])
+        vNewNew.append(vNew[i])
+        if (vNew[i] == 0 and vNew[i+1] == 0):
+            tNewNew.append(tNew[i])
+            vNewNew.append(np.nan)
+    tNewNew.append(tNew[-1])
+    vNewNew.append(vNew[-1])
+    return (np.asarray(tNewNew), np.asarray(vNewNew))
+
+
+def syntheticTrace(numEdges, seed=0):
+    '''Synthetic GPIO trace: mostly toggling signal with some repeated values (e.g. caused by missed edges).
+    '''
+    rng = np.random.default_rng(seed)
+    t = np.cumsum(rng.exponential(1e-4, numEdges))
+    v = np.arange(numEdges) % 2
+    repeated = rng.random(numEdges) < 0.05
+    v[repeated] = rng.integers(0, 2, np.count_nonzero(repeated))
+    return t, v
+
+
+def timeit(func, *args):
+    start = time.perf_counter()
+    ret = func(*args)
+    return ret, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    numEdges = int(float(sys.argv[1])) if len(sys.argv) > 1 else 10000000
+    t, v = syntheticTrace(numEdges)
+
+    (tVec, vVec), durationVec = timeit(trace2series, t, v)
+    (tLoop, vLoop), durationLoop = timeit(trace2seriesLoop, t, v)
+
+    assert np.array_equal(tVec, tLoop)
+    assert np.array_equal(vVec, vLoop, equal_nan=True)
+    print('edges:       {:d}'.format(numEdges))
+    print('loop:        {:.3f} s'.format(durationLoop))
+    print('vectorized:  {:.3f} s'.format(durationVec))
+    print('speedup:     {:.1f}x'.format(durationLoop/durationVec))
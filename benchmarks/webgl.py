@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Copyright (c) 2021, ETH Zurich, Computer Engineering Group (TEC)
+
+Benchmark of the rendering backends of the visualization (canvas, WebGL): frame time while panning over large synthetic GPIO and power traces.
+Generates one html file per backend (benchmark_<backend>.html). Open the files in a browser and press "Run benchmark" (the frame time statistics are shown next to the button).
+
+Usage: python benchmarks/webgl.py [<number of nodes>] [<number of power samples per node>] [<number of GPIO edges per node>]
+"""
+
+import sys
+import time
+import numpy as np
+from collections import OrderedDict
+from bokeh.plotting import save, output_file
+from bokeh.models import Button, CustomJS, Div, Plot
+from bokeh.layouts import column, row
+
+from flocklab.visualization import plotAll, createAbsoluteTimeFormatter
+
+###############################################################################
+
+# pans over the full time range (one x range update per animation frame) and reports the time between frames
+benchmarkJs = '''
+const t0 = xRange.start;
+const t1 = xRange.end;
+const shift = 0.01*(t1 - t0);
+const times = [];
+let last = null;
+let k = 0;
+div.text = 'running...';
+function frame(ts) {
+    if (last !== null) {
+        times.push(ts - last);
+    }
+    last = ts;
+    if (k < numFrames) {
+        const offset = (k % 2 == 0) ? shift : 0;
+        xRange.setv({start: t0 + offset, end: t1 + offset});
+        k++;
+        requestAnimationFrame(frame);
+    } else {
+        xRange.setv({start: t0, end: t1});
+        times.sort(function(a, b) { return a - b; });
+        const mean = times.reduce(function(a, b) { return a + b; }, 0) / times.length;
+        div.text = 'frames: ' + times.length + ', mean: ' + mean.toFixed(1) + ' ms, median: ' + times[Math.floor(times.length/2)].toFixed(1) + ' ms, p95: ' + times[Math.floor(0.95*times.length)].toFixed(1) + ' ms';
+    }
+}
+requestAnimationFrame(frame);
+'''
+
+
+def syntheticData(numNodes, numSamples, numEdges, seed=0):
+    '''Synthetic GPIO (2 pins) and power traces (64 kHz) of multiple nodes in the format of prepareVisualizationData().
+    '''
+    rng = np.random.default_rng(seed)
+    duration = numSamples / 64000.
+    gpioData = OrderedDict()
+    powerData = OrderedDict()
+    for nodeId in range(1, numNodes + 1):
+        nodeGpio = OrderedDict()
+        for pin in ['LED1', 'INT1']:
+            t = np.sort(rng.uniform(0, duration, numEdges // 2 * 2))
+            nodeGpio[pin] = {'t': t, 'v': 1 - np.arange(len(t)) % 2}
+        gpioData[nodeId] = nodeGpio
+        t = np.arange(numSamples) / 64000.
+        i = 1. + 0.05*rng.standard_normal(numSamples)
+        i[rng.choice(numSamples, 300, replace=False)] += 20.
+        powerData[nodeId] = {'t': t, 'i': i, 'v': np.full(numSamples, 3.3)}
+    return gpioData, powerData
+
+
+if __name__ == "__main__":
+    numNodes = int(float(sys.argv[1])) if len(sys.argv) > 1 else 4
+    numSamples = int(float(sys.argv[2])) if len(sys.argv) > 2 else 1000000
+    numEdges = int(float(sys.argv[3])) if len(sys.argv) > 3 else 100000
+    gpioData, powerData = syntheticData(numNodes, numSamples, numEdges)
+
+    print('nodes:          {:d}'.format(numNodes))
+    print('power samples:  {:d} per node'.format(numSamples))
+    print('GPIO edges:     {:d} per node and pin'.format(numEdges // 2 * 2))
+    for backend in ['canvas', 'webgl']:
+        start = time.perf_counter()
+        layout = plotAll(gpioData, powerData, OrderedDict(), 'benchmark_{}'.format(backend), createAbsoluteTimeFormatter(0.), render=False, webgl=(backend == 'webgl'))
+        div = Div(text='')
+        button = Button(label='Run benchmark ({})'.format(backend))
+        xRange = list(layout.select(dict(type=Plot)))[0].x_range
+        button.js_on_click(CustomJS(args={'xRange': xRange, 'div': div, 'numFrames': 200}, code=benchmarkJs))
+        filename = 'benchmark_{}.html'.format(backend)
+        output_file(filename, title='benchmark ({})'.format(backend))
+        save(column(row(button, div), layout))
+        print('{:<15} {} (generated in {:.1f} s)'.format(backend + ':', filename, time.perf_counter() - start))
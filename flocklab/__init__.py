@@ -4,6 +4,13 @@ Copyright (c) 2021, ETH Zurich, Computer Engineering Group (TEC)
 """
 
 from ._version import __version__
-from .flocklab import Flocklab
-from .visualization import visualizeFlocklabTrace
+from .flocklab import Flocklab, ElfSymbolIndex
+from .visualization import visualizeFlocklabTrace, serveFlocklabTrace
+from .pyramid import PowerPyramid, PyramidStore, buildPyramidStore, loadPyramidStore, getPyramidStorePath
+from .power import readPowerProfiling, readPowerRld, readPowerCsv, intervalEnergy, powerSummary
+from .gpio import gpioEdges, gpioPulses, gpioPeriods, gpioStats, gpioLatency, gpioLatencyStats, gpioEnergy, GpioStateTimeline, gpioPinMask, gpioStatePins, gpioWindow
+from .traces import readGpioTracing, readDatatrace, readSerial, parseSerialCsv, readDatatraceVariables, splitDatatrace, mapDatatraceVariables, TraceIndex, ResultIndex, readResults, getResultStartTime
+from .raster import rasterizeTraces, rasterizeFlocklabTrace, rasterizeResults, writePng
+from .csvindex import CsvBlockIndex, readCsvWindow
+from .cache import VisualizationCache, getCachePath
 from .xmlconfig import FlocklabXmlConfig, GeneralConf, TargetConf, SerialConf, GpioTracingConf, GpioActuationConf, PowerProfilingConf, EmbeddedImageConf, DebugConf
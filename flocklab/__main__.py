@@ -18,11 +18,30 @@ import pandas as pd
 import appdirs
 
 from ._version import __version__
-from .visualization import visualizeFlocklabTrace
+from .visualization import visualizeFlocklabTrace, serveFlocklabTrace, downsamplingMethods
 from .flocklab import Flocklab
+from .power import powerSummary
+from .pyramid import loadPyramidStore
+from .raster import rasterizeResults
 
 
 ################################################################################
+def parseNodeList(nodeStr):
+    '''Parses a comma separated list of node IDs and ranges of node IDs (e.g. '1,3,5-8').
+    '''
+    nodes = []
+    try:
+        for part in nodeStr.split(','):
+            if '-' in part:
+                first, last = part.split('-')
+                nodes.extend(range(int(first), int(last) + 1))
+            else:
+                nodes.append(int(part))
+    except ValueError:
+        raise argparse.ArgumentTypeError('invalid node list "{}"'.format(nodeStr))
+    return nodes
+
+
 def main():
     description = '''FlockLab CLI
     Default config file location: {}
@@ -38,7 +57,24 @@ def main():
     parser.add_argument('-p', '--platforms', help='get a list of the available platforms', action='store_true', default=False)
     parser.add_argument('-x', '--visualize', metavar='<result directory>', help='Visualize FlockLab result data', type=str, nargs='?') # default unfortunately does not work properly together with nargs
     parser.add_argument('-s', '--downsampling', metavar='<factor>', help='downsampling factor for power profiling data in visualization', type=int, default=1)
+    parser.add_argument('-m', '--downsamplingmethod', metavar='<method>', help='downsampling method for power profiling data in visualization (stride, minmax, lttb)', type=str, choices=downsamplingMethods, default='stride')
+    parser.add_argument('-b', '--maxpoints', metavar='<number>', help='maximum number of plotted samples in visualization (power profiling, GPIO and datatrace data is downsampled per node accordingly, e.g. 2e6)', type=float)
+    parser.add_argument('-t', '--start', metavar='<time>', help='start of time window in visualization (seconds since start of test, UNIX timestamp or date/time, e.g. "2021-11-30 12:00:05")', type=str)
+    parser.add_argument('-T', '--end', metavar='<time>', help='end of time window in visualization (same format as --start)', type=str)
+    parser.add_argument('-n', '--nodes', metavar='<node list>', help='nodes to include in visualization (e.g. 1,3,5-8)', type=parseNodeList)
+    parser.add_argument('-f', '--serialfilter', metavar='<regex>', help='only plot serial log lines matching the regular expression in visualization', type=str)
+    parser.add_argument('-C', '--compact', help='compact data representation in visualization html file (float32 arrays, derived values computed in browser)', action='store_true', default=False)
+    parser.add_argument('-D', '--sidecar', help='write visualization data to a compressed sidecar file (<html file>.data.js) instead of embedding it into the html file', action='store_true', default=False)
+    parser.add_argument('-w', '--webgl', help='render visualization with WebGL (faster for large traces)', action='store_true', default=False)
+    parser.add_argument('-O', '--overview', help='show overview heatmap of all nodes in visualization (click on a cell to open the detailed view of a node)', action='store_true', default=False)
+    parser.add_argument('-k', '--cache', help='cache loaded and prepared visualization data in the result directory (faster re-rendering with other display options)', action='store_true', default=False)
+    parser.add_argument('-W', '--processes', metavar='<number>', help='number of worker processes for the data preparation in visualization and for rendering PNG images (default: number of CPUs, 1: no process pool)', type=int)
+    parser.add_argument('-S', '--server', help='serve visualization with a bokeh server (resolution of power profiling data adapts to visible time window)', action='store_true', default=False)
+    parser.add_argument('-P', '--pyramid', help='use multi-resolution pyramid store next to the result directory (built if necessary) for server visualization and (approximate) power statistics', action='store_true', default=False)
+    parser.add_argument('-r', '--raster', metavar='<result directory>', help='Render FlockLab result data to a PNG image without browser (multiple result directories with glob pattern, e.g. "results/*", rendered in parallel)', type=str)
     parser.add_argument('-y', '--develop', help='Enable develop output (incl. develop signals (nRST, PPS) in visualization)', action='store_true', default=False)
+    parser.add_argument('-e', '--powersummary', metavar='<result directory>', help='Print power statistics (energy, current, voltage) per node of FlockLab result data', type=str)
+    parser.add_argument('-j', '--json', metavar='<output file>', help='write output of power statistics as JSON to file', type=str)
     parser.add_argument('-V', '--version', help='Print version number', action='store_true', default=False)
 
 
@@ -62,8 +98,30 @@ def main():
         ret = fl.getObsIds(args.observers)
     elif args.platforms:
         ret = fl.getPlatforms()
+    elif args.visualize is not None and args.server and (args.start is not None or args.end is not None or args.nodes is not None):
+        ret = 'ERROR: Time window and node selection are not supported in server mode!'
+    elif args.visualize is not None and args.server:
+        serveFlocklabTrace(resultPath=args.visualize, showPps=args.develop, showRst=args.develop, usePyramidStore=args.pyramid, webgl=args.webgl, overview=args.overview, serialRegex=args.serialfilter, processes=args.processes, cache=args.cache)
     elif args.visualize is not None:
-        visualizeFlocklabTrace(resultPath=args.visualize, interactive=True, showPps=args.develop, showRst=args.develop, downsamplingFactor=args.downsampling)
+        visualizeFlocklabTrace(resultPath=args.visualize, interactive=True, showPps=args.develop, showRst=args.develop, downsamplingFactor=args.downsampling, downsamplingMethod=args.downsamplingmethod, maxPoints=int(args.maxpoints) if args.maxpoints is not None else None, compact=args.compact, sidecar=args.sidecar, webgl=args.webgl, start=args.start, end=args.end, nodes=args.nodes, overview=args.overview, serialRegex=args.serialfilter, processes=args.processes, cache=args.cache)
+    elif args.raster is not None:
+        pngFiles, errors = rasterizeResults(args.raster, processes=args.processes, showPps=args.develop, showRst=args.develop, errorReport=True)
+        ret = '\n'.join(pngFiles + ['ERROR: {}: {}'.format(resultPath, error.splitlines()[0]) for resultPath, error in errors.items()])
+        if not pngFiles and not errors:
+            ret = 'ERROR: No FlockLab result directory found!'
+    elif args.powersummary is not None:
+        if args.pyramid:
+            summaryDf = loadPyramidStore(args.powersummary).powerSummary()
+            summaryDf = summaryDf if len(summaryDf) > 0 else None
+        else:
+            summaryDf = powerSummary(args.powersummary)
+        if summaryDf is None:
+            ret = 'ERROR: No power profiling data available!'
+        elif args.json is not None:
+            summaryDf.to_json(args.json, orient='records', indent=2)
+        else:
+            with pd.option_context('display.max_columns', None, 'display.width', None):
+                ret = summaryDf.to_string(index=False)
     elif args.version:
         ret = __version__
     else:
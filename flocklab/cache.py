@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Copyright (c) 2021, ETH Zurich, Computer Engineering Group (TEC)
+"""
+
+import numpy as np
+import pandas as pd
+import os
+import glob
+import json
+import hashlib
+from collections import OrderedDict
+
+from .power import getRldFiles
+
+###############################################################################
+
+# files of a FlockLab result directory the visualization data is computed from (incl. testconfig.xml for the datatrace variable names)
+cacheSourceFiles = ['gpiotracing.csv', 'powerprofiling.csv', 'datatrace.csv', 'serial.csv', 'testconfig.xml']
+# max number of cached entries per kind (oldest entries are removed)
+CACHE_MAX_ENTRIES = 4
+CACHE_VERSION = 1
+
+
+def getCachePath(resultPath):
+    '''Location of the visualization cache of a FlockLab result (hidden directory in the result directory).
+    '''
+    return os.path.join(resultPath, '.visualization_cache')
+
+
+def _flattenTree(tree, arrays):
+    '''Converts a tree of (ordered) dicts, pandas dataframes, numpy arrays and scalars into a json serializable layout and a dict of numpy arrays (see _unflattenTree()).
+    Arrays of strings are stored as a single utf-8 encoded byte array (strings joined with line breaks), i.e. without pickle.
+    '''
+    if tree is None:
+        return {'type': 'none'}
+    if isinstance(tree, dict):
+        items = [(key.item() if isinstance(key, np.generic) else key, val) for key, val in tree.items()]
+        return {'type': 'dict', 'items': [[key, type(key).__name__, _flattenTree(val, arrays)] for key, val in items]}
+    if isinstance(tree, pd.DataFrame):
+        return {'type': 'df', 'columns': [[col, _flattenTree(tree[col].to_numpy(), arrays)] for col in tree.columns]}
+    if isinstance(tree, (int, float, str, np.integer, np.floating)):
+        return {'type': 'scalar', 'value': tree.item() if isinstance(tree, np.generic) else tree}
+    arr = np.asarray(tree)
+    name = 'a{}'.format(len(arrays))
+    if arr.dtype.kind == 'O' and not all([isinstance(e, str) for e in arr.tolist()]):
+        # e.g. numbers stored as objects
+        arr = np.array(arr.tolist())
+    if arr.dtype.kind in 'OUS':
+        strings = [str(e) for e in arr.tolist()]
+        if not any(['\n' in e for e in strings]):
+            arrays[name] = np.frombuffer('\n'.join(strings).encode('utf-8', errors='surrogatepass'), dtype=np.uint8)
+            return {'type': 'strings', 'name': name, 'length': len(strings)}
+        arr = np.array(strings, dtype=str)
+    arrays[name] = arr
+    return {'type': 'array', 'name': name}
+
+
+def _unflattenTree(layout, arrays):
+    '''Restores a tree from its layout and arrays (see _flattenTree()).
+    '''
+    kind = layout['type']
+    if kind == 'none':
+        return None
+    if kind == 'dict':
+        return OrderedDict([(int(key) if keyType == 'int' else key, _unflattenTree(val, arrays)) for key, keyType, val in layout['items']])
+    if kind == 'df':
+        return pd.DataFrame(OrderedDict([(col, _unflattenTree(val, arrays)) for col, val in layout['columns']]))
+    if kind == 'scalar':
+        return layout['value']
+    if kind == 'strings':
+        if layout['length'] == 0:
+            return np.array([], dtype=object)
+        return np.array(arrays[layout['name']].tobytes().decode('utf-8', errors='surrogatepass').split('\n'), dtype=object)
+    return arrays[layout['name']]
+
+
+class VisualizationCache():
+    '''Cache of the data of the visualization of a FlockLab test result (compact binary format: one uncompressed .npz file per entry, no pickle).
+    Entries are identified by a kind (e.g. 'traces' for the loaded trace dataframes, 'prepared' for the plot data) and a dict of parameters. The key of an entry
+    additionally contains the size and modification time of the result files (see cacheSourceFiles), i.e. entries are invalidated if the result files change.
+    If the cache directory cannot be written (e.g. read-only result directory), nothing is cached.
+    '''
+    def __init__(self, resultPath, cachePath=None, maxEntries=CACHE_MAX_ENTRIES):
+        '''
+        Args:
+            resultPath: path to the flocklab results (unzipped)
+            cachePath:  cache directory (default: see getCachePath())
+            maxEntries: max number of entries per kind
+        '''
+        self.resultPath = resultPath
+        self.cachePath = cachePath if cachePath is not None else getCachePath(resultPath)
+        self.maxEntries = maxEntries
+        files = [os.path.join(resultPath, e) for e in cacheSourceFiles] + [e[0] for e in getRldFiles(resultPath)]
+        self.sourceStamp = [[os.path.basename(f), os.stat(f).st_size, os.stat(f).st_mtime_ns] for f in files if os.path.isfile(f)]
+
+    def key(self, params):
+        '''Key of an entry (hash of the parameters, the stamp of the result files and the cache version).
+        '''
+        keyStr = json.dumps([CACHE_VERSION, self.sourceStamp, params], sort_keys=True, default=str)
+        return hashlib.sha1(keyStr.encode('utf-8')).hexdigest()
+
+    def _entryFile(self, kind, params):
+        return os.path.join(self.cachePath, '{}_{}.npz'.format(kind, self.key(params)))
+
+    def load(self, kind, params):
+        '''Load an entry.
+        Args:
+            kind:   kind of the entry
+            params: dict of parameters (json serializable)
+        Returns:
+            cached data (tree of dicts, dataframes and arrays, see save()), None if the entry does not exist or cannot be read
+        '''
+        entryFile = self._entryFile(kind, params)
+        if not os.path.isfile(entryFile):
+            return None
+        try:
+            with np.load(entryFile, allow_pickle=False) as cached:
+                arrays = {name: cached[name] for name in cached.files}
+            # recently used entries are kept when old entries are removed
+            os.utime(entryFile)
+            return _unflattenTree(json.loads(arrays.pop('layout').tobytes().decode('utf-8')), arrays)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self, kind, params, data):
+        '''Store an entry (the oldest entries of the same kind are removed if there are more than maxEntries).
+        Args:
+            kind:   kind of the entry
+            params: dict of parameters (json serializable)
+            data:   tree of (ordered) dicts, pandas dataframes, numpy arrays, scalars and None
+        Returns:
+            True if the entry has been stored
+        '''
+        arrays = OrderedDict()
+        layout = _flattenTree(data, arrays)
+        arrays['layout'] = np.frombuffer(json.dumps(layout).encode('utf-8'), dtype=np.uint8)
+        entryFile = self._entryFile(kind, params)
+        tmpFile = entryFile + '.tmp.npz'
+        try:
+            os.makedirs(self.cachePath, exist_ok=True)
+            np.savez(tmpFile, **arrays)
+            os.replace(tmpFile, entryFile)
+            entries = sorted(glob.glob(os.path.join(self.cachePath, '{}_*.npz'.format(kind))), key=os.path.getmtime)
+            for oldFile in entries[:max(0, len(entries) - self.maxEntries)]:
+                os.remove(oldFile)
+        except OSError:
+            return False
+        return True
+
+
+###############################################################################
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Copyright (c) 2021, ETH Zurich, Computer Engineering Group (TEC)
+"""
+
+import numpy as np
+import pandas as pd
+import os
+import io
+
+from .flocklab import FlocklabError
+
+###############################################################################
+
+# size (in bytes) of the blocks of lines of a csv file described by one entry of the block index
+CSV_INDEX_BLOCK_SIZE = 2**20
+# timestamps of the index are parsed with reduced precision, time windows are extended by this margin (in s) when selecting blocks
+CSV_INDEX_TIME_MARGIN = 1e-3
+CSV_INDEX_VERSION = 1
+
+
+def getCsvIndexPath(csvFile):
+    '''Location of the cached block index of a csv file (hidden file next to the csv file).
+    '''
+    return os.path.join(os.path.dirname(csvFile), '.{}.index.npz'.format(os.path.basename(csvFile)))
+
+
+class CsvBlockIndex():
+    '''Sparse index of a FlockLab trace csv file (columns timestamp and node_id required): byte range, number of lines, time range and node IDs per block of lines.
+    Time windows and node subsets are read by parsing only the blocks which overlap with them (no requirements on the order of the lines in the file).
+    The index is built with a single pass over the file (parsing timestamp and node_id only) and cached next to the csv file (see getCsvIndexPath()).
+    Optionally, the index additionally contains the position of the last line per node and value of a state column (e.g. pin_name of GPIO traces) for each block,
+    i.e. the state of the signals at the start of a time window can be determined without parsing the blocks before the window (see lastLines()).
+    '''
+    def __init__(self, csvFile, blockSize=CSV_INDEX_BLOCK_SIZE, useCache=True, stateKey=None, parser=None):
+        '''
+        Args:
+            csvFile:   path to the csv file
+            blockSize: approximate size of the blocks in bytes
+            useCache:  load the index from / store the index to the cache file (if the cache file cannot be written, the index is not cached)
+            stateKey:  column which identifies a signal per node (e.g. pin_name), the last line per node and signal is stored for each block (default: none)
+            parser:    function which parses the content of the file (bytes incl. header) into a pandas dataframe, for files which cannot be parsed with pandas.read_csv()
+                       (e.g. parseSerialCsv() for serial logs, default: pandas.read_csv())
+        '''
+        self.csvFile = csvFile
+        self.parser = parser
+        stat = os.stat(csvFile)
+        fileStamp = np.array([CSV_INDEX_VERSION, stat.st_size, stat.st_mtime_ns, blockSize], dtype=np.int64)
+        indexPath = getCsvIndexPath(csvFile)
+        if useCache and os.path.isfile(indexPath):
+            try:
+                with np.load(indexPath) as cached:
+                    cachedStateKey = cached['stateKey'].tobytes().decode('utf-8') if 'stateKey' in cached.files else None
+                    if np.array_equal(cached['fileStamp'], fileStamp) and (stateKey is None or stateKey == cachedStateKey):
+                        self._setIndex(cached['header'].tobytes(), cached['offsets'], cached['rows'], cached['tMin'], cached['tMax'], cached['nodes'], cached['nodeOffsets'])
+                        if cachedStateKey is not None:
+                            self._setStates(cachedStateKey, cached['stateTimes'], cached['stateNodes'], cached['stateValues'], cached['stateLines'], cached['stateOffsets'])
+                        return
+            except (OSError, ValueError, KeyError):
+                pass
+        self._build(blockSize, stateKey)
+        if useCache:
+            arrays = dict(fileStamp=fileStamp, header=np.frombuffer(self.header, dtype=np.uint8), offsets=self.offsets, rows=self.rows,
+                          tMin=self.tMin, tMax=self.tMax, nodes=self.nodes, nodeOffsets=self.nodeOffsets)
+            if self.stateKey is not None:
+                arrays.update(stateKey=np.frombuffer(self.stateKey.encode('utf-8'), dtype=np.uint8), stateTimes=self.stateTimes, stateNodes=self.stateNodes,
+                              stateValues=self.stateValues, stateLines=self.stateLines, stateOffsets=self.stateOffsets)
+            try:
+                np.savez(indexPath, **arrays)
+            except OSError:
+                pass
+
+    def _setIndex(self, header, offsets, rows, tMin, tMax, nodes, nodeOffsets):
+        self.header = header
+        self.offsets = offsets          # byte offsets of blocks (incl. end of last block)
+        self.rows = rows                # number of lines per block
+        self.tMin = tMin                # min timestamp per block
+        self.tMax = tMax                # max timestamp per block
+        self.nodes = nodes              # node IDs of all blocks (nodes of block k: nodes[nodeOffsets[k]:nodeOffsets[k+1]])
+        self.nodeOffsets = nodeOffsets
+        self.stateKey = None
+
+    def _setStates(self, stateKey, stateTimes, stateNodes, stateValues, stateLines, stateOffsets):
+        self.stateKey = stateKey
+        self.stateTimes = stateTimes    # timestamp of the last line per node and state key value of all blocks (entries of block k: stateOffsets[k]:stateOffsets[k+1])
+        self.stateNodes = stateNodes    # node ID
+        self.stateValues = stateValues  # value of the state key column (as string)
+        self.stateLines = stateLines    # byte offset of the line
+        self.stateOffsets = stateOffsets
+
+    @staticmethod
+    def _lineStarts(data):
+        '''Byte offsets of the non-empty lines of a block (same lines as parsed by pandas).
+        '''
+        buf = np.frombuffer(data, dtype=np.uint8)
+        lineEnds = np.flatnonzero(buf == ord('\n'))
+        if len(buf) > 0 and buf[-1] != ord('\n'):
+            lineEnds = np.append(lineEnds, len(buf))
+        lineStarts = np.concatenate(([0], lineEnds[:-1] + 1)).astype(np.int64)
+        lineLengths = lineEnds - lineStarts
+        # lines which only contain a carriage return are empty as well
+        carriageReturn = np.zeros(len(lineStarts), dtype=bool)
+        hasChar = lineLengths > 0
+        carriageReturn[hasChar] = buf[lineStarts[hasChar]] == ord('\r')
+        return lineStarts[(lineLengths > 0) & ~(carriageReturn & (lineLengths == 1))]
+
+    def _build(self, blockSize, stateKey=None):
+        offsets = []
+        rows = []
+        tMin = []
+        tMax = []
+        nodes = []
+        nodeOffsets = [0]
+        states = []
+        stateOffsets = [0]
+        with open(self.csvFile, 'rb') as f:
+            header = f.readline()
+            offset = len(header)
+            headerCols = header.decode('utf-8', errors='replace').strip().split(',')
+            if not 'timestamp' in headerCols or not 'node_id' in headerCols:
+                raise FlocklabError('ERROR: Required column (timestamp, node_id) in {} file is missing.'.format(os.path.basename(self.csvFile)))
+            if stateKey is not None and not stateKey in headerCols:
+                raise FlocklabError('ERROR: Required column ({}) in {} file is missing.'.format(stateKey, os.path.basename(self.csvFile)))
+            while True:
+                data = f.read(blockSize)
+                if not data:
+                    break
+                # extend block to the end of the line
+                if not data.endswith(b'\n'):
+                    data += f.readline()
+                usecols = ['timestamp', 'node_id'] if stateKey is None else ['timestamp', 'node_id', stateKey]
+                if self.parser is None:
+                    df = pd.read_csv(io.BytesIO(header + data), usecols=usecols, dtype=None if stateKey is None else {stateKey: str})
+                else:
+                    df = self.parser(header + data)[usecols]
+                if len(df) > 0:
+                    ts = df.timestamp.to_numpy()
+                    blockNodes = np.unique(df.node_id.to_numpy())
+                    offsets.append(offset)
+                    rows.append(len(df))
+                    tMin.append(ts.min())
+                    tMax.append(ts.max())
+                    nodes.append(blockNodes)
+                    nodeOffsets.append(nodeOffsets[-1] + len(blockNodes))
+                    if stateKey is not None:
+                        lineStarts = self._lineStarts(data)
+                        if len(lineStarts) != len(df):
+                            raise FlocklabError('ERROR: {} file has wrong format (lines cannot be indexed)!'.format(os.path.basename(self.csvFile)))
+                        # last line per node and state key value (in time, lines with the same timestamp in file order)
+                        last = df.assign(line=offset + lineStarts).sort_values('timestamp', kind='stable').groupby(['node_id', stateKey], sort=False).tail(1)
+                        states.append(last)
+                        stateOffsets.append(stateOffsets[-1] + len(last))
+                offset += len(data)
+        offsets.append(offset)
+        self._setIndex(
+            header,
+            np.asarray(offsets, dtype=np.int64),
+            np.asarray(rows, dtype=np.int64),
+            np.asarray(tMin, dtype=float),
+            np.asarray(tMax, dtype=float),
+            np.concatenate(nodes).astype(np.int64) if nodes else np.array([], dtype=np.int64),
+            np.asarray(nodeOffsets, dtype=np.int64),
+        )
+        if stateKey is not None:
+            states = pd.concat(states, ignore_index=True) if states else pd.DataFrame({'timestamp': [], 'node_id': [], stateKey: [], 'line': []})
+            self._setStates(
+                stateKey,
+                states.timestamp.to_numpy(dtype=float),
+                states.node_id.to_numpy(dtype=np.int64),
+                states[stateKey].to_numpy(dtype=str),
+                states.line.to_numpy(dtype=np.int64),
+                np.asarray(stateOffsets, dtype=np.int64),
+            )
+
+    def numBlocks(self):
+        return len(self.rows)
+
+    def selectBlocks(self, tStart=None, tEnd=None, nodes=None):
+        '''Blocks which (possibly) contain lines within the time window and of the selected nodes.
+        Returns:
+            boolean numpy array (one element per block)
+        '''
+        sel = np.ones(self.numBlocks(), dtype=bool)
+        if tStart is not None:
+            sel &= self.tMax >= tStart - CSV_INDEX_TIME_MARGIN
+        if tEnd is not None:
+            sel &= self.tMin <= tEnd + CSV_INDEX_TIME_MARGIN
+        if nodes is not None and self.numBlocks() > 0:
+            if len(self.nodes) == 0:
+                return np.zeros(self.numBlocks(), dtype=bool)
+            nodeMatch = np.isin(self.nodes, np.asarray(list(nodes), dtype=np.int64)).astype(np.int64)
+            # number of matching nodes per block (cumulative sum over the node lists of the blocks)
+            matchCount = np.diff(np.concatenate(([0], np.cumsum(nodeMatch)))[self.nodeOffsets])
+            sel &= matchCount > 0
+        return sel
+
+    def lastLines(self, tStart, nodes=None):
+        '''Last lines per node and state key value (see stateKey) of the blocks which end before tStart, i.e. of the blocks which are not parsed when reading
+        the time window starting at tStart. Together with the lines of the parsed blocks, they determine the state of all signals at tStart.
+        Args:
+            tStart: start of time window (absolute time in s)
+            nodes:  list of node IDs (default: all nodes)
+        Returns:
+            pandas dataframe (all columns, candidates for the last line: the index timestamps have reduced precision, lines with a timestamp close to the last one
+            are included as well)
+        '''
+        if self.stateKey is None:
+            raise FlocklabError('ERROR: Block index of {} does not contain signal states!'.format(os.path.basename(self.csvFile)))
+        before = np.flatnonzero(self.tMax < tStart - CSV_INDEX_TIME_MARGIN)
+        entryIdx = np.concatenate([np.arange(self.stateOffsets[k], self.stateOffsets[k+1]) for k in before]) if len(before) > 0 else np.array([], dtype=np.int64)
+        if nodes is not None:
+            entryIdx = entryIdx[np.isin(self.stateNodes[entryIdx], np.asarray(list(nodes), dtype=np.int64))]
+        if len(entryIdx) == 0:
+            return pd.read_csv(io.BytesIO(self.header))
+        entries = pd.DataFrame({'t': self.stateTimes[entryIdx], 'node': self.stateNodes[entryIdx], 'key': self.stateValues[entryIdx], 'line': self.stateLines[entryIdx]})
+        tLast = entries.groupby(['node', 'key'], sort=False).t.transform('max').to_numpy()
+        lines = np.sort(entries.line.to_numpy()[entries.t.to_numpy() >= tLast - CSV_INDEX_TIME_MARGIN])
+        data = []
+        with open(self.csvFile, 'rb') as f:
+            for line in lines:
+                f.seek(line)
+                data.append(f.readline().rstrip(b'\r\n') + b'\n')
+        # instruct pandas with float_precision to not sacrifice accuracy for the sake of speed
+        return pd.read_csv(io.BytesIO(self.header + b''.join(data)), float_precision='round_trip')
+
+    def startTime(self):
+        '''First timestamp of the file (full precision), None if the file is empty.
+        '''
+        if self.numBlocks() == 0:
+            return None
+        candidates = self.tMin <= self.tMin.min() + CSV_INDEX_TIME_MARGIN
+        return min([chunk.timestamp.min() for chunk in self.iterChunks(blocks=candidates, usecols=['timestamp'])])
+
+    def iterBlockData(self, tStart=None, tEnd=None, nodes=None, chunkSize=None, blocks=None):
+        '''Iterate over the content of the blocks overlapping with the time window / node subset (consecutive blocks are read at once), without parsing.
+        Args:
+            see iterChunks()
+        Returns:
+            Generator of bytes (complete lines, without header)
+        '''
+        sel = self.selectBlocks(tStart, tEnd, nodes) if blocks is None else blocks
+        selIdx = np.flatnonzero(sel)
+        if len(selIdx) == 0:
+            return
+        # group consecutive selected blocks into ranges (limited to chunkSize lines)
+        ranges = []
+        rangeStart = selIdx[0]
+        rangeRows = 0
+        for k, blockIdx in enumerate(selIdx):
+            if k > 0 and (blockIdx != selIdx[k-1] + 1 or (chunkSize is not None and rangeRows + self.rows[blockIdx] > chunkSize)):
+                ranges.append((rangeStart, selIdx[k-1] + 1))
+                rangeStart = blockIdx
+                rangeRows = 0
+            rangeRows += self.rows[blockIdx]
+        ranges.append((rangeStart, selIdx[-1] + 1))
+
+        with open(self.csvFile, 'rb') as f:
+            for firstBlock, lastBlock in ranges:
+                f.seek(self.offsets[firstBlock])
+                yield f.read(self.offsets[lastBlock] - self.offsets[firstBlock])
+
+    def iterChunks(self, tStart=None, tEnd=None, nodes=None, chunkSize=None, blocks=None, usecols=None):
+        '''Iterate over the blocks overlapping with the time window / node subset (consecutive blocks are parsed at once). Lines are not filtered, i.e. the returned
+        chunks can contain lines outside of the time window and of other nodes.
+        Args:
+            tStart:    start of time window (absolute time in s, default: start of file)
+            tEnd:      end of time window (absolute time in s, default: end of file)
+            nodes:     list of node IDs (default: all nodes)
+            chunkSize: approximate max number of lines parsed at once (default: no limit)
+            blocks:    boolean array of selected blocks (overrides tStart, tEnd and nodes)
+            usecols:   columns to parse (default: all)
+        Returns:
+            Generator of pandas dataframes
+        '''
+        for data in self.iterBlockData(tStart=tStart, tEnd=tEnd, nodes=nodes, chunkSize=chunkSize, blocks=blocks):
+            if self.parser is not None:
+                df = self.parser(self.header + data)
+                yield df[usecols] if usecols is not None else df
+            else:
+                # instruct pandas with float_precision to not sacrifice accuracy for the sake of speed
+                yield pd.read_csv(io.BytesIO(self.header + data), float_precision='round_trip', usecols=usecols)
+
+
+def readCsvWindow(csvFile, tStart=None, tEnd=None, nodes=None, stateKey=None):
+    '''Read the lines of a trace csv file within a time window and of a node subset (only the blocks overlapping with them are parsed, see CsvBlockIndex).
+    Args:
+        csvFile:  path to the csv file
+        tStart:   start of time window (absolute time in s, default: start of file)
+        tEnd:     end of time window (absolute time in s, default: end of file)
+        nodes:    list of node IDs (default: all nodes)
+        stateKey: column which identifies a signal per node (e.g. pin_name): the last line before tStart per node and signal is included as well (state at tStart),
+                  determined with the block index without parsing the blocks before the time window (default: no lines before tStart)
+    Returns:
+        pandas dataframe
+    '''
+    index = CsvBlockIndex(csvFile, stateKey=stateKey)
+    keepState = stateKey is not None and tStart is not None
+    chunkList = []
+    if keepState:
+        stateLines = index.lastLines(tStart, nodes=nodes)
+        if len(stateLines) > 0:
+            chunkList.append(stateLines)
+    for chunk in index.iterChunks(tStart=tStart, tEnd=tEnd, nodes=nodes):
+        mask = np.ones(len(chunk), dtype=bool)
+        if tStart is not None and not keepState:
+            mask &= chunk.timestamp.to_numpy() >= tStart
+        if tEnd is not None:
+            mask &= chunk.timestamp.to_numpy() <= tEnd
+        if nodes is not None:
+            mask &= np.isin(chunk.node_id.to_numpy(), list(nodes))
+        chunkList.append(chunk[mask])
+    if not chunkList:
+        # empty dataframe with the columns of the file
+        return pd.read_csv(io.BytesIO(index.header))
+    df = pd.concat(chunkList, ignore_index=True)
+    if keepState:
+        # lines before the time window: only the last line per node and signal
+        ts = df.timestamp.to_numpy()
+        last = df[ts < tStart].sort_values('timestamp', kind='stable').groupby(['node_id', stateKey], sort=False).tail(1)
+        df = pd.concat([last, df[ts >= tStart]], ignore_index=True)
+    return df
+
+
+###############################################################################
+
+if __name__ == "__main__":
+    pass
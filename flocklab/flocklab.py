@@ -38,6 +38,122 @@ class FlocklabError(Exception):
         self.message = message
 
 
+class ElfSymbolIndex():
+    '''Index of the symbol table (.symtab) and of the loadable segments (address to file offset mapping) of an ELF file.
+    The ELF file is parsed once, symbols are then looked up in a dict. Use ElfSymbolIndex.fromFile() to reuse the index of an unchanged file (cached by path and modification time).
+    '''
+    # cached indexes: absolute path -> (file stamp, index)
+    _cache = {}
+
+    def __init__(self, elfPath):
+        '''
+        Args:
+            elfPath: Path to the elf file
+        '''
+        self.elfPath = elfPath
+        with open(elfPath, 'rb') as f:
+            elf = ELFFile(f)
+            # byte order of symbol values (struct format prefix)
+            self.byteOrder = '<' if elf.little_endian else '>'
+            symtab = elf.get_section_by_name('.symtab')
+            if not symtab:
+                raise Exception('ELF file does not contain a symbol table!')
+            # symbol name -> list of (address, size)
+            self.symbols = {}
+            for sym in symtab.iter_symbols():
+                if sym.name:
+                    self.symbols.setdefault(sym.name, []).append((sym['st_value'], sym['st_size']))
+            # loadable segments as list of (start address, size in file, file offset)
+            self.segments = [(seg['p_vaddr'], seg['p_filesz'], seg['p_offset']) for seg in elf.iter_segments() if seg['p_type'] == 'PT_LOAD']
+
+    @staticmethod
+    def _fileStamp(elfPath):
+        st = os.stat(elfPath)
+        return (st.st_mtime_ns, st.st_size)
+
+    @classmethod
+    def fromFile(cls, elfPath):
+        '''Get the index of an ELF file (the file is only parsed if it has not been indexed before or if it has been modified since).
+        Args:
+            elfPath: Path to the elf file
+        Returns:
+            ElfSymbolIndex object
+        '''
+        key = os.path.abspath(elfPath)
+        stamp = cls._fileStamp(elfPath)
+        cached = cls._cache.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        index = cls(elfPath)
+        cls._cache[key] = (stamp, index)
+        return index
+
+    def _symbol(self, symbName):
+        symList = self.symbols.get(symbName)
+        if not symList:
+            raise Exception('Symbol "{}" not found!'.format(symbName))
+        return symList
+
+    def address(self, symbName):
+        '''Get the address of a symbol (the symbol needs to be unique).
+        '''
+        symList = self._symbol(symbName)
+        if len(symList) > 1:
+            raise Exception('Found multiple entries for Symbol "{}"!'.format(symbName))
+        return symList[0][0]
+
+    def fileOffsetAndSize(self, symbName):
+        '''Get the file offset (in bytes) and the size of a symbol (first entry if the symbol is not unique).
+        Returns:
+            Tuple (file offset, size)
+        '''
+        symbAddr, symbSize = self._symbol(symbName)[0]
+        # first loadable segment which contains the address in the file (see ELFFile.address_offsets())
+        for segAddr, segSize, segOffset in self.segments:
+            if symbAddr >= segAddr and symbAddr + 1 <= segAddr + segSize:
+                return symbAddr - segAddr + segOffset, symbSize
+        raise Exception('Could not determine file offset!')
+
+    def _structFormat(self, symbSize, signed):
+        fmt = Flocklab.structSizeMap(symbSize)
+        return self.byteOrder + (fmt.lower() if signed else fmt)
+
+    def read(self, symbNames, signed=False):
+        '''Read the values of multiple symbols (file is opened once).
+        Args:
+            symbNames: List of symbol names
+            signed:    If True, the symbols are assumed to be signed integers, otherwise unsigned integers (default: False)
+        Returns:
+            OrderedDict mapping symbol name to value
+        '''
+        locations = [(symbName, self.fileOffsetAndSize(symbName)) for symbName in symbNames]
+        values = OrderedDict()
+        with open(self.elfPath, 'rb') as f:
+            for symbName, (fileOffset, symbSize) in locations:
+                f.seek(fileOffset)
+                values[symbName] = struct.unpack(self._structFormat(symbSize, signed), f.read(symbSize))[0]
+        return values
+
+    def write(self, symbValues, signed=False):
+        '''Replace the values of multiple symbols (file is opened once, all symbols are checked before anything is written).
+        Args:
+            symbValues: Dict mapping symbol name to replacement value (int)
+            signed:     If True, the symbols are assumed to be signed integers, otherwise unsigned integers (default: False)
+        '''
+        patches = []
+        for symbName, symbReplace in symbValues.items():
+            fileOffset, symbSize = self.fileOffsetAndSize(symbName)
+            patches.append((fileOffset, struct.pack(self._structFormat(symbSize, signed), symbReplace)))
+        with open(self.elfPath, 'rb+') as f:
+            for fileOffset, replaceBytes in patches:
+                f.seek(fileOffset)
+                f.write(replaceBytes)
+        # the symbol table and the segments are not changed by writing symbol values -> index remains valid for the modified file
+        key = os.path.abspath(self.elfPath)
+        if key in ElfSymbolIndex._cache and ElfSymbolIndex._cache[key][1] is self:
+            ElfSymbolIndex._cache[key] = (self._fileStamp(self.elfPath), self)
+
+
 class Flocklab:
     def __init__(self, apiBaseAddr=None):
         if apiBaseAddr is None:
@@ -520,18 +636,7 @@ class Flocklab:
         Returns:
             Address
         '''
-        with open(elfPath, 'rb') as f:
-            elf = ELFFile(f)
-            symtab = elf.get_section_by_name('.symtab')
-            if not symtab:
-                raise Exception('ELF file does not contain a symbol table!')
-            sym = symtab.get_symbol_by_name(varname)
-
-            if sym is None or len(sym) == 0:
-                raise Exception('Symbol "{}" not found!'.format(symbName))
-            elif len(sym) > 1:
-                raise Exception('Found multiple entries for Symbol "{}"!'.format(symbName))
-            return sym[0]['st_value']
+        return ElfSymbolIndex.fromFile(elfPath).address(symbName)
 
     @staticmethod
     def getSymbolFileOffsetAndSize(elfPath, symbName):
@@ -542,32 +647,7 @@ class Flocklab:
         Returns:
             File offset (in bytes)
         '''
-        fileOffset = None
-        symbSize = None
-
-        with open(elfPath, 'rb') as f:
-            elf = ELFFile(f)
-
-            # read symbol table
-            symtab = elf.get_section_by_name('.symtab')
-            if not symtab:
-                raise Exception('ELF file does not contain a symbol table!')
-
-            # get symbol & symbol size
-            symList = symtab.get_symbol_by_name(symbName)
-            if not symList:
-                raise Exception('Symbol "{}" not found!'.format(symbName))
-            sym = symList[0]
-            symbAddr = sym['st_value']
-            symbSize = sym['st_size']
-
-            # get file offset
-            fileOffset = next(elf.address_offsets(symbAddr), None)
-
-            if not fileOffset:
-                raise Exception('Could not determine file offset!')
-
-        return fileOffset, symbSize
+        return ElfSymbolIndex.fromFile(elfPath).fileOffsetAndSize(symbName)
 
     @staticmethod
     def readSymbolValue(elfPath, symbName, signed=False):
@@ -579,18 +659,19 @@ class Flocklab:
         Returns:
             Value of symbol
         '''
-        value = None
+        return ElfSymbolIndex.fromFile(elfPath).read([symbName], signed=signed)[symbName]
 
-        with open(elfPath, 'rb') as f:
-            elf = ELFFile(f)
-            fileOffset, symbSize = Flocklab.getSymbolFileOffsetAndSize(elfPath, symbName)
-            elf.stream.seek(fileOffset)
-            if signed:
-                value = struct.unpack(Flocklab.structSizeMap(symbSize).lower(), elf.stream.read(symbSize))[0]
-            else:
-                value = struct.unpack(Flocklab.structSizeMap(symbSize), elf.stream.read(symbSize))[0]
-
-        return value
+    @staticmethod
+    def readSymbolValues(elfPath, symbNames, signed=False):
+        '''Read the values of multiple symbols from elf file elfPath (symbol table is parsed and file is opened once).
+        Args:
+            elfPath:   Path to the elf file
+            symbNames: List of symbol names
+            signed:    If True, the symbols are assumed to be signed integers, otherwise unsigned integers (default: False)
+        Returns:
+            OrderedDict mapping symbol name to value
+        '''
+        return ElfSymbolIndex.fromFile(elfPath).read(symbNames, signed=signed)
 
     @staticmethod
     def writeSymbolValue(elfPath, symbName, symbReplace, signed=False):
@@ -601,16 +682,17 @@ class Flocklab:
             symbReplace:    Replacement value (int)
             signed:         If True, the symbol is assumed to be a signed integer, otherwise the symbol is assumed to be an unsigned integer (default: False)
         '''
-        symbFileOffset, symbSize = Flocklab.getSymbolFileOffsetAndSize(elfPath, symbName)
+        ElfSymbolIndex.fromFile(elfPath).write({symbName: symbReplace}, signed=signed)
 
-        with open(elfPath, 'rb+') as f:
-            f.seek(symbFileOffset)
-            if signed:
-                replaceBytes = struct.pack(Flocklab.structSizeMap(symbSize).lower(), symbReplace)
-            else:
-                replaceBytes = struct.pack(Flocklab.structSizeMap(symbSize), symbReplace)
-            f.write(replaceBytes)
-            f.close()
+    @staticmethod
+    def writeSymbolValues(elfPath, symbValues, signed=False):
+        '''Replaces the values of multiple symbols in ELF file elfPath (symbol table is parsed and file is opened once).
+        Args:
+            elfPath:    Path to the elf file in which the symbols will be replaced
+            symbValues: Dict mapping symbol name to replacement value (int)
+            signed:     If True, the symbols are assumed to be signed integers, otherwise unsigned integers (default: False)
+        '''
+        ElfSymbolIndex.fromFile(elfPath).write(symbValues, signed=signed)
 
 
 ################################################################################
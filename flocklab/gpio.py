@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+"""
+Copyright (c) 2021, ETH Zurich, Computer Engineering Group (TEC)
+"""
+
+import numpy as np
+import pandas as pd
+import warnings
+
+from .flocklab import FlocklabError
+from .power import DEFAULT_CHUNK_SIZE, iterNodePowerChunks, intervalEnergy
+from .traces import readGpioTracing
+
+###############################################################################
+
+# all GPIO pins traced by FlockLab (order used for plotting)
+pinOrdering = ['INT1', 'INT2', 'LED1', 'LED2', 'LED3', 'SIG1', 'SIG2', 'PPS', 'nRST']
+
+
+def getGpioEndTime(gpioDf, tMax=None):
+    '''Determine the end of the GPIO trace (used for closing signals which end with 1).
+    The end of the trace is marked by the last falling edge of the nRST signal. If the trace does not contain such an edge, the last timestamp of the trace is used.
+    Args:
+        gpioDf: GPIO trace as pandas dataframe (see readGpioTracing())
+        tMax:   end of the time window the trace is limited to (used instead of the last timestamp, see gpioWindow())
+    Returns:
+        end time (same time base as the timestamp column), None if the trace is empty
+    '''
+    if len(gpioDf) == 0:
+        return tMax
+    rstLow = (gpioDf.pin_name.to_numpy() == 'nRST') & (gpioDf.value.to_numpy() == 0)
+    if rstLow.any():
+        tEnd = gpioDf.timestamp.to_numpy()[rstLow].max()
+        return tEnd if tMax is None else min(tEnd, tMax)
+    return gpioDf.timestamp.to_numpy().max() if tMax is None else tMax
+
+
+def gpioWindow(gpioDf, tStart=None, tEnd=None):
+    '''Limit a GPIO trace to a time window. The state of the signals at the start of the window is preserved, i.e. signals which are HIGH at tStart
+    get a rising edge at tStart (the trace needs to contain the data before the window for this).
+    Args:
+        gpioDf: GPIO trace as pandas dataframe (see readGpioTracing())
+        tStart: start of time window (default: start of trace)
+        tEnd:   end of time window (default: end of trace)
+    Returns:
+        GPIO trace as pandas dataframe
+    '''
+    ts = gpioDf.timestamp.to_numpy()
+    inWindow = np.ones(len(gpioDf), dtype=bool)
+    if tEnd is not None:
+        inWindow &= ts <= tEnd
+    if tStart is None:
+        return gpioDf[inWindow]
+    before = gpioDf[ts < tStart]
+    last = before.sort_values('timestamp', kind='stable').groupby(['node_id', 'pin_name'], sort=False).tail(1)
+    high = last[last.value.to_numpy() == 1].copy()
+    high['timestamp'] = tStart
+    return pd.concat([high, gpioDf[inWindow & (ts >= tStart)]], ignore_index=True)
+
+
+def gpioPinCodes(pinNames):
+    '''Converts pin names to their index in pinOrdering.
+    Args:
+        pinNames: array-like of pin names
+    Returns:
+        numpy array of pin indices (int8)
+    '''
+    codes = pd.Categorical(pinNames, categories=pinOrdering).codes
+    if (codes < 0).any():
+        raise FlocklabError('ERROR: GPIO tracing file contains unknown pin names!')
+    return codes
+
+
+def _pinNames(codes):
+    return pd.Categorical.from_codes(codes, categories=pinOrdering)
+
+
+def _gpioTransitions(gpioDf):
+    '''Sorts the GPIO trace by node, pin and time (single pass for all nodes and pins) and extracts the signal transitions.
+    The initial state of all signals is assumed to be 0 (same as in the visualization), i.e. repeated values are not considered as edges.
+    Returns:
+        dict with arrays of the transitions (node, pin, t, v, group) and of the groups (groupNode, groupPin, groupFirstT)
+    '''
+    nodes = gpioDf.node_id.to_numpy()
+    pins = gpioPinCodes(gpioDf.pin_name)
+    t = gpioDf.timestamp.to_numpy()
+    v = gpioDf.value.to_numpy()
+    order = np.lexsort((t, pins, nodes))
+    nodes, pins, t, v = nodes[order], pins[order], t[order], v[order]
+
+    newGroup = np.ones(len(t), dtype=bool)
+    newGroup[1:] = (nodes[1:] != nodes[:-1]) | (pins[1:] != pins[:-1])
+    group = np.cumsum(newGroup) - 1
+
+    prevV = np.empty_like(v)
+    prevV[1:] = v[:-1]
+    prevV[newGroup] = 0
+    isEdge = (v != prevV)
+
+    return {
+        'node': nodes[isEdge],
+        'pin': pins[isEdge],
+        't': t[isEdge],
+        'v': v[isEdge],
+        'group': group[isEdge],
+        'groupNode': nodes[newGroup],
+        'groupPin': pins[newGroup],
+        'groupFirstT': t[newGroup],
+    }
+
+
+def gpioEdges(gpioDf):
+    '''Extract all edges of all GPIO signals.
+    Args:
+        gpioDf: GPIO trace as pandas dataframe (see readGpioTracing())
+    Returns:
+        pandas dataframe with columns node_id, pin_name, timestamp, value (1: rising edge, 0: falling edge), sorted by node, pin and time
+    '''
+    tr = _gpioTransitions(gpioDf)
+    return pd.DataFrame({
+        'node_id': tr['node'],
+        'pin_name': _pinNames(tr['pin']),
+        'timestamp': tr['t'],
+        'value': tr['v'],
+    })
+
+
+def _pulses(tr, level, tEnd):
+    '''Pulses (start, end) of all signals for the given level. Transitions within a group alternate (starting with a rising edge), therefore the end of a pulse is the next transition of the same group.
+    '''
+    startIdx = np.flatnonzero(tr['v'] == level)
+    nextIdx = np.minimum(startIdx + 1, len(tr['t']) - 1)
+    closed = (startIdx + 1 < len(tr['t'])) & (tr['group'][nextIdx] == tr['group'][startIdx])
+    start = tr['t'][startIdx]
+    end = np.where(closed, tr['t'][nextIdx], np.nan)
+    if level == 1 and tEnd is not None:
+        # close pulses of signals which end with 1 at the end of the trace
+        end = np.where(~closed & (start <= tEnd), tEnd, end)
+    return startIdx, start, end
+
+
+def gpioPulses(gpioDf, level=1, tEnd=None, closeAtEnd=True):
+    '''Extract all pulses (HIGH or LOW phases) of all GPIO signals.
+    Args:
+        gpioDf:     GPIO trace as pandas dataframe (see readGpioTracing())
+        level:      1 for HIGH pulses (rising to falling edge), 0 for LOW pulses (falling to rising edge)
+        tEnd:       end of the trace used to close HIGH pulses at the end of the trace (default: see getGpioEndTime())
+        closeAtEnd: if False, HIGH pulses which are not terminated by a falling edge have end/duration NaN
+    Returns:
+        pandas dataframe with columns node_id, pin_name, start, end, duration
+    '''
+    if closeAtEnd and tEnd is None:
+        tEnd = getGpioEndTime(gpioDf)
+    tr = _gpioTransitions(gpioDf)
+    idx, start, end = _pulses(tr, level, tEnd if closeAtEnd else None)
+    if level == 0:
+        # LOW phase after the last falling edge is not a pulse
+        valid = ~np.isnan(end)
+        idx, start, end = idx[valid], start[valid], end[valid]
+    return pd.DataFrame({
+        'node_id': tr['node'][idx],
+        'pin_name': _pinNames(tr['pin'][idx]),
+        'start': start,
+        'end': end,
+        'duration': end - start,
+    })
+
+
+def gpioPeriods(gpioDf):
+    '''Extract the periods (time between consecutive rising edges) of all GPIO signals.
+    Args:
+        gpioDf: GPIO trace as pandas dataframe (see readGpioTracing())
+    Returns:
+        pandas dataframe with columns node_id, pin_name, timestamp (rising edge), period (time to next rising edge)
+    '''
+    tr = _gpioTransitions(gpioDf)
+    risingIdx = np.flatnonzero(tr['v'] == 1)
+    sameGroup = tr['group'][risingIdx[1:]] == tr['group'][risingIdx[:-1]]
+    idx = risingIdx[:-1][sameGroup]
+    return pd.DataFrame({
+        'node_id': tr['node'][idx],
+        'pin_name': _pinNames(tr['pin'][idx]),
+        'timestamp': tr['t'][idx],
+        'period': tr['t'][risingIdx[1:][sameGroup]] - tr['t'][idx],
+    })
+
+
+def gpioStats(gpioDf, tEnd=None):
+    '''Compute edge and pulse statistics per node and pin of a GPIO trace.
+    HIGH pulses which are not terminated by a falling edge are closed at the end of the trace (same as in the visualization).
+    The duty cycle is the accumulated HIGH time divided by the time between the first sample of a signal and the end of the trace.
+    Args:
+        gpioDf: GPIO trace as pandas dataframe (see readGpioTracing())
+        tEnd:   end of the trace (default: see getGpioEndTime())
+    Returns:
+        pandas dataframe with one row per (node_id, pin_name)
+    '''
+    if tEnd is None:
+        tEnd = getGpioEndTime(gpioDf)
+    tr = _gpioTransitions(gpioDf)
+    numGroups = len(tr['groupNode'])
+    group = tr['group']
+    rising = (tr['v'] == 1)
+
+    stats = pd.DataFrame({
+        'node_id': tr['groupNode'],
+        'pin_name': _pinNames(tr['groupPin']),
+        'rising_edges': np.bincount(group[rising], minlength=numGroups),
+        'falling_edges': np.bincount(group[~rising], minlength=numGroups),
+        'first_edge': np.nan,
+        'last_edge': np.nan,
+    })
+    if len(group):
+        firstIdx = np.flatnonzero(np.concatenate(([True], group[1:] != group[:-1])))
+        lastIdx = np.append(firstIdx[1:], len(group)) - 1
+        stats.loc[group[firstIdx], 'first_edge'] = tr['t'][firstIdx]
+        stats.loc[group[lastIdx], 'last_edge'] = tr['t'][lastIdx]
+
+    for level, name in [(1, 'high'), (0, 'low')]:
+        idx, start, end = _pulses(tr, level, tEnd)
+        duration = end - start
+        valid = ~np.isnan(duration)
+        pulses = pd.DataFrame({'group': group[idx][valid], 'duration': duration[valid]})
+        agg = pulses.groupby('group').duration.agg(['count', 'sum', 'mean', 'min', 'max'])
+        agg = agg.reindex(np.arange(numGroups))
+        stats['{}_count'.format(name)] = agg['count'].fillna(0).astype(int).to_numpy()
+        stats['{}_time'.format(name)] = agg['sum'].fillna(0.).to_numpy()
+        stats['{}_mean'.format(name)] = agg['mean'].to_numpy()
+        stats['{}_min'.format(name)] = agg['min'].to_numpy()
+        stats['{}_max'.format(name)] = agg['max'].to_numpy()
+
+    risingIdx = np.flatnonzero(rising)
+    sameGroup = group[risingIdx[1:]] == group[risingIdx[:-1]]
+    periods = pd.DataFrame({
+        'group': group[risingIdx[:-1][sameGroup]],
+        'period': tr['t'][risingIdx[1:][sameGroup]] - tr['t'][risingIdx[:-1][sameGroup]],
+    })
+    agg = periods.groupby('group').period.agg(['mean', 'min', 'max']).reindex(np.arange(numGroups))
+    stats['period_mean'] = agg['mean'].to_numpy()
+    stats['period_min'] = agg['min'].to_numpy()
+    stats['period_max'] = agg['max'].to_numpy()
+
+    if tEnd is not None:
+        span = tEnd - tr['groupFirstT']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            stats['duty_cycle'] = np.where(span > 0, stats['high_time'].to_numpy() / span, np.nan)
+    else:
+        stats['duty_cycle'] = np.nan
+
+    return stats
+
+
+def gpioPinMask(pins):
+    '''Bitmask of a list of pins as used in the packed GPIO states (bit i corresponds to pinOrdering[i]).
+    Args:
+        pins: pin name or list of pin names
+    Returns:
+        bitmask (int)
+    '''
+    if type(pins) == str:
+        pins = [pins]
+    return int(np.bitwise_or.reduce(np.left_shift(1, gpioPinCodes(pins).astype(np.uint16)), initial=0))
+
+
+def gpioStatePins(state):
+    '''Decodes a packed GPIO state into the list of pins which are HIGH.
+    Args:
+        state: packed GPIO state (see GpioStateTimeline)
+    Returns:
+        list of pin names
+    '''
+    return [pin for i, pin in enumerate(pinOrdering) if int(state) & (1 << i)]
+
+
+class GpioStateTimeline():
+    '''Combined state of all GPIO pins per node.
+    The edges of all pins of a node are merged into a single sorted timeline of packed states (uint16, bit i corresponds to pinOrdering[i]).
+    The state of all pins at arbitrary times is then determined with a single binary search (searchsorted) instead of one lookup per pin.
+    Before the first edge all pins are assumed to be 0 (same as in the visualization).
+    '''
+    def __init__(self, gpioDf, tEnd=None):
+        '''
+        Args:
+            gpioDf: GPIO trace as pandas dataframe (see readGpioTracing())
+            tEnd:   end of the trace, used as end of the last interval (default: see getGpioEndTime())
+        '''
+        self.tEnd = getGpioEndTime(gpioDf) if tEnd is None else tEnd
+        tr = _gpioTransitions(gpioDf)
+        # transitions of a pin alternate between rising and falling edges -> state is the cumulative sum of the signed pin bits
+        bit = np.left_shift(1, tr['pin'].astype(np.int64))
+        delta = np.where(tr['v'] == 1, bit, -bit)
+        order = np.lexsort((tr['t'], tr['node']))
+        nodes, t, delta = tr['node'][order], tr['t'][order], delta[order]
+        cs = np.cumsum(delta)
+
+        nodeStart = np.ones(len(t), dtype=bool)
+        nodeStart[1:] = nodes[1:] != nodes[:-1]
+        starts = np.flatnonzero(nodeStart)
+        counts = np.diff(np.append(starts, len(t)))
+        state = cs - np.repeat(cs[starts] - delta[starts], counts)
+
+        # simultaneous edges of multiple pins: only keep the resulting state
+        last = np.ones(len(t), dtype=bool)
+        last[:-1] = (nodes[1:] != nodes[:-1]) | (t[1:] != t[:-1])
+        self._nodes = nodes[last]
+        self.t = t[last]
+        self.state = state[last].astype(np.uint16)
+
+        starts = np.flatnonzero(np.concatenate(([True], self._nodes[1:] != self._nodes[:-1]))) if len(self._nodes) else np.array([], dtype=int)
+        ends = np.append(starts[1:], len(self._nodes))
+        self._nodeRanges = dict(zip(self._nodes[starts].tolist(), zip(starts.tolist(), ends.tolist())))
+
+    def nodes(self):
+        '''Returns sorted list of node IDs contained in the trace.
+        '''
+        return sorted(self._nodeRanges.keys())
+
+    def timeline(self, nodeId):
+        '''Get the state timeline of a node.
+        Args:
+            nodeId: node ID
+        Returns:
+            Tuple (t, state) of numpy arrays, state[i] is valid from t[i] to t[i+1]
+        '''
+        start, stop = self._nodeRanges.get(nodeId, (0, 0))
+        return self.t[start:stop], self.state[start:stop]
+
+    def stateAt(self, nodeId, t):
+        '''Get the packed state of all pins of a node at the given time(s).
+        Args:
+            nodeId: node ID
+            t:      time or array of times
+        Returns:
+            packed state(s) (uint16, bit i corresponds to pinOrdering[i])
+        '''
+        tNode, stateNode = self.timeline(nodeId)
+        # prepend initial state 0 (valid before the first edge)
+        stateNode = np.concatenate(([0], stateNode)).astype(np.uint16)
+        ret = stateNode[np.searchsorted(tNode, t, side='right')]
+        return ret if np.ndim(t) else int(ret)
+
+    def pinAt(self, nodeId, pin, t):
+        '''Get the level of a single pin of a node at the given time(s).
+        Args:
+            nodeId: node ID
+            pin:    pin name
+            t:      time or array of times
+        Returns:
+            level(s) of the pin (0 or 1)
+        '''
+        return (self.stateAt(nodeId, t) & gpioPinMask(pin)) != 0
+
+    def intervals(self, nodeId, mask=None, t0=None, t1=None):
+        '''Get the intervals of constant state of a node.
+        Args:
+            nodeId: node ID
+            mask:   only consider the pins in this bitmask (see gpioPinMask()), adjacent intervals with identical masked state are merged (default: all pins)
+            t0:     start of time window (default: first edge of the node)
+            t1:     end of time window (default: end of the trace)
+        Returns:
+            pandas dataframe with columns start, end, duration, state
+        '''
+        t, state = self.timeline(nodeId)
+        if mask is not None:
+            state = state & np.uint16(mask)
+        t1 = self.tEnd if t1 is None else t1
+        if t0 is not None:
+            # interval containing t0 starts at t0 (initial state 0 before the first edge)
+            i0 = np.searchsorted(t, t0, side='right')
+            t = np.concatenate(([t0], t[i0:]))
+            state = np.concatenate(([state[i0 - 1] if i0 > 0 else 0], state[i0:])).astype(np.uint16)
+        if t1 is not None:
+            i1 = np.searchsorted(t, t1, side='left')
+            t, state = t[:i1], state[:i1]
+        change = np.ones(len(state), dtype=bool)
+        change[1:] = state[1:] != state[:-1]
+        start, state = t[change], state[change]
+        end = np.append(start[1:], np.nan if t1 is None else t1)
+        return pd.DataFrame({
+            'start': start,
+            'end': end,
+            'duration': end - start,
+            'state': state,
+        })
+
+    def iterIntervals(self, nodeId, mask=None, t0=None, t1=None):
+        '''Iterate over the intervals of constant state of a node (see intervals()).
+        Returns:
+            generator of tuples (start, end, state)
+        '''
+        df = self.intervals(nodeId, mask=mask, t0=t0, t1=t1)
+        return zip(df.start.tolist(), df.end.tolist(), df.state.tolist())
+
+
+def gpioLatency(gpioDf, pin='INT1', initiator=None, receiverPin=None, edge='rising', tolerance=1e-3, direction='forward', receivers=None):
+    '''Measure the latency of a signal propagating across nodes (e.g. floods), i.e. match each reference edge with the closest edge on every receiver node.
+    Reference events are either all edges of the initiator node (initiator provided), or clusters of edges of all nodes (initiator None) where edges
+    which are less than tolerance apart belong to the same event and the first edge of a cluster is the reference.
+    Edges are matched with a sorted join (pandas.merge_asof) of all events with all receiver nodes at once.
+    Args:
+        gpioDf:      GPIO trace as pandas dataframe (see readGpioTracing())
+        pin:         pin of the reference edges
+        initiator:   node ID of the initiator (default: None, see above)
+        receiverPin: pin of the edges on the receiver nodes (default: same as pin)
+        edge:        'rising', 'falling' or 'both'
+        tolerance:   maximum time (in s) between reference edge and receiver edge
+        direction:   'forward' (receiver edge at or after reference edge), 'backward' or 'nearest' (see pandas.merge_asof)
+        receivers:   list of receiver node IDs (default: all nodes with edges on receiverPin)
+    Returns:
+        pandas dataframe (latency matrix) with one row per event (index: reference time) and one column per receiver node (NaN if no matching edge)
+    '''
+    if receiverPin is None:
+        receiverPin = pin
+    if not edge in ['rising', 'falling', 'both']:
+        raise FlocklabError('ERROR: Unknown edge type "{}"!'.format(edge))
+
+    edges = gpioEdges(gpioDf[gpioDf.pin_name.isin([pin, receiverPin])])
+    if edge != 'both':
+        edges = edges[edges.value.to_numpy() == (1 if edge == 'rising' else 0)]
+    refEdges = edges[edges.pin_name == pin]
+    rxEdges = edges[edges.pin_name == receiverPin]
+    if receivers is None:
+        receivers = sorted(rxEdges.node_id.unique().tolist())
+    rxEdges = rxEdges[rxEdges.node_id.isin(receivers)]
+
+    if initiator is not None:
+        events = np.sort(refEdges.timestamp.to_numpy()[refEdges.node_id.to_numpy() == initiator])
+    else:
+        t = np.sort(refEdges.timestamp.to_numpy())
+        eventStart = np.ones(len(t), dtype=bool)
+        eventStart[1:] = np.diff(t) > tolerance
+        events = t[eventStart]
+
+    # all (event, receiver) pairs are joined with the receiver edges in a single sorted join
+    left = pd.DataFrame({
+        'event': np.repeat(events, len(receivers)),
+        'node_id': np.tile(np.asarray(receivers, dtype=rxEdges.node_id.dtype), len(events)),
+    })
+    right = pd.DataFrame({
+        'node_id': rxEdges.node_id.to_numpy(),
+        'rx': rxEdges.timestamp.to_numpy(),
+    }).sort_values('rx', kind='mergesort')
+    matched = pd.merge_asof(
+        left.sort_values('event', kind='mergesort'),
+        right,
+        left_on='event',
+        right_on='rx',
+        by='node_id',
+        tolerance=tolerance,
+        direction=direction,
+        allow_exact_matches=True,
+    )
+    matched['latency'] = matched.rx - matched.event
+    matrix = matched.pivot_table(index='event', columns='node_id', values='latency', aggfunc='first', dropna=False)
+    matrix = matrix.reindex(index=events, columns=receivers)
+    matrix.index.name = 'event'
+    matrix.columns.name = 'node_id'
+    return matrix
+
+
+def gpioLatencyStats(latencyMatrix, percentiles=[5, 50, 95]):
+    '''Compute latency statistics per receiver node from a latency matrix (see gpioLatency()).
+    Args:
+        latencyMatrix: latency matrix as returned by gpioLatency()
+        percentiles:   list of percentiles to compute
+    Returns:
+        pandas dataframe with one row per receiver node
+    '''
+    lat = latencyMatrix.to_numpy(dtype=float)
+    valid = ~np.isnan(lat)
+    with warnings.catch_warnings():
+        # all-NaN columns (receivers without any matching edge) are expected
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        stats = pd.DataFrame({
+            'events': lat.shape[0],
+            'received': valid.sum(axis=0),
+            'missed': (~valid).sum(axis=0),
+            'mean': np.nanmean(lat, axis=0) if lat.shape[0] else np.nan,
+            'std': np.nanstd(lat, axis=0) if lat.shape[0] else np.nan,
+            'min': np.nanmin(np.where(valid, lat, np.inf), axis=0) if lat.shape[0] else np.nan,
+            'max': np.nanmax(np.where(valid, lat, -np.inf), axis=0) if lat.shape[0] else np.nan,
+        }, index=latencyMatrix.columns)
+        for q in percentiles:
+            stats['p{}'.format(q)] = np.nanpercentile(lat, q, axis=0) if lat.shape[0] else np.nan
+    stats.loc[stats.received == 0, ['min', 'max']] = np.nan
+    return stats
+
+
+def gpioEnergy(resultPath, nodeId, pin, level=1, gpioDf=None, chunkSize=DEFAULT_CHUNK_SIZE):
+    '''Compute the energy consumed by a node during the intervals in which a GPIO pin has a certain level (e.g. radio on), and the totals over all intervals.
+    The power data (powerprofiling.csv or .rld) is streamed and only read within the time span of the intervals.
+    Args:
+        resultPath: path to the flocklab results (unzipped)
+        nodeId:     node ID
+        pin:        GPIO pin marking the state (e.g. 'LED1')
+        level:      level of the pin which defines the intervals (1: HIGH, 0: LOW)
+        gpioDf:     GPIO trace as pandas dataframe (default: read from resultPath)
+        chunkSize:  approximate number of power samples processed at once
+    Returns:
+        Tuple (pandas dataframe with one row per interval (see intervalEnergy()), dict with totals)
+    '''
+    if gpioDf is None:
+        gpioDf = readGpioTracing(resultPath)
+        if gpioDf is None:
+            raise FlocklabError('ERROR: No GPIO tracing data available!')
+    tEnd = getGpioEndTime(gpioDf)
+    gpioDf = gpioDf[(gpioDf.node_id.to_numpy() == nodeId) & (gpioDf.pin_name.to_numpy() == pin)]
+    pulses = gpioPulses(gpioDf, level=level, tEnd=tEnd)
+    pulses = pulses[~np.isnan(pulses.end.to_numpy())]
+
+    start = pulses.start.to_numpy()
+    end = pulses.end.to_numpy()
+    if len(start):
+        # the samples right before/after the intervals are required for sample and hold integration (slowest FlockLab power sampling rate is 1 Hz)
+        powerChunks = iterNodePowerChunks(resultPath, nodeId, tStart=start.min() - 2., tEnd=end.max() + 2., chunkSize=chunkSize)
+    else:
+        powerChunks = []
+    intervals = intervalEnergy(start, end, powerChunks)
+    intervals.insert(0, 'node_id', nodeId)
+    intervals.insert(1, 'pin_name', pin)
+
+    totalDuration = intervals.duration.sum()
+    totals = {
+        'node_id': nodeId,
+        'pin_name': pin,
+        'level': level,
+        'intervals': len(intervals),
+        'duration': totalDuration,
+        'energy_mJ': intervals.energy_mJ.sum(),
+        'charge_mC': intervals.charge_mC.sum(),
+        'current_mA_mean': intervals.charge_mC.sum() / totalDuration if totalDuration > 0 else np.nan,
+        'power_mW_mean': intervals.energy_mJ.sum() / totalDuration if totalDuration > 0 else np.nan,
+    }
+    return intervals, totals
+
+
+###############################################################################
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,685 @@
+#!/usr/bin/env python3
+"""
+Copyright (c) 2021, ETH Zurich, Computer Engineering Group (TEC)
+"""
+
+import numpy as np
+import pandas as pd
+import os
+import io
+import glob
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from rocketlogger.data import RocketLoggerData
+
+from .flocklab import FlocklabError
+from .csvindex import CsvBlockIndex
+
+###############################################################################
+
+# number of samples processed at once when streaming over power profiling files
+DEFAULT_CHUNK_SIZE = 2**20
+
+powerCols = ['timestamp', 'observer_id', 'node_id', 'current_mA', 'voltage_V']
+aggregatedPowerCols = ['timestamp', 'observer_id', 'node_id', 'count',
+                       'current_mA_min', 'current_mA_max', 'current_mA_mean',
+                       'voltage_V_min', 'voltage_V_max', 'voltage_V_mean']
+# relative resolution and smallest resolved absolute value of the histograms used for percentiles in powerSummary()
+SUMMARY_HIST_RESOLUTION = 1e-4
+SUMMARY_HIST_MIN = 1e-6
+
+
+def getRldFiles(resultPath):
+    '''Get all RocketLogger power profiling files of a FlockLab result directory.
+    Args:
+        resultPath: path to the flocklab results (unzipped)
+    Returns:
+        List of tuples (file path, observer ID, node ID), sorted by node ID
+    '''
+    ret = []
+    for rldFile in glob.glob(os.path.join(resultPath, 'powerprofiling*.rld')):
+        # file name format: powerprofiling.<observer_id>.<node_id>.rld
+        sp = os.path.basename(rldFile).split('.')
+        ret.append((rldFile, int(sp[1]), int(sp[2])))
+    return sorted(ret, key=lambda e: (e[2], e[1]))
+
+
+def readRldHeader(rldFile):
+    '''Read the header (incl. channel info) of a RocketLogger data file without reading any data.
+    Args:
+        rldFile: path to the .rld file
+    Returns:
+        header as dict
+    '''
+    rld = RocketLoggerData(rldFile, header_only=True, join_files=False)
+    # NOTE: channel info is not available through the public interface (get_header())
+    return rld._header
+
+
+def _rldBlockDtype(header):
+    '''Numpy dtype of a single data block (timestamps + data) of a RocketLogger data file (same layout as used by the rocketlogger lib).
+    '''
+    binCount = header['channel_binary_count']
+    dataNames = []
+    dataFormats = []
+    if binCount > 0:
+        dataNames.append('bin')
+        dataFormats.append('<u{:d}'.format(4*int(np.ceil(binCount/32))))
+    for channel in header['channels'][binCount:]:
+        dataNames.append(channel['name'])
+        dataFormats.append('<i{:d}'.format(channel['data_size']))
+    dataDtype = np.dtype({'names': dataNames, 'formats': dataFormats})
+    return np.dtype([
+        ('realtime_sec', '<i8'),
+        ('realtime_ns', '<i8'),
+        ('monotonic_sec', '<i8'),
+        ('monotonic_ns', '<i8'),
+        ('data', (dataDtype, (header['data_block_size'],))),
+    ])
+
+
+def _rldChannel(header, name):
+    '''Returns index and channel info for channel with name name (or (None, None) if not available).
+    '''
+    for idx, channel in enumerate(header['channels']):
+        if channel['name'] == name:
+            return idx, channel
+    return None, None
+
+
+def _rldCurrent(header, blockData):
+    '''Current (in A) of a set of data blocks. Low and high range channels are merged the same way as RocketLoggerData.merge_channels() does it.
+    '''
+    idx, channel = _rldChannel(header, 'I1')
+    if channel is not None:
+        return blockData[channel['name']] * 10.**channel['scale']
+    _, lowChannel = _rldChannel(header, 'I1L')
+    _, highChannel = _rldChannel(header, 'I1H')
+    if lowChannel is None or highChannel is None:
+        raise FlocklabError('ERROR: RocketLogger data file does not contain current channels (I1 or I1L/I1H)!')
+    validLow = (blockData['bin'] & (1 << lowChannel['valid_link'])) != 0
+    return np.where(
+        validLow,
+        blockData[lowChannel['name']] * 10.**lowChannel['scale'],
+        blockData[highChannel['name']] * 10.**highChannel['scale'],
+    )
+
+
+def _rldVoltage(header, blockData):
+    '''Voltage difference V2 - V1 (in V) of a set of data blocks.
+    '''
+    _, v1Channel = _rldChannel(header, 'V1')
+    _, v2Channel = _rldChannel(header, 'V2')
+    if v1Channel is None or v2Channel is None:
+        raise FlocklabError('ERROR: RocketLogger data file does not contain voltage channels (V1/V2)!')
+    return blockData[v2Channel['name']] * 10.**v2Channel['scale'] - blockData[v1Channel['name']] * 10.**v1Channel['scale']
+
+
+def iterRldChunks(rldFile, tStart=None, tEnd=None, chunkSize=DEFAULT_CHUNK_SIZE):
+    '''Iterate over a RocketLogger data file in chunks of data blocks without decoding the whole file.
+    Only the data blocks overlapping with the requested time window are read from the file (memory mapped).
+    Timestamps are interpolated between block timestamps (network time) the same way as RocketLoggerData.get_time() does it.
+    Args:
+        rldFile:   path to the .rld file
+        tStart:    start of time window (absolute time in s, default: start of file)
+        tEnd:      end of time window (absolute time in s, default: end of file)
+        chunkSize: approximate number of samples per returned chunk
+    Returns:
+        Generator of tuples (timestamp [s], current [mA], voltage [V]) of numpy arrays
+    '''
+    header = readRldHeader(rldFile)
+    blockSize = header['data_block_size']
+    blockDtype = _rldBlockDtype(header)
+
+    # number of complete blocks available in file
+    fileSize = os.path.getsize(rldFile)
+    blockCount = min(header['data_block_count'], (fileSize - header['header_length']) // blockDtype.itemsize)
+    if blockCount <= 0:
+        return
+
+    fileData = np.memmap(rldFile, dtype=blockDtype, mode='r', offset=header['header_length'], shape=(blockCount,))
+
+    # block timestamps in ns (network time), last block is extrapolated using the average block duration
+    blockTs = fileData['realtime_sec'].astype(np.int64)*1000000000 + fileData['realtime_ns'].astype(np.int64)
+    if blockCount > 1:
+        blockTsEnd = blockTs[-1] + np.int64(np.round(np.diff(blockTs).mean()))
+    else:
+        blockTsEnd = blockTs[-1] + np.int64(np.round(1e9*blockSize/header['sample_rate']))
+    blockTsExt = np.append(blockTs, blockTsEnd)
+
+    # determine range of blocks which overlap with time window
+    firstBlock = 0
+    lastBlock = blockCount
+    if tStart is not None:
+        firstBlock = max(0, np.searchsorted(blockTsExt, np.int64(round(tStart*1e9)), side='right') - 1)
+    if tEnd is not None:
+        lastBlock = min(blockCount, np.searchsorted(blockTsExt, np.int64(round(tEnd*1e9)), side='right'))
+
+    sampleFraction = np.arange(blockSize) / blockSize
+    blocksPerChunk = max(1, chunkSize // blockSize)
+    for chunkStart in range(firstBlock, lastBlock, blocksPerChunk):
+        chunkEnd = min(chunkStart + blocksPerChunk, lastBlock)
+        blockData = np.asarray(fileData['data'][chunkStart:chunkEnd])
+        blockDuration = np.diff(blockTsExt[chunkStart:chunkEnd+1])
+        ts = (blockTs[chunkStart:chunkEnd, None] + np.round(blockDuration[:, None]*sampleFraction).astype(np.int64)).ravel() / 1e9
+        current = _rldCurrent(header, blockData).ravel() * 1e3 # convert to mA
+        voltage = _rldVoltage(header, blockData).ravel()
+        # cut samples outside of time window
+        if (tStart is not None and ts[0] < tStart) or (tEnd is not None and ts[-1] > tEnd):
+            mask = np.ones(len(ts), dtype=bool)
+            if tStart is not None:
+                mask &= (ts >= tStart)
+            if tEnd is not None:
+                mask &= (ts <= tEnd)
+            ts, current, voltage = ts[mask], current[mask], voltage[mask]
+        if len(ts):
+            yield ts, current, voltage
+
+
+def _aggregateBuckets(bucketIdx, current, voltage):
+    '''Computes count, min, max and sum of current and voltage per bucket (bucketIdx needs to be sorted).
+    '''
+    starts = np.flatnonzero(np.concatenate(([True], bucketIdx[1:] != bucketIdx[:-1])))
+    return {
+        'bucket': bucketIdx[starts],
+        'count': np.diff(np.append(starts, len(bucketIdx))),
+        'current_mA_min': np.minimum.reduceat(current, starts),
+        'current_mA_max': np.maximum.reduceat(current, starts),
+        'current_mA_sum': np.add.reduceat(current, starts),
+        'voltage_V_min': np.minimum.reduceat(voltage, starts),
+        'voltage_V_max': np.maximum.reduceat(voltage, starts),
+        'voltage_V_sum': np.add.reduceat(voltage, starts),
+    }
+
+
+def _combineAggregates(partialList, origin, sampleRate):
+    '''Combines partial per-bucket aggregates (e.g. buckets spanning multiple chunks) into the final aggregated dataframe.
+    '''
+    if not partialList:
+        return pd.DataFrame(columns=aggregatedPowerCols)
+    df = pd.concat(partialList, ignore_index=True)
+    df = df.groupby(['node_id', 'observer_id', 'bucket'], sort=True).agg({
+        'count': 'sum',
+        'current_mA_min': 'min',
+        'current_mA_max': 'max',
+        'current_mA_sum': 'sum',
+        'voltage_V_min': 'min',
+        'voltage_V_max': 'max',
+        'voltage_V_sum': 'sum',
+    }).reset_index()
+    df['timestamp'] = origin + df['bucket'] / sampleRate
+    df['current_mA_mean'] = df['current_mA_sum'] / df['count']
+    df['voltage_V_mean'] = df['voltage_V_sum'] / df['count']
+    return df[aggregatedPowerCols]
+
+
+def _bucketIndex(ts, origin, sampleRate):
+    return np.floor((ts - origin) * sampleRate).astype(np.int64)
+
+
+def readPowerRld(rldFile, tStart=None, tEnd=None, sampleRate=None, observerId=None, nodeId=None, chunkSize=DEFAULT_CHUNK_SIZE):
+    '''Read power profiling data from a RocketLogger data file, optionally limited to a time window and/or aggregated to a lower sample rate.
+    The file is streamed in chunks, i.e. memory usage is bounded by the size of the output (and the chunk size).
+    Args:
+        rldFile:    path to the .rld file
+        tStart:     start of time window (absolute time in s, default: start of file)
+        tEnd:       end of time window (absolute time in s, default: end of file)
+        sampleRate: target sample rate in Hz; if provided, samples are aggregated (min/max/mean) into buckets of 1/sampleRate seconds (default: None, i.e. no aggregation)
+        observerId: observer ID (default: parsed from file name)
+        nodeId:     node ID (default: parsed from file name)
+        chunkSize:  approximate number of samples processed at once
+    Returns:
+        pandas dataframe with columns timestamp, observer_id, node_id, current_mA, voltage_V (no aggregation)
+        or timestamp (start of bucket), observer_id, node_id, count, current_mA_{min,max,mean}, voltage_V_{min,max,mean} (aggregation)
+    '''
+    if observerId is None or nodeId is None:
+        sp = os.path.basename(rldFile).split('.')
+        observerId = int(sp[1]) if observerId is None else observerId
+        nodeId = int(sp[2]) if nodeId is None else nodeId
+
+    chunkList = []
+    origin = tStart if tStart is not None else 0.
+    for ts, current, voltage in iterRldChunks(rldFile, tStart=tStart, tEnd=tEnd, chunkSize=chunkSize):
+        if sampleRate is None:
+            chunkList.append((ts, current, voltage))
+        else:
+            agg = _aggregateBuckets(_bucketIndex(ts, origin, sampleRate), current, voltage)
+            agg['observer_id'] = observerId
+            agg['node_id'] = nodeId
+            chunkList.append(pd.DataFrame(agg))
+
+    if sampleRate is not None:
+        return _combineAggregates(chunkList, origin, sampleRate)
+
+    df = pd.DataFrame(columns=powerCols)
+    if chunkList:
+        df = pd.DataFrame()
+        df['timestamp'] = np.concatenate([e[0] for e in chunkList])
+        df['observer_id'] = observerId
+        df['node_id'] = nodeId
+        df['current_mA'] = np.concatenate([e[1] for e in chunkList])
+        df['voltage_V'] = np.concatenate([e[2] for e in chunkList])
+    return df
+
+
+def iterCsvChunks(csvFile, tStart=None, tEnd=None, chunkSize=DEFAULT_CHUNK_SIZE, nodes=None):
+    '''Iterate over a FlockLab powerprofiling.csv file in chunks (sanity checked and limited to the time window and nodes).
+    If a time window or nodes are provided, only the parts of the file which overlap with them are parsed (see CsvBlockIndex).
+    Args:
+        csvFile:   path to the powerprofiling.csv file
+        tStart:    start of time window (absolute time in s, default: start of file)
+        tEnd:      end of time window (absolute time in s, default: end of file)
+        chunkSize: number of lines read at once
+        nodes:     list of node IDs (default: all nodes)
+    Returns:
+        Generator of pandas dataframes
+    '''
+    if tStart is None and tEnd is None and nodes is None:
+        # instruct pandas with float_precision to not sacrifice accuracy for the sake of speed
+        chunks = pd.read_csv(csvFile, float_precision='round_trip', chunksize=chunkSize)
+    else:
+        chunks = CsvBlockIndex(csvFile).iterChunks(tStart=tStart, tEnd=tEnd, nodes=nodes, chunkSize=chunkSize)
+    for chunk in chunks:
+        for col in powerCols:
+            if not col in chunk.columns:
+                raise FlocklabError('ERROR: Required column ({}) in powerprofiling.csv file is missing.'.format(col))
+        # sanity check node_id data type
+        if len(chunk) > 0 and not 'int' in str(chunk.node_id.dtype):
+            raise FlocklabError('ERROR: Power profiling file (powerprofiling.csv) has wrong format!')
+        if tStart is not None:
+            chunk = chunk[chunk.timestamp.to_numpy() >= tStart]
+        if tEnd is not None:
+            chunk = chunk[chunk.timestamp.to_numpy() <= tEnd]
+        if nodes is not None:
+            chunk = chunk[np.isin(chunk.node_id.to_numpy(), list(nodes))]
+        if len(chunk) > 0:
+            yield chunk
+
+
+def readPowerCsv(csvFile, tStart=None, tEnd=None, sampleRate=None, chunkSize=DEFAULT_CHUNK_SIZE, nodes=None):
+    '''Read power profiling data from a FlockLab powerprofiling.csv file, optionally limited to a time window and/or aggregated to a lower sample rate.
+    The file is read in chunks, i.e. memory usage is bounded by the size of the output (and the chunk size).
+    Args:
+        csvFile:    path to the powerprofiling.csv file
+        tStart:     start of time window (absolute time in s, default: start of file)
+        tEnd:       end of time window (absolute time in s, default: end of file)
+        sampleRate: target sample rate in Hz; if provided, samples are aggregated (min/max/mean) into buckets of 1/sampleRate seconds (default: None, i.e. no aggregation)
+        chunkSize:  number of lines processed at once
+        nodes:      list of node IDs (default: all nodes)
+    Returns:
+        pandas dataframe (same format as returned by readPowerRld())
+    '''
+    chunkList = []
+    origin = tStart if tStart is not None else 0.
+    for chunk in iterCsvChunks(csvFile, tStart=tStart, tEnd=tEnd, chunkSize=chunkSize, nodes=nodes):
+        if sampleRate is None:
+            chunkList.append(chunk[powerCols])
+            continue
+        for (obsId, nodeId), nodeGrp in chunk.groupby(['observer_id', 'node_id'], sort=False):
+            bucketIdx = _bucketIndex(nodeGrp.timestamp.to_numpy(), origin, sampleRate)
+            order = np.argsort(bucketIdx, kind='stable')
+            agg = _aggregateBuckets(
+                bucketIdx[order],
+                nodeGrp.current_mA.to_numpy()[order],
+                nodeGrp.voltage_V.to_numpy()[order],
+            )
+            agg['observer_id'] = obsId
+            agg['node_id'] = nodeId
+            chunkList.append(pd.DataFrame(agg))
+
+    if sampleRate is not None:
+        return _combineAggregates(chunkList, origin, sampleRate)
+    if not chunkList:
+        return pd.DataFrame(columns=powerCols)
+    return pd.concat(chunkList, ignore_index=True)
+
+
+def readPowerProfiling(resultPath, tStart=None, tEnd=None, sampleRate=None, chunkSize=DEFAULT_CHUNK_SIZE, nodes=None):
+    '''Read power profiling data (powerprofiling.csv or powerprofiling*.rld) of a FlockLab test result, optionally limited to a time window and/or aggregated to a lower sample rate.
+    Args:
+        resultPath: path to the flocklab results (unzipped)
+        tStart:     start of time window (absolute time in s, default: start of test)
+        tEnd:       end of time window (absolute time in s, default: end of test)
+        sampleRate: target sample rate in Hz; if provided, samples are aggregated (min/max/mean) into buckets of 1/sampleRate seconds (default: None, i.e. no aggregation)
+        chunkSize:  approximate number of samples processed at once
+        nodes:      list of node IDs (default: all nodes)
+    Returns:
+        pandas dataframe (see readPowerRld()), None if no power profiling data is available
+    '''
+    powerPath = os.path.join(resultPath, 'powerprofiling.csv')
+    if os.path.isfile(powerPath):
+        return readPowerCsv(powerPath, tStart=tStart, tEnd=tEnd, sampleRate=sampleRate, chunkSize=chunkSize, nodes=nodes)
+
+    rldFiles = getRldFiles(resultPath)
+    if not rldFiles:
+        return None
+    if nodes is not None:
+        # files of other nodes are not opened at all
+        rldFiles = [e for e in rldFiles if e[2] in nodes]
+        if not rldFiles:
+            return pd.DataFrame(columns=powerCols if sampleRate is None else aggregatedPowerCols)
+    dfList = [
+        readPowerRld(rldFile, tStart=tStart, tEnd=tEnd, sampleRate=sampleRate, observerId=obsId, nodeId=nodeId, chunkSize=chunkSize)
+        for rldFile, obsId, nodeId in rldFiles
+    ]
+    return pd.concat(dfList, ignore_index=True)
+
+
+def iterNodePowerChunks(resultPath, nodeId, tStart=None, tEnd=None, chunkSize=DEFAULT_CHUNK_SIZE):
+    '''Iterate over the power profiling data of a single node of a FlockLab test result in chunks (powerprofiling.csv or powerprofiling*.rld).
+    Args:
+        resultPath: path to the flocklab results (unzipped)
+        nodeId:     node ID
+        tStart:     start of time window (absolute time in s, default: start of test)
+        tEnd:       end of time window (absolute time in s, default: end of test)
+        chunkSize:  approximate number of samples processed at once
+    Returns:
+        Generator of tuples (timestamp [s], current [mA], voltage [V]) of numpy arrays, sorted by time
+    '''
+    powerPath = os.path.join(resultPath, 'powerprofiling.csv')
+    if os.path.isfile(powerPath):
+        tLast = -np.inf
+        for chunk in iterCsvChunks(powerPath, tStart=tStart, tEnd=tEnd, chunkSize=chunkSize, nodes=[nodeId]):
+            if len(chunk) == 0:
+                continue
+            ts = chunk.timestamp.to_numpy()
+            if ts[0] < tLast or np.any(np.diff(ts) < 0):
+                raise FlocklabError('ERROR: Power profiling data of node {} is not sorted by time!'.format(nodeId))
+            tLast = ts[-1]
+            yield ts, chunk.current_mA.to_numpy(), chunk.voltage_V.to_numpy()
+        return
+
+    rldFiles = [e for e in getRldFiles(resultPath) if e[2] == nodeId]
+    if not rldFiles:
+        raise FlocklabError('ERROR: No power profiling data available for node {}!'.format(nodeId))
+    for chunk in iterRldChunks(rldFiles[0][0], tStart=tStart, tEnd=tEnd, chunkSize=chunkSize):
+        yield chunk
+
+
+def intervalEnergy(intervalStart, intervalEnd, powerChunks):
+    '''Compute energy, charge and mean current/power of a set of time intervals from a power trace, in a single streaming pass over the power data.
+    The cumulative energy and charge (sample and hold between samples) are evaluated at all interval boundaries with binary searches (searchsorted) chunk by chunk,
+    i.e. the power data does not need to fit into memory. Parts of intervals outside the power trace contribute no energy.
+    Args:
+        intervalStart: array of interval start times (absolute time in s)
+        intervalEnd:   array of interval end times (absolute time in s)
+        powerChunks:   iterable of (timestamp [s], current [mA], voltage [V]) tuples sorted by time (e.g. iterNodePowerChunks())
+    Returns:
+        pandas dataframe with columns start, end, duration, energy_mJ, charge_mC, current_mA_mean, power_mW_mean
+    '''
+    intervalStart = np.asarray(intervalStart, dtype=float)
+    intervalEnd = np.asarray(intervalEnd, dtype=float)
+    # cumulative energy and charge are evaluated at all boundaries, processed in sorted order
+    boundaries = np.concatenate((intervalStart, intervalEnd))
+    order = np.argsort(boundaries, kind='stable')
+    sortedBoundaries = boundaries[order]
+    cumEnergy = np.full(len(boundaries), np.nan)
+    cumCharge = np.full(len(boundaries), np.nan)
+
+    prev = None         # last sample of previous chunk (t, i, p)
+    energyOffset = 0.   # cumulative energy at time of prev sample
+    chargeOffset = 0.
+    nextBoundary = 0    # index of first sorted boundary not yet evaluated
+    for ts, current, voltage in powerChunks:
+        power = current * voltage
+        if prev is not None:
+            ts = np.concatenate(([prev[0]], ts))
+            current = np.concatenate(([prev[1]], current))
+            power = np.concatenate(([prev[2]], power))
+        dt = np.diff(ts)
+        cumE = energyOffset + np.concatenate(([0.], np.cumsum(power[:-1]*dt)))
+        cumQ = chargeOffset + np.concatenate(([0.], np.cumsum(current[:-1]*dt)))
+
+        # boundaries before the start of the power trace
+        if prev is None:
+            stop = np.searchsorted(sortedBoundaries, ts[0], side='left')
+            cumEnergy[order[nextBoundary:stop]] = 0.
+            cumCharge[order[nextBoundary:stop]] = 0.
+            nextBoundary = max(nextBoundary, stop)
+
+        # boundaries within this chunk
+        stop = np.searchsorted(sortedBoundaries, ts[-1], side='left')
+        b = sortedBoundaries[nextBoundary:stop]
+        k = np.searchsorted(ts, b, side='right') - 1
+        cumEnergy[order[nextBoundary:stop]] = cumE[k] + power[k]*(b - ts[k])
+        cumCharge[order[nextBoundary:stop]] = cumQ[k] + current[k]*(b - ts[k])
+        nextBoundary = stop
+
+        prev = (ts[-1], current[-1], power[-1])
+        energyOffset = cumE[-1]
+        chargeOffset = cumQ[-1]
+
+    # boundaries after the end of the power trace
+    cumEnergy[order[nextBoundary:]] = energyOffset
+    cumCharge[order[nextBoundary:]] = chargeOffset
+
+    n = len(intervalStart)
+    duration = intervalEnd - intervalStart
+    energy = cumEnergy[n:] - cumEnergy[:n]
+    charge = cumCharge[n:] - cumCharge[:n]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return pd.DataFrame({
+            'start': intervalStart,
+            'end': intervalEnd,
+            'duration': duration,
+            'energy_mJ': energy,
+            'charge_mC': charge,
+            'current_mA_mean': np.where(duration > 0, charge / duration, np.nan),
+            'power_mW_mean': np.where(duration > 0, energy / duration, np.nan),
+        })
+
+
+def _histBins(x):
+    '''Logarithmic histogram bin index of values (sign preserving, 0 for values smaller than SUMMARY_HIST_MIN).
+    '''
+    absX = np.abs(x)
+    with np.errstate(divide='ignore'):
+        idx = 1 + np.floor(np.log(np.maximum(absX, SUMMARY_HIST_MIN) / SUMMARY_HIST_MIN) / np.log1p(SUMMARY_HIST_RESOLUTION)).astype(np.int64)
+    idx[absX < SUMMARY_HIST_MIN] = 0
+    return np.sign(x).astype(np.int64) * idx
+
+
+def _histBinValue(bins):
+    '''Center (geometric) of logarithmic histogram bins.
+    '''
+    return np.sign(bins) * SUMMARY_HIST_MIN * (1 + SUMMARY_HIST_RESOLUTION)**(np.abs(bins) - 0.5) * (bins != 0)
+
+
+def _mergeHist(a, b):
+    '''Merges two sparse histograms (tuples of sorted bin indices and counts).
+    '''
+    bins, inverse = np.unique(np.concatenate((a[0], b[0])), return_inverse=True)
+    return bins, np.bincount(inverse, weights=np.concatenate((a[1], b[1]))).astype(np.int64)
+
+
+class _PowerStats():
+    '''Mergeable statistics of the power trace of a single node (partial statistics of consecutive segments of the trace can be merged in time order).
+    Energy and charge are integrated with sample and hold, percentiles are approximated with sparse logarithmic histograms (see SUMMARY_HIST_RESOLUTION).
+    '''
+    def __init__(self, ts=None, current=None, voltage=None):
+        self.count = 0
+        self.energy = 0.
+        self.charge = 0.
+        self.first = None   # first sample (t, i, p)
+        self.last = None    # last sample (t, i, p)
+        self.sums = {'current': 0., 'voltage': 0.}
+        self.mins = {'current': np.inf, 'voltage': np.inf}
+        self.maxs = {'current': -np.inf, 'voltage': -np.inf}
+        self.hists = {'current': (np.array([], dtype=np.int64), np.array([], dtype=np.int64)),
+                      'voltage': (np.array([], dtype=np.int64), np.array([], dtype=np.int64))}
+        if ts is None or len(ts) == 0:
+            return
+        power = current * voltage
+        dt = np.diff(ts)
+        self.count = len(ts)
+        self.energy = np.sum(power[:-1] * dt)
+        self.charge = np.sum(current[:-1] * dt)
+        self.first = (ts[0], current[0], power[0])
+        self.last = (ts[-1], current[-1], power[-1])
+        for name, x in [('current', current), ('voltage', voltage)]:
+            self.sums[name] = np.sum(x)
+            self.mins[name] = np.min(x)
+            self.maxs[name] = np.max(x)
+            self.hists[name] = np.unique(_histBins(x), return_counts=True)
+
+    def merge(self, other):
+        '''Appends the statistics of the subsequent segment other.
+        '''
+        if other.count == 0:
+            return self
+        if self.count > 0:
+            if other.first[0] < self.last[0]:
+                raise FlocklabError('ERROR: Power profiling data is not sorted by time!')
+            # sample and hold between last sample of this and first sample of other segment
+            self.energy += self.last[2] * (other.first[0] - self.last[0])
+            self.charge += self.last[1] * (other.first[0] - self.last[0])
+        else:
+            self.first = other.first
+        self.count += other.count
+        self.energy += other.energy
+        self.charge += other.charge
+        self.last = other.last
+        for name in self.sums:
+            self.sums[name] += other.sums[name]
+            self.mins[name] = min(self.mins[name], other.mins[name])
+            self.maxs[name] = max(self.maxs[name], other.maxs[name])
+            self.hists[name] = _mergeHist(self.hists[name], other.hists[name])
+        return self
+
+    def percentiles(self, name, percentiles):
+        bins, counts = self.hists[name]
+        cum = np.cumsum(counts)
+        ranks = np.asarray(percentiles, dtype=float) / 100. * (self.count - 1)
+        idx = np.minimum(np.searchsorted(cum, ranks, side='right'), len(bins) - 1)
+        return np.clip(_histBinValue(bins[idx]), self.mins[name], self.maxs[name])
+
+    def summary(self, percentiles):
+        duration = self.last[0] - self.first[0]
+        ret = OrderedDict([
+            ('samples', self.count),
+            ('t_start', self.first[0]),
+            ('t_end', self.last[0]),
+            ('duration', duration),
+            ('energy_mJ', self.energy),
+            ('charge_mC', self.charge),
+            ('power_mW_mean', self.energy / duration if duration > 0 else np.nan),
+        ])
+        for name, unit in [('current', 'mA'), ('voltage', 'V')]:
+            col = '{}_{}'.format(name, unit)
+            ret['{}_mean'.format(col)] = self.sums[name] / self.count
+            ret['{}_min'.format(col)] = self.mins[name]
+            ret['{}_max'.format(col)] = self.maxs[name]
+            for q, val in zip(percentiles, self.percentiles(name, percentiles)):
+                ret['{}_p{}'.format(col, q)] = val
+        return ret
+
+
+def _rldSummaryWorker(args):
+    '''Computes the power statistics of a single RocketLogger data file (executed in worker process).
+    '''
+    rldFile, tStart, tEnd, chunkSize = args
+    stats = _PowerStats()
+    for ts, current, voltage in iterRldChunks(rldFile, tStart=tStart, tEnd=tEnd, chunkSize=chunkSize):
+        stats.merge(_PowerStats(ts, current, voltage))
+    return stats
+
+
+def _csvSummaryWorker(args):
+    '''Computes the power statistics of all nodes of a byte range of a powerprofiling.csv file (executed in worker process).
+    The range contains all lines which start within [byteStart, byteEnd).
+    '''
+    csvFile, header, byteStart, byteEnd, tStart, tEnd, chunkSize = args
+    stats = {}
+    blockBytes = 64*chunkSize # approx. chunkSize lines per block
+    with open(csvFile, 'rb') as f:
+        f.seek(byteEnd - 1)
+        f.readline()
+        endPos = f.tell()
+        f.seek(byteStart - 1)
+        f.readline()
+        pos = f.tell()
+        while pos < endPos:
+            buf = f.read(min(blockBytes, endPos - pos))
+            if pos + len(buf) < endPos:
+                buf += f.readline()
+            pos += len(buf)
+            # instruct pandas with float_precision to not sacrifice accuracy for the sake of speed
+            chunk = pd.read_csv(io.BytesIO(buf), names=header, header=None, float_precision='round_trip')
+            if len(chunk) > 0 and not 'int' in str(chunk.node_id.dtype):
+                raise FlocklabError('ERROR: Power profiling file (powerprofiling.csv) has wrong format!')
+            if tStart is not None:
+                chunk = chunk[chunk.timestamp.to_numpy() >= tStart]
+            if tEnd is not None:
+                chunk = chunk[chunk.timestamp.to_numpy() <= tEnd]
+            for (nodeId, obsId), nodeGrp in chunk.groupby(['node_id', 'observer_id'], sort=False):
+                ts = nodeGrp.timestamp.to_numpy()
+                if np.any(np.diff(ts) < 0):
+                    raise FlocklabError('ERROR: Power profiling data of node {} is not sorted by time!'.format(nodeId))
+                nodeStats = _PowerStats(ts, nodeGrp.current_mA.to_numpy(), nodeGrp.voltage_V.to_numpy())
+                stats.setdefault((nodeId, obsId), _PowerStats()).merge(nodeStats)
+    return stats
+
+
+def powerSummary(resultPath, tStart=None, tEnd=None, percentiles=[5, 50, 95], processes=None, chunkSize=DEFAULT_CHUNK_SIZE):
+    '''Compute power statistics (energy, charge, mean/min/max/percentiles of current and voltage, sample count) per node of a FlockLab test result.
+    The power profiling data is streamed in chunks (bounded memory) and processed in parallel (process pool): .rld files per node, powerprofiling.csv in byte ranges.
+    Energy and charge are integrated with sample and hold. Percentiles are approximated with a relative resolution of SUMMARY_HIST_RESOLUTION.
+    Args:
+        resultPath:  path to the flocklab results (unzipped)
+        tStart:      start of time window (absolute time in s, default: start of test)
+        tEnd:        end of time window (absolute time in s, default: end of test)
+        percentiles: list of percentiles to compute
+        processes:   number of worker processes (default: number of CPUs, 1: no process pool)
+        chunkSize:   approximate number of samples processed at once
+    Returns:
+        pandas dataframe with one row per node, None if no power profiling data is available
+    '''
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    def mapWorker(worker, workerArgs):
+        if processes == 1 or len(workerArgs) <= 1:
+            return [worker(e) for e in workerArgs]
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            return list(executor.map(worker, workerArgs))
+
+    nodeStats = OrderedDict()
+    powerPath = os.path.join(resultPath, 'powerprofiling.csv')
+    if os.path.isfile(powerPath):
+        with open(powerPath, 'rb') as f:
+            headerLine = f.readline()
+        header = headerLine.decode().strip().split(',')
+        for col in powerCols:
+            if not col in header:
+                raise FlocklabError('ERROR: Required column ({}) in powerprofiling.csv file is missing.'.format(col))
+        fileSize = os.path.getsize(powerPath)
+        numRanges = max(1, min(processes, (fileSize - len(headerLine)) // (16*2**20)))
+        bounds = np.linspace(len(headerLine), fileSize, numRanges + 1).astype(np.int64).tolist()
+        workerArgs = [(powerPath, header, bounds[k], bounds[k+1], tStart, tEnd, chunkSize) for k in range(numRanges) if bounds[k+1] > bounds[k]]
+        # merge partial statistics of ranges in file (time) order
+        for rangeStats in mapWorker(_csvSummaryWorker, workerArgs):
+            for key, stats in rangeStats.items():
+                nodeStats.setdefault(key, _PowerStats()).merge(stats)
+        nodeStats = OrderedDict(sorted(nodeStats.items()))
+    else:
+        rldFiles = getRldFiles(resultPath)
+        if not rldFiles:
+            return None
+        workerArgs = [(rldFile, tStart, tEnd, chunkSize) for rldFile, _, _ in rldFiles]
+        for (_, obsId, nodeId), stats in zip(rldFiles, mapWorker(_rldSummaryWorker, workerArgs)):
+            nodeStats[(nodeId, obsId)] = stats
+
+    rows = []
+    for (nodeId, obsId), stats in nodeStats.items():
+        if stats.count == 0:
+            continue
+        row = OrderedDict([('node_id', nodeId), ('observer_id', obsId)])
+        row.update(stats.summary(percentiles))
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+###############################################################################
+
+if __name__ == "__main__":
+    pass
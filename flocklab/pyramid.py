@@ -0,0 +1,598 @@
+#!/usr/bin/env python3
+"""
+Copyright (c) 2021, ETH Zurich, Computer Engineering Group (TEC)
+"""
+
+import numpy as np
+import pandas as pd
+import os
+import json
+import shutil
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from .flocklab import FlocklabError
+from .power import DEFAULT_CHUNK_SIZE, getRldFiles, iterRldChunks, iterCsvChunks
+from .gpio import pinOrdering, gpioEdges
+from .traces import readGpioTracing
+
+###############################################################################
+
+# channels of the power pyramid
+pyramidChannels = ['current_mA', 'voltage_V', 'power_mW']
+# record of a bucket of a power pyramid level (start time and min/max/mean of all channels)
+pyramidDtype = np.dtype([('t', '<f8')] + [('{}_{}'.format(c, s), '<f4') for c in pyramidChannels for s in ['min', 'max', 'mean']])
+# record of a (non-empty) bucket of a GPIO edge density level (bucket index and number of edges per pin)
+gpioDensityDtype = np.dtype([('bucket', '<i8')] + [(pin, '<u4') for pin in pinOrdering])
+# levels are added until the coarsest level contains at most this number of buckets
+PYRAMID_MIN_BUCKETS = 1024
+# width (in s) of the buckets of the finest GPIO edge density level (level k: GPIO_DENSITY_BASE_WIDTH * 2**k)
+GPIO_DENSITY_BASE_WIDTH = 2.**-10
+PYRAMID_STORE_VERSION = 1
+
+
+def _concatRecords(a, b):
+    return {key: np.concatenate((a[key], b[key])) for key in a}
+
+
+def _sliceRecords(rec, start, stop):
+    return {key: val[start:stop] for key, val in rec.items()}
+
+
+def _mergeRecords(rec, size):
+    '''Merges groups of size consecutive records (len(rec) needs to be a multiple of size, or size None to merge all records into one).
+    '''
+    n = len(rec['t'])
+    starts = np.arange(0, n, size if size is not None else max(n, 1))
+    ret = {'t': rec['t'][starts], 'count': np.add.reduceat(rec['count'], starts)}
+    for c in pyramidChannels:
+        ret[c + '_min'] = np.minimum.reduceat(rec[c + '_min'], starts)
+        ret[c + '_max'] = np.maximum.reduceat(rec[c + '_max'], starts)
+        ret[c + '_sum'] = np.add.reduceat(rec[c + '_sum'], starts)
+    return ret
+
+
+class _PyramidBuilder():
+    '''Streaming computation of the levels of a power pyramid. Samples are added in chunks (in time order), buckets of level k (2**k samples) are passed to
+    output(level, records) as soon as they are complete, i.e. memory usage does not depend on the length of the trace.
+    '''
+    def __init__(self, output):
+        self.output = output
+        self.carry = []     # index k-1: unpaired record of level k-1 (input of level k)
+        self.counts = []    # index k-1: number of buckets of level k
+        self.numSamples = 0
+        self.tEnd = np.nan
+
+    def _emit(self, level, rec):
+        self.counts[level-1] += len(rec['t'])
+        out = np.empty(len(rec['t']), dtype=pyramidDtype)
+        out['t'] = rec['t']
+        for c in pyramidChannels:
+            out[c + '_min'] = rec[c + '_min']
+            out[c + '_max'] = rec[c + '_max']
+            out[c + '_mean'] = rec[c + '_sum'] / rec['count']
+        self.output(level, out)
+
+    def add(self, ts, current, voltage):
+        if len(ts) == 0:
+            return
+        self.numSamples += len(ts)
+        self.tEnd = ts[-1]
+        rec = {'t': np.asarray(ts, dtype=float), 'count': np.ones(len(ts), dtype=np.int64)}
+        for c, x in zip(pyramidChannels, [current, voltage, current*voltage]):
+            x = np.asarray(x, dtype=float)
+            rec[c + '_min'] = x
+            rec[c + '_max'] = x
+            rec[c + '_sum'] = x
+        level = 1
+        while len(rec['t']) > 0:
+            if len(self.carry) < level:
+                self.carry.append(None)
+                self.counts.append(0)
+            if self.carry[level-1] is not None:
+                rec = _concatRecords(self.carry[level-1], rec)
+                self.carry[level-1] = None
+            if len(rec['t']) % 2:
+                self.carry[level-1] = _sliceRecords(rec, -1, None)
+                rec = _sliceRecords(rec, 0, -1)
+            if len(rec['t']) == 0:
+                break
+            rec = _mergeRecords(rec, 2)
+            self._emit(level, rec)
+            level += 1
+
+    def finish(self):
+        '''Emits the (incomplete) last bucket of all levels.
+        Returns:
+            list with number of buckets per level (index k-1: level k)
+        '''
+        tail = None # incomplete last bucket of previous level
+        for level in range(1, len(self.carry) + 1):
+            pending = [e for e in [self.carry[level-1], tail] if e is not None]
+            self.carry[level-1] = None
+            tail = None
+            if pending:
+                rec = pending[0] if len(pending) == 1 else _concatRecords(pending[0], pending[1])
+                tail = _mergeRecords(rec, None)
+                self._emit(level, tail)
+        return self.counts
+
+
+def _numRequiredLevels(counts, minBuckets):
+    '''Number of levels required such that the coarsest level contains at most minBuckets buckets.
+    '''
+    for level, count in enumerate(counts, start=1):
+        if count <= minBuckets:
+            return level
+    return len(counts)
+
+
+class PowerPyramid():
+    '''Multi-resolution representation of the power trace of a single node.
+    Level k (k >= 1) contains the min/max/mean of current, voltage and power of buckets of 2**k consecutive samples (see pyramidDtype), level 0 are the raw samples.
+    Windows of arbitrary time ranges are fetched from the coarsest level which provides the requested resolution (binary search, i.e. time proportional to the output size).
+    Pyramids can be computed in memory from the raw samples or loaded from a pyramid store (see PyramidStore.powerPyramid(), raw samples not available).
+    '''
+    def __init__(self, t=None, current=None, voltage=None, minBuckets=PYRAMID_MIN_BUCKETS, levels=None, tEnd=None, timeOffset=0.):
+        '''
+        Args:
+            t:          timestamps (sorted)
+            current:    current [mA]
+            voltage:    voltage [V]
+            minBuckets: levels are added until the coarsest level contains at most minBuckets buckets
+            levels:     precomputed levels (list of arrays of pyramidDtype, index k-1: level k), if provided t/current/voltage are not required
+            tEnd:       timestamp of last sample (only required if levels are provided)
+            timeOffset: offset subtracted from all timestamps of the precomputed levels (e.g. reference time of the visualization)
+        '''
+        self.timeOffset = timeOffset
+        self.t = None
+        self.raw = None
+        if levels is not None:
+            self.levels = [None] + list(levels)
+            self.tEnd = tEnd
+            return
+
+        self.t = np.asarray(t, dtype=float)
+        current = np.asarray(current, dtype=float)
+        voltage = np.asarray(voltage, dtype=float)
+        self.raw = {
+            'current_mA': current,
+            'voltage_V': voltage,
+            'power_mW': current*voltage,
+        }
+        self.tEnd = self.t[-1] if len(self.t) else np.nan
+        levelData = []
+        def output(level, rec):
+            if len(levelData) < level:
+                levelData.append([])
+            levelData[level-1].append(rec)
+        builder = _PyramidBuilder(output)
+        builder.add(self.t, current, voltage)
+        counts = builder.finish()
+        numLevels = _numRequiredLevels(counts, minBuckets)
+        self.levels = [None] + [np.concatenate(e) for e in levelData[:numLevels]]
+
+    def numLevels(self):
+        return len(self.levels)
+
+    def selectLevel(self, count, maxPoints):
+        '''Coarsest level required to represent count raw samples with at most maxPoints points (2 points (min, max) per bucket).
+        '''
+        if count <= maxPoints:
+            return 0
+        level = int(np.ceil(np.log2(2.*count / maxPoints)))
+        return min(max(level, 1), len(self.levels) - 1)
+
+    def _bucketRange(self, t0, t1):
+        '''Range of raw sample indices (raw samples available) or of level 1 buckets within the time window (incl. one sample/bucket before and after the window).
+        '''
+        t = self.t if self.t is not None else self.levels[1]['t']
+        offset = 0. if self.t is not None else self.timeOffset
+        i0 = 0 if t0 is None else max(int(np.searchsorted(t, t0 + offset, side='right')) - 1, 0)
+        i1 = len(t) if t1 is None else min(int(np.searchsorted(t, t1 + offset, side='left')) + 1, len(t))
+        return i0, max(i0, i1)
+
+    def window(self, t0=None, t1=None, maxPoints=4000):
+        '''Get the power trace within a time window with at most (approx.) maxPoints points.
+        If the window contains more than maxPoints raw samples, two points (min and max) per bucket of the selected level are returned (envelope).
+        Args:
+            t0:        start of time window (default: start of trace)
+            t1:        end of time window (default: end of trace)
+            maxPoints: maximum number of returned points
+        Returns:
+            Tuple (level, dict with numpy arrays t, current_mA, voltage_V, power_mW)
+        '''
+        i0, i1 = self._bucketRange(t0, t1)
+        if self.t is not None:
+            level = self.selectLevel(i1 - i0, maxPoints)
+            if level == 0:
+                ret = {'t': self.t[i0:i1]}
+                for c in pyramidChannels:
+                    ret[c] = self.raw[c][i0:i1]
+                return level, ret
+            shift = level
+        else:
+            # without raw samples, level 1 is the finest level
+            level = max(1, self.selectLevel(2*(i1 - i0), maxPoints))
+            shift = level - 1
+
+        levelData = self.levels[level]
+        j0 = i0 >> shift
+        j1 = ((i1 - 1) >> shift) + 1 if i1 > i0 else j0
+        tStart = levelData['t'][j0:j1] - self.timeOffset
+        tNext = np.append(levelData['t'][j0+1:j1+1] - self.timeOffset, self.tEnd - self.timeOffset)[:len(tStart)]
+        # points of a bucket: min at start, max in the middle of the bucket
+        ret = {'t': np.vstack((tStart, 0.5*(tStart + tNext))).reshape((-1,), order='F')}
+        for c in pyramidChannels:
+            ret[c] = np.vstack((levelData[c + '_min'][j0:j1], levelData[c + '_max'][j0:j1])).reshape((-1,), order='F').astype(float)
+        return level, ret
+
+    def stats(self, t0=None, t1=None, maxBuckets=PYRAMID_MIN_BUCKETS):
+        '''Approximate statistics of a time window, computed from the finest level with at most maxBuckets buckets within the window (buckets at the borders of the window are weighted with their overlap).
+        Args:
+            t0:         start of time window (default: start of trace)
+            t1:         end of time window (default: end of trace)
+            maxBuckets: max number of buckets processed
+        Returns:
+            dict with duration, energy_mJ, charge_mC, and min/max/mean (time weighted) per channel
+        '''
+        i0, i1 = self._bucketRange(t0, t1)
+        count = (i1 - i0) if self.t is not None else 2*(i1 - i0)
+        level = max(1, min(int(np.ceil(np.log2(max(count, 1) / maxBuckets))), len(self.levels) - 1))
+        shift = level if self.t is not None else level - 1
+        levelData = self.levels[level]
+        j0 = i0 >> shift
+        j1 = ((i1 - 1) >> shift) + 1 if i1 > i0 else j0
+        tStart = levelData['t'][j0:j1] - self.timeOffset
+        tNext = np.append(levelData['t'][j0+1:j1+1] - self.timeOffset, self.tEnd - self.timeOffset)[:len(tStart)]
+        lo = tStart if t0 is None else np.maximum(tStart, t0)
+        hi = tNext if t1 is None else np.minimum(tNext, t1)
+        weight = np.maximum(hi - lo, 0.)
+        duration = weight.sum()
+        ret = OrderedDict([('duration', duration)])
+        for c in pyramidChannels:
+            mean = levelData[c + '_mean'][j0:j1].astype(float)
+            integral = np.sum(mean * weight)
+            if c == 'power_mW':
+                ret['energy_mJ'] = integral
+            elif c == 'current_mA':
+                ret['charge_mC'] = integral
+            ret[c + '_mean'] = integral / duration if duration > 0 else np.nan
+            ret[c + '_min'] = levelData[c + '_min'][j0:j1].min() if j1 > j0 else np.nan
+            ret[c + '_max'] = levelData[c + '_max'][j0:j1].max() if j1 > j0 else np.nan
+        return ret
+
+
+def gpioDensityLevels(edgesNode, origin, minBuckets=PYRAMID_MIN_BUCKETS):
+    '''Computes the GPIO edge density levels of a single node (number of edges per pin and bucket, only non-empty buckets).
+    Args:
+        edgesNode:  GPIO edges of a single node (see gpioEdges())
+        origin:     start time of bucket 0 (all levels)
+        minBuckets: levels are added until the coarsest level spans at most minBuckets buckets
+    Returns:
+        list of arrays of gpioDensityDtype (index k: level k, bucket width GPIO_DENSITY_BASE_WIDTH * 2**k)
+    '''
+    bucket = np.floor((edgesNode.timestamp.to_numpy() - origin) / GPIO_DENSITY_BASE_WIDTH).astype(np.int64)
+    pins = pd.Categorical(edgesNode.pin_name, categories=pinOrdering).codes
+    levels = []
+    while True:
+        uniqueBuckets, inverse = np.unique(bucket, return_inverse=True)
+        counts = np.zeros((len(uniqueBuckets), len(pinOrdering)), dtype=np.uint32)
+        np.add.at(counts, (inverse, pins), 1)
+        levelData = np.empty(len(uniqueBuckets), dtype=gpioDensityDtype)
+        levelData['bucket'] = uniqueBuckets
+        for k, pin in enumerate(pinOrdering):
+            levelData[pin] = counts[:, k]
+        levels.append(levelData)
+        if len(uniqueBuckets) == 0 or uniqueBuckets[-1] - uniqueBuckets[0] < minBuckets:
+            break
+        bucket = bucket >> 1
+    return levels
+
+
+def getPyramidStorePath(resultPath):
+    '''Default location of the pyramid store of a FlockLab result (next to the result directory).
+    '''
+    return os.path.normpath(resultPath) + '.pyramid'
+
+
+def _sourceFiles(resultPath):
+    '''Trace files the pyramid store is computed from (incl. size and modification time to detect changes).
+    '''
+    files = [os.path.join(resultPath, 'powerprofiling.csv'), os.path.join(resultPath, 'gpiotracing.csv')] + [e[0] for e in getRldFiles(resultPath)]
+    return OrderedDict([(os.path.basename(f), [os.path.getsize(f), os.path.getmtime(f)]) for f in files if os.path.isfile(f)])
+
+
+def _isPyramidStore(storePath):
+    '''Checks whether a directory is a pyramid store (meta data with version, see buildPyramidStore()).
+    '''
+    try:
+        with open(os.path.join(storePath, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return isinstance(meta, dict) and 'version' in meta
+
+
+def _powerLevelFile(storePath, nodeId, level):
+    return os.path.join(storePath, 'power.{}.{}.bin'.format(nodeId, level))
+
+
+def _gpioLevelFile(storePath, nodeId, level):
+    return os.path.join(storePath, 'gpio.{}.{}.bin'.format(nodeId, level))
+
+
+class _LevelFileWriter():
+    '''Appends the levels of a power pyramid to one binary file per level.
+    '''
+    def __init__(self, storePath, nodeId):
+        self.storePath = storePath
+        self.nodeId = nodeId
+        self.files = []
+
+    def __call__(self, level, rec):
+        while len(self.files) < level:
+            self.files.append(open(_powerLevelFile(self.storePath, self.nodeId, len(self.files) + 1), 'wb'))
+        self.files[level-1].write(rec.tobytes())
+
+    def close(self, numLevels):
+        for f in self.files:
+            f.close()
+        # remove levels which are coarser than required
+        for level in range(numLevels + 1, len(self.files) + 1):
+            os.remove(_powerLevelFile(self.storePath, self.nodeId, level))
+
+
+def _buildRldPyramidWorker(args):
+    '''Builds the power pyramid of a single RocketLogger data file (executed in worker process).
+    '''
+    rldFile, storePath, nodeId, minBuckets, chunkSize = args
+    writer = _LevelFileWriter(storePath, nodeId)
+    builder = _PyramidBuilder(writer)
+    for ts, current, voltage in iterRldChunks(rldFile, chunkSize=chunkSize):
+        builder.add(ts, current, voltage)
+    counts = builder.finish()
+    numLevels = _numRequiredLevels(counts, minBuckets)
+    writer.close(numLevels)
+    return numLevels, builder.numSamples, builder.tEnd
+
+
+def buildPyramidStore(resultPath, storePath=None, minBuckets=PYRAMID_MIN_BUCKETS, processes=None, chunkSize=DEFAULT_CHUNK_SIZE):
+    '''Precomputes the multi-resolution pyramids of a FlockLab result and writes them to a pyramid store (directory with binary files and meta data).
+    The store is built in a temporary directory next to storePath and replaces an existing store only once it is complete. An existing storePath which is not a pyramid store is not touched (error).
+    Power: min/max/mean of current, voltage and power at power-of-two bucket sizes per node (see PowerPyramid), computed in a single streaming pass.
+    GPIO: number of edges per pin at power-of-two bucket widths per node (see gpioDensityLevels()).
+    Args:
+        resultPath: path to the flocklab results (unzipped)
+        storePath:  path of the pyramid store (default: see getPyramidStorePath())
+        minBuckets: levels are added until the coarsest level contains at most minBuckets buckets
+        processes:  number of worker processes for .rld files (default: number of CPUs, 1: no process pool)
+        chunkSize:  approximate number of samples processed at once
+    Returns:
+        PyramidStore object
+    '''
+    resultPath = os.path.normpath(resultPath)
+    if storePath is None:
+        storePath = getPyramidStorePath(resultPath)
+    storePath = os.path.normpath(storePath)
+    if os.path.lexists(storePath) and not (os.path.isdir(storePath) and not os.path.islink(storePath) and _isPyramidStore(storePath)):
+        raise FlocklabError('ERROR: {} exists and is not a pyramid store (not replaced)!'.format(storePath))
+    buildPath = tempfile.mkdtemp(prefix=os.path.basename(storePath) + '.', suffix='.tmp', dir=os.path.dirname(os.path.abspath(storePath)))
+    try:
+        # mkdtemp() creates the directory with permissions 0700 -> default permissions
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(buildPath, 0o777 & ~umask)
+        _buildPyramidStore(resultPath, buildPath, minBuckets, processes, chunkSize)
+        if os.path.lexists(storePath):
+            # swap in the new store (a non-empty directory cannot be replaced directly)
+            oldPath = buildPath + '.old'
+            os.replace(storePath, oldPath)
+            os.replace(buildPath, storePath)
+            shutil.rmtree(oldPath)
+        else:
+            os.replace(buildPath, storePath)
+    finally:
+        if os.path.isdir(buildPath):
+            shutil.rmtree(buildPath)
+    return PyramidStore(storePath)
+
+
+def _buildPyramidStore(resultPath, storePath, minBuckets, processes, chunkSize):
+    '''Writes the pyramid store of a FlockLab result to the (empty) directory storePath (see buildPyramidStore()).
+    '''
+    meta = OrderedDict([
+        ('version', PYRAMID_STORE_VERSION),
+        ('sources', _sourceFiles(resultPath)),
+        ('minBuckets', minBuckets),
+        ('power', OrderedDict()),
+        ('gpio', None),
+    ])
+
+    ## power
+    powerPath = os.path.join(resultPath, 'powerprofiling.csv')
+    if os.path.isfile(powerPath):
+        # single pass over csv file (contains all nodes)
+        builders = OrderedDict()
+        for chunk in iterCsvChunks(powerPath, chunkSize=chunkSize):
+            for (nodeId, obsId), nodeGrp in chunk.groupby(['node_id', 'observer_id'], sort=False):
+                if not nodeId in builders:
+                    writer = _LevelFileWriter(storePath, nodeId)
+                    builders[nodeId] = (obsId, writer, _PyramidBuilder(writer))
+                ts = nodeGrp.timestamp.to_numpy()
+                if np.any(np.diff(ts) < 0) or ts[0] < builders[nodeId][2].tEnd:
+                    raise FlocklabError('ERROR: Power profiling data of node {} is not sorted by time!'.format(nodeId))
+                builders[nodeId][2].add(ts, nodeGrp.current_mA.to_numpy(), nodeGrp.voltage_V.to_numpy())
+        powerNodes = []
+        for nodeId, (obsId, writer, builder) in builders.items():
+            numLevels = _numRequiredLevels(builder.finish(), minBuckets)
+            writer.close(numLevels)
+            powerNodes.append((nodeId, obsId, numLevels, builder.numSamples, builder.tEnd))
+    else:
+        rldFiles = getRldFiles(resultPath)
+        workerArgs = [(rldFile, storePath, nodeId, minBuckets, chunkSize) for rldFile, _, nodeId in rldFiles]
+        if processes == 1 or len(workerArgs) <= 1:
+            results = [_buildRldPyramidWorker(e) for e in workerArgs]
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                results = list(executor.map(_buildRldPyramidWorker, workerArgs))
+        powerNodes = [(nodeId, obsId) + ret for (_, obsId, nodeId), ret in zip(rldFiles, results)]
+    for nodeId, obsId, numLevels, numSamples, tEnd in sorted(powerNodes):
+        if numSamples == 0:
+            continue
+        meta['power'][str(nodeId)] = OrderedDict([
+            ('observer_id', int(obsId)),
+            ('levels', int(numLevels)),
+            ('samples', int(numSamples)),
+            ('tStart', float(np.fromfile(_powerLevelFile(storePath, nodeId, 1), dtype=pyramidDtype, count=1)['t'][0])),
+            ('tEnd', float(tEnd)),
+        ])
+
+    ## gpio
+    gpioDf = readGpioTracing(resultPath)
+    if gpioDf is not None and len(gpioDf) > 0:
+        edges = gpioEdges(gpioDf)
+        origin = float(np.floor(gpioDf.timestamp.min()))
+        meta['gpio'] = OrderedDict([('origin', origin), ('baseWidth', GPIO_DENSITY_BASE_WIDTH), ('levels', OrderedDict())])
+        for nodeId, edgesNode in edges.groupby('node_id', sort=True):
+            levels = gpioDensityLevels(edgesNode, origin, minBuckets=minBuckets)
+            for level, levelData in enumerate(levels):
+                levelData.tofile(_gpioLevelFile(storePath, nodeId, level))
+            meta['gpio']['levels'][str(nodeId)] = len(levels)
+
+    # meta data is written last (store is incomplete without it)
+    with open(os.path.join(storePath, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+
+class PyramidStore():
+    '''Read access to a pyramid store (see buildPyramidStore()). Levels are memory mapped, i.e. only the requested parts are read from disk.
+    '''
+    def __init__(self, storePath):
+        '''
+        Args:
+            storePath: path of the pyramid store
+        '''
+        metaPath = os.path.join(storePath, 'meta.json')
+        if not os.path.isfile(metaPath):
+            raise FlocklabError('ERROR: Pyramid store {} does not exist or is incomplete!'.format(storePath))
+        with open(metaPath, 'r') as f:
+            self.meta = json.load(f, object_pairs_hook=OrderedDict)
+        if self.meta.get('version') != PYRAMID_STORE_VERSION:
+            raise FlocklabError('ERROR: Pyramid store {} has an unsupported version!'.format(storePath))
+        self.storePath = storePath
+
+    def isCurrent(self, resultPath):
+        '''Checks whether the store was built from the current trace files of a result directory.
+        '''
+        return json.loads(json.dumps(_sourceFiles(resultPath))) == self.meta['sources']
+
+    def powerNodes(self):
+        return [int(e) for e in self.meta['power'].keys()]
+
+    def gpioNodes(self):
+        return [int(e) for e in self.meta['gpio']['levels'].keys()] if self.meta['gpio'] else []
+
+    def powerStart(self):
+        '''First timestamp of the power data of all nodes (None if not available).
+        '''
+        return min([e['tStart'] for e in self.meta['power'].values()]) if self.meta['power'] else None
+
+    def powerLevel(self, nodeId, level):
+        '''Memory mapped level (array of pyramidDtype) of the power pyramid of a node.
+        '''
+        return np.memmap(_powerLevelFile(self.storePath, nodeId, level), dtype=pyramidDtype, mode='r')
+
+    def powerPyramid(self, nodeId, timeOffset=0.):
+        '''Power pyramid of a node (memory mapped, see PowerPyramid).
+        Args:
+            nodeId:     node ID
+            timeOffset: offset subtracted from all timestamps (e.g. reference time of the visualization)
+        '''
+        nodeMeta = self.meta['power'].get(str(nodeId))
+        if nodeMeta is None:
+            raise FlocklabError('ERROR: No power profiling data available for node {}!'.format(nodeId))
+        levels = [self.powerLevel(nodeId, level) for level in range(1, nodeMeta['levels'] + 1)]
+        return PowerPyramid(levels=levels, tEnd=nodeMeta['tEnd'], timeOffset=timeOffset)
+
+    def gpioDensity(self, nodeId, t0=None, t1=None, maxBuckets=PYRAMID_MIN_BUCKETS):
+        '''Number of GPIO edges per pin in a time window, from the finest level with at most maxBuckets buckets in the window. Only non-empty buckets are returned.
+        Args:
+            nodeId:     node ID
+            t0:         start of time window (absolute time in s, default: start of trace)
+            t1:         end of time window (absolute time in s, default: end of trace)
+            maxBuckets: max number of buckets within the window
+        Returns:
+            pandas dataframe with columns timestamp (start of bucket), width and one column per pin
+        '''
+        gpioMeta = self.meta['gpio']
+        if gpioMeta is None or not str(nodeId) in gpioMeta['levels']:
+            raise FlocklabError('ERROR: No GPIO tracing data available for node {}!'.format(nodeId))
+        numLevels = gpioMeta['levels'][str(nodeId)]
+        origin = gpioMeta['origin']
+        baseWidth = gpioMeta['baseWidth']
+        if t0 is None or t1 is None:
+            coarsest = np.memmap(_gpioLevelFile(self.storePath, nodeId, numLevels - 1), dtype=gpioDensityDtype, mode='r')
+            if len(coarsest) == 0:
+                return pd.DataFrame(columns=['timestamp', 'width'] + pinOrdering)
+            width = baseWidth * 2**(numLevels - 1)
+            t0 = origin + coarsest['bucket'][0]*width if t0 is None else t0
+            t1 = origin + (coarsest['bucket'][-1] + 1)*width if t1 is None else t1
+        level = int(np.ceil(np.log2(max((t1 - t0) / (baseWidth * maxBuckets), 1.))))
+        level = min(level, numLevels - 1)
+        width = baseWidth * 2**level
+        levelData = np.memmap(_gpioLevelFile(self.storePath, nodeId, level), dtype=gpioDensityDtype, mode='r')
+        b0 = int(np.floor((t0 - origin) / width))
+        b1 = int(np.floor((t1 - origin) / width))
+        j0 = np.searchsorted(levelData['bucket'], b0, side='left')
+        j1 = np.searchsorted(levelData['bucket'], b1, side='right')
+        ret = pd.DataFrame({'timestamp': origin + levelData['bucket'][j0:j1]*width, 'width': width})
+        for pin in pinOrdering:
+            ret[pin] = levelData[pin][j0:j1]
+        return ret
+
+    def powerSummary(self, tStart=None, tEnd=None):
+        '''Approximate power statistics per node from the pyramid (see PowerPyramid.stats(), no percentiles).
+        Args:
+            tStart: start of time window (absolute time in s, default: start of test)
+            tEnd:   end of time window (absolute time in s, default: end of test)
+        Returns:
+            pandas dataframe with one row per node
+        '''
+        rows = []
+        for nodeId in self.powerNodes():
+            row = OrderedDict([('node_id', nodeId), ('observer_id', self.meta['power'][str(nodeId)]['observer_id'])])
+            row.update(self.powerPyramid(nodeId).stats(tStart, tEnd))
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+
+def loadPyramidStore(resultPath, storePath=None, build=True, **kwargs):
+    '''Opens the pyramid store of a FlockLab result. The store is (re-)built if it does not exist or is outdated.
+    Args:
+        resultPath: path to the flocklab results (unzipped)
+        storePath:  path of the pyramid store (default: see getPyramidStorePath())
+        build:      build store if it does not exist or is outdated (otherwise None is returned in this case)
+        kwargs:     arguments passed to buildPyramidStore()
+    Returns:
+        PyramidStore object
+    '''
+    if storePath is None:
+        storePath = getPyramidStorePath(resultPath)
+    if os.path.isfile(os.path.join(storePath, 'meta.json')):
+        try:
+            store = PyramidStore(storePath)
+            if store.isCurrent(resultPath):
+                return store
+        except FlocklabError:
+            pass
+    if not build:
+        return None
+    return buildPyramidStore(resultPath, storePath=storePath, **kwargs)
+
+
+###############################################################################
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Copyright (c) 2021, ETH Zurich, Computer Engineering Group (TEC)
+"""
+
+import numpy as np
+import os
+import glob
+import zlib
+import struct
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+from .flocklab import FlocklabError
+from .power import readPowerProfiling
+from .traces import readGpioTracing, readDatatrace
+from .gpio import pinOrdering, gpioPulses, getGpioEndTime
+
+###############################################################################
+# Headless rendering of FlockLab traces to PNG images (without bokeh / browser)
+
+# colors (RGB) of the GPIO pins (same as in the visualization)
+rasterPinColors = {
+    'LED1': (255, 0, 0),
+    'LED2': (0, 128, 0),
+    'LED3': (0, 0, 255),
+    'INT1': (255, 165, 0),
+    'INT2': (135, 206, 250),
+    'SIG1': (0, 250, 154),
+    'SIG2': (147, 112, 219),
+}
+rasterDefaultColor = (128, 128, 128)
+rasterPowerColor = (31, 119, 180)
+rasterDatatraceColors = [(214, 39, 40), (44, 160, 44), (148, 103, 189), (140, 86, 75), (227, 119, 194), (188, 189, 34), (23, 190, 207)]
+
+# layout (in pixels)
+RASTER_LABEL_WIDTH = 40
+RASTER_AXIS_HEIGHT = 24
+RASTER_GPIO_LANE_HEIGHT = 8
+RASTER_POWER_LANE_HEIGHT = 60
+RASTER_DATATRACE_LANE_HEIGHT = 30
+RASTER_NODE_SPACING = 4
+RASTER_FONT_SCALE = 2
+
+# 3x5 pixel font (digits and characters of time axis labels)
+rasterFont = {
+    '0': ['111', '101', '101', '101', '111'],
+    '1': ['010', '110', '010', '010', '111'],
+    '2': ['111', '001', '111', '100', '111'],
+    '3': ['111', '001', '111', '001', '111'],
+    '4': ['101', '101', '111', '001', '001'],
+    '5': ['111', '100', '111', '001', '111'],
+    '6': ['111', '100', '111', '101', '111'],
+    '7': ['111', '001', '001', '001', '001'],
+    '8': ['111', '101', '111', '101', '111'],
+    '9': ['111', '101', '111', '001', '111'],
+    '.': ['000', '000', '000', '000', '010'],
+    '-': ['000', '000', '111', '000', '000'],
+    's': ['000', '011', '100', '001', '110'],
+    ' ': ['000', '000', '000', '000', '000'],
+}
+
+
+def writePng(pngFile, img):
+    '''Writes an RGB image to a PNG file (zlib compressed, no dependencies).
+    Args:
+        pngFile: path of the PNG file
+        img:     image as numpy array (height x width x 3, uint8)
+    '''
+    img = np.ascontiguousarray(img, dtype=np.uint8)
+    height, width = img.shape[:2]
+    # filter type 0 (none) at the beginning of each row
+    raw = np.concatenate([np.zeros((height, 1), dtype=np.uint8), img.reshape(height, width*3)], axis=1).tobytes()
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    with open(pngFile, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(raw, 6)))
+        f.write(chunk(b'IEND', b''))
+
+
+def _drawText(img, x, y, text, color=(0, 0, 0)):
+    '''Draws text (characters of rasterFont only) with its top left corner at (x, y).
+    '''
+    s = RASTER_FONT_SCALE
+    for char in text:
+        glyph = np.array([[c == '1' for c in line] for line in rasterFont.get(char, rasterFont[' '])])
+        mask = np.kron(glyph, np.ones((s, s), dtype=bool))
+        region = img[y:y+mask.shape[0], x:x+mask.shape[1]]
+        region[mask[:region.shape[0], :region.shape[1]]] = color
+        x += 4*s
+
+
+def _textWidth(text):
+    return len(text)*4*RASTER_FONT_SCALE
+
+
+def _pixelColumns(t, t0, t1, width):
+    '''Pixel column of each timestamp.
+    '''
+    return np.clip(((t - t0) * (width / (t1 - t0))).astype(np.int64), 0, width - 1)
+
+
+def _columnMinMax(cols, values, width):
+    '''Min and max value per pixel column (reduceat over the samples sorted by column). Columns can be combined keys (e.g. node and column) with width the number of keys.
+    Returns:
+        Tuple (boolean array of columns with samples, min per column, max per column)
+    '''
+    if len(cols) > 1 and np.any(cols[1:] < cols[:-1]):
+        order = np.argsort(cols)
+        cols, values = cols[order], values[order]
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(cols)) + 1))
+    has = np.zeros(width, dtype=bool)
+    vmin = np.zeros(width)
+    vmax = np.zeros(width)
+    if len(cols) > 0:
+        has[cols[starts]] = True
+        vmin[cols[starts]] = np.minimum.reduceat(values, starts)
+        vmax[cols[starts]] = np.maximum.reduceat(values, starts)
+    return has, vmin, vmax
+
+
+def _fillColumnRanges(lane, has, low, high, color):
+    '''Fills pixel rows low..high (relative values 0..1, 0: bottom of lane) of all columns with samples.
+    '''
+    height = lane.shape[0]
+    top = np.round((1 - high) * (height - 1)).astype(np.int64)
+    bottom = np.round((1 - low) * (height - 1)).astype(np.int64)
+    rows = np.arange(height)[:, np.newaxis]
+    mask = has[np.newaxis, :] & (rows >= top[np.newaxis, :]) & (rows <= bottom[np.newaxis, :])
+    lane[mask] = color
+
+
+def _niceStep(span, numTicks=8):
+    '''Step between ticks (1, 2 or 5 times a power of 10).
+    '''
+    rough = span / numTicks
+    magnitude = 10**np.floor(np.log10(rough))
+    for factor in [1, 2, 5, 10]:
+        if factor*magnitude >= rough:
+            return factor*magnitude
+    return 10*magnitude
+
+
+def rasterizeTraces(gpioDf=None, powerDf=None, datatraceDf=None, width=1600, tStart=None, tEnd=None, showPps=False, showRst=False):
+    '''Renders the GPIO, power and datatrace tracks of all nodes into an RGB image (one block of lanes per node, time axis at the top).
+    Samples are binned into pixel columns (vectorized), i.e. the rendering time depends on the number of samples but not on the number of edges per pixel.
+    Args:
+        gpioDf:      GPIO trace as pandas dataframe (see readGpioTracing())
+        powerDf:     power profiling data as pandas dataframe (see readPowerProfiling())
+        datatraceDf: datatrace data as pandas dataframe (see readDatatrace())
+        width:       width of the image in pixels
+        tStart:      start of the time axis (absolute time in s, default: first timestamp of all data)
+        tEnd:        end of the time axis (absolute time in s, default: last timestamp of all data)
+        showPps:     include PPS signal
+        showRst:     include nRST signal
+    Returns:
+        image as numpy array (height x width x 3, uint8)
+    '''
+    gpioAvailable = gpioDf is not None and len(gpioDf) > 0
+    powerAvailable = powerDf is not None and len(powerDf) > 0
+    datatraceAvailable = datatraceDf is not None and len(datatraceDf) > 0
+    if not (gpioAvailable or powerAvailable or datatraceAvailable):
+        raise FlocklabError('ERROR: No data for rendering available!')
+
+    # GPIO pulses (HIGH phases) of the plotted pins
+    pins = []
+    if gpioAvailable:
+        gpioPins = [pin for pin in pinOrdering if (pin != 'nRST' or showRst) and (pin != 'PPS' or showPps)]
+        pulses = gpioPulses(gpioDf, tEnd=getGpioEndTime(gpioDf))
+        pulses = pulses[pulses.pin_name.isin(gpioPins)]
+        pins = [pin for pin in gpioPins if pin in set(pulses.pin_name)]
+
+    # time axis
+    starts = []
+    ends = []
+    for df in [gpioDf if gpioAvailable else None, powerDf if powerAvailable else None, datatraceDf if datatraceAvailable else None]:
+        if df is not None:
+            starts.append(df.timestamp.min())
+            ends.append(df.timestamp.max())
+    t0 = min(starts) if tStart is None else tStart
+    t1 = max(ends) if tEnd is None else tEnd
+    if t1 <= t0:
+        t1 = t0 + 1.
+
+    nodeIds = set()
+    for df in [gpioDf if gpioAvailable else None, powerDf if powerAvailable else None, datatraceDf if datatraceAvailable else None]:
+        if df is not None:
+            nodeIds |= set(df.node_id.unique().tolist())
+    nodeIds = sorted(nodeIds)
+
+    # only data within the time axis is drawn (samples outside would be clipped into the first / last pixel column), pulses overlapping with the border are cut
+    if gpioAvailable:
+        pulses = pulses[(np.nan_to_num(pulses.end.to_numpy(), nan=t1) >= t0) & (pulses.start.to_numpy() <= t1)]
+    if powerAvailable:
+        ts = powerDf.timestamp.to_numpy()
+        powerDf = powerDf[(ts >= t0) & (ts <= t1)]
+    if datatraceAvailable:
+        ts = datatraceDf.timestamp.to_numpy()
+        datatraceDf = datatraceDf[(ts >= t0) & (ts <= t1)]
+
+    # height of the block of each node
+    nodeHeight = len(pins)*RASTER_GPIO_LANE_HEIGHT + (RASTER_POWER_LANE_HEIGHT if powerAvailable else 0) + (RASTER_DATATRACE_LANE_HEIGHT if datatraceAvailable else 0)
+    plotWidth = width - RASTER_LABEL_WIDTH
+    height = RASTER_AXIS_HEIGHT + len(nodeIds)*(nodeHeight + RASTER_NODE_SPACING)
+    img = np.full((height, width, 3), 255, dtype=np.uint8)
+
+    # time axis (relative time, ticks and labels)
+    step = _niceStep(t1 - t0)
+    ticks = np.arange(0, t1 - t0 + step/2, step)
+    tickCols = RASTER_LABEL_WIDTH + _pixelColumns(t0 + ticks, t0, t1, plotWidth)
+    img[RASTER_AXIS_HEIGHT - 2, RASTER_LABEL_WIDTH:] = 0
+    img[RASTER_AXIS_HEIGHT - 6:RASTER_AXIS_HEIGHT - 2, tickCols] = 0
+    img[RASTER_AXIS_HEIGHT:, tickCols] = 235
+    for tick, col in zip(ticks, tickCols):
+        label = '{:g}'.format(round(tick, 9)) + ('s' if tick == 0 else '')
+        x = min(max(col - _textWidth(label)//2, RASTER_LABEL_WIDTH), width - _textWidth(label))
+        _drawText(img, x, 2, label)
+
+    # aggregate all nodes at once (key: node, lane and pixel column)
+    numNodes = len(nodeIds)
+    nodeIdArray = np.asarray(nodeIds)
+    if gpioAvailable:
+        # columns in which the signals are HIGH (difference arrays over the pulse column ranges)
+        sortedPins = np.array(sorted(pins))
+        pinIdx = np.array([pins.index(pin) for pin in sortedPins])[np.searchsorted(sortedPins, pulses.pin_name.to_numpy())]
+        key = (np.searchsorted(nodeIdArray, pulses.node_id.to_numpy())*len(pins) + pinIdx)*(plotWidth + 1)
+        startCols = _pixelColumns(pulses.start.to_numpy(), t0, t1, plotWidth)
+        endCols = _pixelColumns(np.nan_to_num(pulses.end.to_numpy(), nan=t1), t0, t1, plotWidth)
+        size = numNodes*len(pins)*(plotWidth + 1)
+        diff = np.bincount(key + startCols, minlength=size) - np.bincount(key + endCols + 1, minlength=size)
+        gpioHigh = np.cumsum(diff.reshape((numNodes, len(pins), plotWidth + 1)), axis=2)[:, :, :plotWidth] > 0
+    if powerAvailable:
+        key = np.searchsorted(nodeIdArray, powerDf.node_id.to_numpy())*plotWidth + _pixelColumns(powerDf.timestamp.to_numpy(), t0, t1, plotWidth)
+        powerHas, powerMin, powerMax = [e.reshape((numNodes, plotWidth)) for e in _columnMinMax(key, powerDf.current_mA.to_numpy()*powerDf.voltage_V.to_numpy(), numNodes*plotWidth)]
+    if datatraceAvailable:
+        variables, varIdx = np.unique(datatraceDf.variable.astype(str).to_numpy(), return_inverse=True)
+        values = datatraceDf.value.to_numpy(dtype=float)
+        # normalize to the value range of each variable
+        varMin = np.full(len(variables), np.inf)
+        varMax = np.full(len(variables), -np.inf)
+        np.minimum.at(varMin, varIdx, values)
+        np.maximum.at(varMax, varIdx, values)
+        varRange = varMax - varMin
+        values = np.where(varRange[varIdx] > 0, (values - varMin[varIdx]) / np.where(varRange > 0, varRange, 1)[varIdx], 0.5)
+        key = (np.searchsorted(nodeIdArray, datatraceDf.node_id.to_numpy())*len(variables) + varIdx)*plotWidth + _pixelColumns(datatraceDf.timestamp.to_numpy(), t0, t1, plotWidth)
+        datatraceHas, datatraceMin, datatraceMax = [e.reshape((numNodes, len(variables), plotWidth)) for e in _columnMinMax(key, values, numNodes*len(variables)*plotWidth)]
+
+    y = RASTER_AXIS_HEIGHT
+    for k, nodeId in enumerate(nodeIds):
+        block = img[y + RASTER_NODE_SPACING//2:y + RASTER_NODE_SPACING//2 + nodeHeight, RASTER_LABEL_WIDTH:]
+        block[:] = 248
+        _drawText(img, 4, y + RASTER_NODE_SPACING//2 + max(0, (nodeHeight - 5*RASTER_FONT_SCALE)//2), str(nodeId))
+        laneY = 0
+        # GPIO lanes
+        for pinIdx, pin in enumerate(pins):
+            lane = block[laneY:laneY + RASTER_GPIO_LANE_HEIGHT]
+            laneY += RASTER_GPIO_LANE_HEIGHT
+            lane[1:-1, gpioHigh[k, pinIdx]] = rasterPinColors.get(pin, rasterDefaultColor)
+        # power lane: min/max envelope of the power per column (scaled to the max of the node)
+        if powerAvailable:
+            lane = block[laneY:laneY + RASTER_POWER_LANE_HEIGHT]
+            laneY += RASTER_POWER_LANE_HEIGHT
+            has = powerHas[k]
+            scale = powerMax[k][has].max() if has.any() else 0
+            scale = scale if scale > 0 else 1.
+            _fillColumnRanges(lane, has, np.clip(powerMin[k] / scale, 0, 1), np.clip(powerMax[k] / scale, 0, 1), rasterPowerColor)
+        # datatrace lane: min/max envelope of each variable
+        if datatraceAvailable:
+            lane = block[laneY:laneY + RASTER_DATATRACE_LANE_HEIGHT]
+            laneY += RASTER_DATATRACE_LANE_HEIGHT
+            for varIdx in range(len(variables)):
+                _fillColumnRanges(lane, datatraceHas[k, varIdx], datatraceMin[k, varIdx], datatraceMax[k, varIdx], rasterDatatraceColors[varIdx % len(rasterDatatraceColors)])
+        y += nodeHeight + RASTER_NODE_SPACING
+
+    return img
+
+
+def rasterizeFlocklabTrace(resultPath, pngFile=None, width=1600, showPps=False, showRst=False):
+    '''Renders FlockLab results (GPIO, power and datatrace tracks of all nodes) to a PNG file without bokeh / browser (e.g. for CI reports).
+    Args:
+        resultPath: path to the flocklab results (unzipped)
+        pngFile:    path of the PNG file (default: flocklab_plot_<testid>.png in the current working directory)
+        width:      width of the image in pixels
+        showPps:    include PPS signal
+        showRst:    include nRST signal
+    Returns:
+        path of the PNG file
+    '''
+    resultPath = os.path.normpath(resultPath)
+    if not os.path.isdir(resultPath):
+        raise FlocklabError('ERROR: FlockLab result directory {} does not exist!'.format(resultPath))
+    if pngFile is None:
+        pngFile = os.path.join(os.getcwd(), 'flocklab_plot_{}.png'.format(os.path.basename(os.path.abspath(resultPath))))
+    img = rasterizeTraces(
+        gpioDf=readGpioTracing(resultPath),
+        powerDf=readPowerProfiling(resultPath),
+        datatraceDf=readDatatrace(resultPath),
+        width=width,
+        showPps=showPps,
+        showRst=showRst,
+    )
+    writePng(pngFile, img)
+    return pngFile
+
+
+def _rasterizeWorker(args):
+    '''Renders a single result directory (executed in worker process).
+    '''
+    resultPath, pngFile, kwargs = args
+    try:
+        return rasterizeFlocklabTrace(resultPath, pngFile=pngFile, **kwargs), None
+    except Exception as e:
+        return None, '{}: {}\n{}'.format(type(e).__name__, e, traceback.format_exc())
+
+
+def rasterizeResults(resultPaths, outputDir=None, processes=None, errorReport=False, **kwargs):
+    '''Renders multiple FlockLab test results to PNG files (flocklab_plot_<testid>.png) in parallel (process pool).
+    Args:
+        resultPaths: list of paths to flocklab result directories (unzipped) or a glob pattern (string)
+        outputDir:   directory to store the PNG files in (default: current working directory)
+        processes:   number of worker processes (default: number of CPUs, 1: no process pool)
+        errorReport: if True, errors of single result directories are collected and returned instead of raised
+        kwargs:      arguments passed to rasterizeFlocklabTrace() (width, showPps, showRst)
+    Returns:
+        list of paths of the PNG files
+        if errorReport is True: tuple (list of paths of the PNG files, dict mapping result path to error message)
+    '''
+    if type(resultPaths) == str:
+        # result directories only (e.g. without pyramid stores next to the result directories, see getPyramidStorePath())
+        resultPaths = [e for e in sorted(glob.glob(resultPaths)) if os.path.isdir(e) and not os.path.normpath(e).endswith('.pyramid')]
+    resultPaths = [os.path.normpath(e) for e in resultPaths]
+    if outputDir is None:
+        outputDir = os.getcwd()
+    workerArgs = [(resultPath, os.path.join(outputDir, 'flocklab_plot_{}.png'.format(os.path.basename(os.path.abspath(resultPath)))), kwargs) for resultPath in resultPaths]
+    if processes == 1 or len(resultPaths) <= 1:
+        results = [_rasterizeWorker(e) for e in workerArgs]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = list(executor.map(_rasterizeWorker, workerArgs))
+
+    pngFiles = []
+    errors = {}
+    for resultPath, (pngFile, error) in zip(resultPaths, results):
+        if error is not None:
+            if not errorReport:
+                raise FlocklabError('ERROR: Failed to render result {}: {}'.format(resultPath, error))
+            errors[resultPath] = error
+            continue
+        pngFiles.append(pngFile)
+    if errorReport:
+        return pngFiles, errors
+    return pngFiles
+
+
+###############################################################################
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""
+Copyright (c) 2021, ETH Zurich, Computer Engineering Group (TEC)
+"""
+
+import numpy as np
+import pandas as pd
+import os
+import io
+import re
+import glob
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from .flocklab import Flocklab, FlocklabError
+from .power import readPowerProfiling, getRldFiles, iterRldChunks
+from .csvindex import CsvBlockIndex, readCsvWindow
+
+###############################################################################
+
+requiredGpioCols = ['timestamp', 'node_id', 'pin_name', 'value']
+requiredDatatraceCols = ['timestamp', 'node_id', 'variable', 'value']
+traceSources = ['gpio', 'power', 'datatrace', 'serial']
+# columns with few distinct values which are stored as categorical data in compact tables
+categoricalCols = ['pin_name', 'variable', 'access', 'direction', 'pc']
+
+
+def _readTraceCsv(filePath, requiredCols, tStart=None, tEnd=None, nodes=None, stateKey=None):
+    '''Reads a FlockLab trace csv file (optionally limited to a time window and nodes, see readCsvWindow()) and performs sanity checks.
+    '''
+    fileName = os.path.basename(filePath)
+    if tStart is None and tEnd is None and nodes is None:
+        # Read csv to pandas dataframe (instruct pandas with float_precision to not sacrifice accuracy for the sake of speed)
+        df = pd.read_csv(filePath, float_precision='round_trip')
+    else:
+        df = readCsvWindow(filePath, tStart=tStart, tEnd=tEnd, nodes=nodes, stateKey=stateKey)
+    # sanity check: column names
+    for col in requiredCols:
+        if not col in df.columns:
+            raise FlocklabError('ERROR: Required column ({}) in {} file is missing.'.format(col, fileName))
+    # sanity check node_id data type
+    if len(df) > 0 and not 'int' in str(df.node_id.dtype):
+        raise FlocklabError('ERROR: Trace file ({}) has wrong format!'.format(fileName))
+    return df
+
+
+def readGpioTracing(resultPath, tStart=None, tEnd=None, nodes=None, includeState=False):
+    '''Read the GPIO tracing data (gpiotracing.csv) of a FlockLab test result.
+    Args:
+        resultPath:   path to the flocklab results (unzipped)
+        tStart:       start of time window (absolute time in s, default: start of test)
+        tEnd:         end of time window (absolute time in s, default: end of test)
+        nodes:        list of node IDs (default: all nodes)
+        includeState: preserve the state of the signals at tStart, i.e. signals which are HIGH at tStart get a rising edge at tStart (see gpioWindow()),
+                      the states are determined with the block index (see CsvBlockIndex) without parsing the data before the time window
+    Returns:
+        GPIO trace as pandas dataframe, None if no GPIO tracing data is available
+    '''
+    gpioPath = os.path.join(resultPath, 'gpiotracing.csv')
+    if not os.path.isfile(gpioPath):
+        return None
+    keepState = includeState and tStart is not None
+    gpioDf = _readTraceCsv(gpioPath, requiredGpioCols, tStart=tStart, tEnd=tEnd, nodes=nodes, stateKey='pin_name' if keepState else None)
+    if keepState:
+        # lines before tStart are the last line per node and pin (see readCsvWindow()) -> rising edge at tStart for HIGH signals (same as gpioWindow())
+        before = gpioDf.timestamp.to_numpy() < tStart
+        high = gpioDf[before & (gpioDf.value.to_numpy() == 1)].copy()
+        high['timestamp'] = tStart
+        gpioDf = pd.concat([high, gpioDf[~before]], ignore_index=True)
+    return gpioDf
+
+
+def readDatatrace(resultPath, tStart=None, tEnd=None, nodes=None, mapVariables=False):
+    '''Read the datatrace data (datatrace.csv) of a FlockLab test result.
+    Args:
+        resultPath:   path to the flocklab results (unzipped)
+        tStart:       start of time window (absolute time in s, default: start of test)
+        tEnd:         end of time window (absolute time in s, default: end of test)
+        nodes:        list of node IDs (default: all nodes)
+        mapVariables: replace the variable addresses by the variable names (if available in the custom field of testconfig.xml, see mapDatatraceVariables())
+    Returns:
+        datatrace as pandas dataframe, None if no datatrace data is available
+    '''
+    datatracePath = os.path.join(resultPath, 'datatrace.csv')
+    if not os.path.isfile(datatracePath):
+        return None
+    df = _readTraceCsv(datatracePath, requiredDatatraceCols, tStart=tStart, tEnd=tEnd, nodes=nodes)
+    if mapVariables:
+        df['variable'] = mapDatatraceVariables(df.variable, Flocklab.getDtAddrToVarMap(testConfigFile=resultPath))
+    return df
+
+
+def mapDatatraceVariables(variables, addrToVarMap):
+    '''Maps datatrace variable addresses to variable names. The mapping is applied to the distinct values only (categorical remap), i.e. not per sample.
+    Args:
+        variables:    variable column of a datatrace (see readDatatrace())
+        addrToVarMap: dict mapping variable addresses to variable names (see Flocklab.getDtAddrToVarMap()), unknown addresses are kept
+    Returns:
+        pandas Categorical with the variable names
+    '''
+    cat = pd.Categorical(variables)
+    mapped = [addrToVarMap.get(e, e) for e in cat.categories]
+    categories = sorted(set(mapped))
+    categoryIdx = dict([(e, k) for k, e in enumerate(categories)])
+    lookup = np.array([categoryIdx[e] for e in mapped] + [-1], dtype=np.int64) # missing values (code -1) stay missing
+    return pd.Categorical.from_codes(lookup[cat.codes], categories=categories)
+
+
+def splitDatatrace(datatraceDf, refTime=0., addrToVarMap={}):
+    '''Splits a datatrace into the arrays of the nodes and variables with a single sort (no grouping per node and variable).
+    Args:
+        datatraceDf:  datatrace as pandas dataframe (see readDatatrace())
+        refTime:      reference time (subtracted from all timestamps)
+        addrToVarMap: dict mapping variable addresses to variable names (see Flocklab.getDtAddrToVarMap(), default: addresses are kept)
+    Returns:
+        OrderedDict {nodeId: OrderedDict {variable: {'t': ..., 'value': ..., 'access': ..., 'delay_marker': ...}}} (access and delay_marker only if contained in the datatrace),
+        nodes sorted by node ID, variables sorted by address (variables with the same name are merged, the last one is kept)
+    '''
+    cat = pd.Categorical(datatraceDf.variable)
+    codes = cat.codes
+    nodes = datatraceDf.node_id.to_numpy()
+    t = datatraceDf.timestamp.to_numpy() - refTime
+    order = np.lexsort((t, codes, nodes))
+    nodes, codes, t = nodes[order], codes[order], t[order]
+    cols = OrderedDict([('t', t)] + [(col, datatraceDf[col].to_numpy()[order]) for col in ['value', 'access', 'delay_marker'] if col in datatraceDf.columns])
+    names = [addrToVarMap.get(e, e) for e in cat.categories]
+
+    # row ranges of all (node, variable) groups
+    starts = np.flatnonzero(np.concatenate(([True], (nodes[1:] != nodes[:-1]) | (codes[1:] != codes[:-1]))))
+    ends = np.append(starts[1:], len(nodes))
+    datatraceData = OrderedDict()
+    for start, end, nodeId, code in zip(starts.tolist(), ends.tolist(), nodes[starts].tolist(), codes[starts].tolist()):
+        datatraceData.setdefault(nodeId, OrderedDict())[names[code]] = OrderedDict([(col, val[start:end]) for col, val in cols.items()])
+    return datatraceData
+
+
+def readDatatraceVariables(resultPath, tStart=None, tEnd=None, nodes=None, refTime=0.):
+    '''Read the datatrace data of a FlockLab test result as arrays per node and variable (variable names from testconfig.xml, see splitDatatrace()).
+    Args:
+        resultPath: path to the flocklab results (unzipped)
+        tStart:     start of time window (absolute time in s, default: start of test)
+        tEnd:       end of time window (absolute time in s, default: end of test)
+        nodes:      list of node IDs (default: all nodes)
+        refTime:    reference time (subtracted from all timestamps)
+    Returns:
+        OrderedDict {nodeId: OrderedDict {variable: {'t': ..., 'value': ..., 'access': ..., 'delay_marker': ...}}}, None if no datatrace data is available
+    '''
+    df = readDatatrace(resultPath, tStart=tStart, tEnd=tEnd, nodes=nodes)
+    if df is None:
+        return None
+    return splitDatatrace(df, refTime=refTime, addrToVarMap=Flocklab.getDtAddrToVarMap(testConfigFile=resultPath))
+
+
+def getResultStartTime(resultPath):
+    '''First timestamp of the GPIO tracing, power profiling and datatrace data of a FlockLab test result (reference time of the visualization).
+    Determined with the block indexes of the csv files (see CsvBlockIndex) and the first block of the .rld files, i.e. without reading all data.
+    Args:
+        resultPath: path to the flocklab results (unzipped)
+    Returns:
+        absolute time in s, None if no data is available
+    '''
+    startTimes = []
+    for fileName in ['gpiotracing.csv', 'powerprofiling.csv', 'datatrace.csv']:
+        filePath = os.path.join(resultPath, fileName)
+        if os.path.isfile(filePath):
+            startTimes.append(CsvBlockIndex(filePath).startTime())
+    for rldFile, _, _ in getRldFiles(resultPath):
+        for ts, _, _ in iterRldChunks(rldFile, chunkSize=1):
+            startTimes.append(ts[0])
+            break
+    startTimes = [e for e in startTimes if e is not None]
+    return min(startTimes) if startTimes else None
+
+
+def parseSerialCsv(buf):
+    '''Parses the content of a FlockLab serial logging file (serial.csv) into a pandas dataframe (same result as Flocklab.serial2Df(), but with vectorized operations).
+    The output column can contain commas: the line breaks and the fourth comma of each line are located with numpy, the first four columns are parsed with pandas
+    and the output column is split at the line breaks.
+    Args:
+        buf: content of the serial logging file (bytes)
+    Returns:
+        serial log as pandas dataframe
+    '''
+    # carriage returns are removed (see Flocklab.serial2Df())
+    buf = buf.replace(b'\r', b'')
+    if not buf.endswith(b'\n'):
+        buf += b'\n'
+    headerEnd = buf.index(b'\n') + 1
+    cols = buf[:headerEnd].decode('utf-8', errors='replace').rstrip().split(',')
+    if len(cols) != 5:
+        raise FlocklabError('ERROR: Serial logging file has wrong format!')
+    data = np.frombuffer(buf, dtype=np.uint8)
+    lineBreaks = np.flatnonzero(data == ord('\n'))
+    lineStarts = lineBreaks[:-1] + 1
+    lineEnds = lineBreaks[1:]
+    # empty lines are ignored
+    nonEmpty = lineEnds > lineStarts
+    lineStarts, lineEnds = lineStarts[nonEmpty], lineEnds[nonEmpty]
+    if len(lineStarts) == 0:
+        return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in zip(cols, [float, np.int64, np.int64, object, object])})
+
+    # separator between the first four columns and the output column (fourth comma of each line)
+    commas = np.flatnonzero(data == ord(','))
+    sepIdx = np.searchsorted(commas, lineStarts) + 3
+    valid = sepIdx < len(commas)
+    seps = commas[np.minimum(sepIdx, len(commas) - 1)] if len(commas) > 0 else lineEnds
+    valid &= seps < lineEnds
+    if not np.all(valid):
+        k = np.flatnonzero(~valid)[0]
+        raise FlocklabError('ERROR: line does not contain enough columns: {}'.format(buf[lineStarts[k]:lineEnds[k]].decode('utf-8', errors='replace')))
+
+    # byte masks of the first four columns and of the output column (both incl. line break)
+    delta = np.zeros(len(data) + 1, dtype=np.int8)
+    delta[lineStarts] = 1
+    delta[seps] = -1
+    headMask = np.cumsum(delta[:-1], dtype=np.int8).astype(bool)
+    headMask[lineEnds] = True
+    delta[:] = 0
+    delta[seps + 1] = 1
+    delta[lineEnds + 1] = -1
+    outputMask = np.cumsum(delta[:-1], dtype=np.int8).astype(bool)
+
+    # instruct pandas with float_precision to not sacrifice accuracy for the sake of speed
+    df = pd.read_csv(io.BytesIO(data[headMask].tobytes()), header=None, names=cols[:4], float_precision='round_trip', dtype={cols[3]: str}, na_filter=False)
+    # trailing whitespace is removed (see Flocklab.serial2Df())
+    df[cols[4]] = [line.rstrip() for line in data[outputMask].tobytes().decode('utf-8', errors='replace').split('\n')[:-1]]
+    return df
+
+
+def readSerial(resultPath, tStart=None, tEnd=None, nodes=None, regex=None):
+    '''Read the serial log (serial.csv) of a FlockLab test result (see parseSerialCsv()).
+    Args:
+        resultPath: path to the flocklab results (unzipped)
+        tStart:     start of time window (absolute time in s, default: start of test)
+        tEnd:       end of time window (absolute time in s, default: end of test)
+        nodes:      list of node IDs (default: all nodes)
+        regex:      regular expression, only lines with matching output are returned (default: all lines)
+    Returns:
+        serial log as pandas dataframe, None if no serial logging data is available
+    '''
+    serialPath = os.path.join(resultPath, 'serial.csv')
+    if not os.path.isfile(serialPath):
+        return None
+    if regex is not None:
+        try:
+            regex = re.compile(regex)
+        except re.error as e:
+            raise FlocklabError('ERROR: Invalid regular expression "{}" ({})!'.format(regex, e))
+    if tStart is None and tEnd is None and nodes is None:
+        with open(serialPath, 'rb') as f:
+            df = parseSerialCsv(f.read())
+    else:
+        # only the blocks overlapping with the time window / node subset are parsed (see CsvBlockIndex)
+        index = CsvBlockIndex(serialPath, parser=parseSerialCsv)
+        df = parseSerialCsv(index.header + b''.join(index.iterBlockData(tStart=tStart, tEnd=tEnd, nodes=nodes)))
+    mask = np.ones(len(df), dtype=bool)
+    if tStart is not None:
+        mask &= df.timestamp.to_numpy() >= tStart
+    if tEnd is not None:
+        mask &= df.timestamp.to_numpy() <= tEnd
+    if nodes is not None:
+        mask &= np.isin(df.node_id.to_numpy(), list(nodes))
+    if not np.all(mask):
+        df = df[mask].reset_index(drop=True)
+    if regex is not None:
+        df = df[df.output.str.contains(regex, regex=True).to_numpy(dtype=bool)].reset_index(drop=True)
+    return df
+
+
+def readTrace(resultPath, source):
+    '''Read trace data of a single source of a FlockLab test result.
+    Args:
+        resultPath: path to the flocklab results (unzipped)
+        source:     one of 'gpio', 'power', 'datatrace', 'serial'
+    Returns:
+        trace as pandas dataframe, None if no data is available for the source
+    '''
+    if source == 'gpio':
+        return readGpioTracing(resultPath)
+    elif source == 'power':
+        return readPowerProfiling(resultPath)
+    elif source == 'datatrace':
+        return readDatatrace(resultPath)
+    elif source == 'serial':
+        return readSerial(resultPath)
+    else:
+        raise FlocklabError('ERROR: Unknown trace source "{}" (valid sources: {})!'.format(source, ', '.join(traceSources)))
+
+
+class TraceIndex():
+    '''Per-node time index over a trace dataframe.
+    The dataframe is sorted once by node and timestamp, time window queries are then answered with a binary search (searchsorted) instead of a full scan.
+    '''
+    def __init__(self, df, timeCol='timestamp', nodeCol='node_id'):
+        '''
+        Args:
+            df:      trace as pandas dataframe (e.g. as returned by readGpioTracing())
+            timeCol: name of the timestamp column
+            nodeCol: name of the node ID column
+        '''
+        self.timeCol = timeCol
+        self.nodeCol = nodeCol
+        nodes = df[nodeCol].to_numpy()
+        ts = df[timeCol].to_numpy()
+        order = np.lexsort((ts, nodes))
+        if np.any(np.diff(order) != 1):
+            df = df.iloc[order]
+        self.df = df.reset_index(drop=True)
+        self.t = self.df[timeCol].to_numpy()
+
+        # start/end row of each node
+        nodes = self.df[nodeCol].to_numpy()
+        starts = np.flatnonzero(np.concatenate(([True], nodes[1:] != nodes[:-1]))) if len(nodes) else np.array([], dtype=int)
+        ends = np.append(starts[1:], len(nodes))
+        self._nodeRanges = dict(zip(nodes[starts].tolist(), zip(starts.tolist(), ends.tolist())))
+
+    def __len__(self):
+        return len(self.df)
+
+    def nodes(self):
+        '''Returns sorted list of node IDs contained in the trace.
+        '''
+        return sorted(self._nodeRanges.keys())
+
+    def sliceIdx(self, nodeId, t0=None, t1=None, includePrevious=False):
+        '''Determine row range of the samples of a node within a time window.
+        Args:
+            nodeId:          node ID
+            t0:              start of time window (inclusive, default: start of trace)
+            t1:              end of time window (exclusive, default: end of trace)
+            includePrevious: include the last sample before t0 (e.g. to know the state of a signal at t0)
+        Returns:
+            Tuple (start, stop) of row indices in self.df
+        '''
+        if not nodeId in self._nodeRanges:
+            return (0, 0)
+        start, stop = self._nodeRanges[nodeId]
+        t = self.t[start:stop]
+        i0 = 0 if t0 is None else np.searchsorted(t, t0, side='left')
+        i1 = len(t) if t1 is None else np.searchsorted(t, t1, side='left')
+        if includePrevious and i0 > 0:
+            i0 -= 1
+        return (start + int(i0), start + int(max(i0, i1)))
+
+    def slice(self, nodeId, t0=None, t1=None, includePrevious=False):
+        '''Get all samples of a node within a time window [t0, t1).
+        Args:
+            nodeId:          node ID
+            t0:              start of time window (inclusive, default: start of trace)
+            t1:              end of time window (exclusive, default: end of trace)
+            includePrevious: include the last sample before t0 (e.g. to know the state of a signal at t0)
+        Returns:
+            pandas dataframe (view of the indexed dataframe)
+        '''
+        start, stop = self.sliceIdx(nodeId, t0, t1, includePrevious=includePrevious)
+        return self.df.iloc[start:stop]
+
+    def count(self, nodeId, t0=None, t1=None):
+        '''Number of samples of a node within the time window [t0, t1).
+        '''
+        start, stop = self.sliceIdx(nodeId, t0, t1)
+        return stop - start
+
+
+class ResultIndex():
+    '''Collection of TraceIndex objects (one per trace source) of a FlockLab test result.
+    Sources without data are set to None.
+    '''
+    def __init__(self, resultPath, sources=traceSources):
+        '''
+        Args:
+            resultPath: path to the flocklab results (unzipped)
+            sources:    list of trace sources to load (subset of 'gpio', 'power', 'datatrace', 'serial')
+        '''
+        self.resultPath = resultPath
+        self.gpio = None
+        self.power = None
+        self.datatrace = None
+        self.serial = None
+        for source in sources:
+            df = readTrace(resultPath, source)
+            if df is not None and len(df) > 0:
+                setattr(self, source, TraceIndex(df))
+
+    def __getitem__(self, source):
+        if not source in traceSources:
+            raise KeyError(source)
+        return getattr(self, source)
+
+    def slice(self, source, nodeId, t0=None, t1=None, includePrevious=False):
+        '''Get all samples of a node within a time window [t0, t1) of a trace source (see TraceIndex.slice()).
+        '''
+        index = self[source]
+        if index is None:
+            return None
+        return index.slice(nodeId, t0, t1, includePrevious=includePrevious)
+
+
+def compactTrace(df):
+    '''Reduces the memory footprint of a trace dataframe (downcast of integer columns, categorical columns for strings with few distinct values).
+    Args:
+        df: trace as pandas dataframe
+    Returns:
+        compacted dataframe
+    '''
+    df = df.copy()
+    for col in df.columns:
+        if col in categoricalCols:
+            df[col] = df[col].astype('category')
+        elif col != 'timestamp' and 'int' in str(df[col].dtype):
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+    return df
+
+
+def _readResultWorker(args):
+    '''Reads all requested sources of a single result directory (executed in worker process).
+    '''
+    resultPath, sources, powerSampleRate = args
+    ret = {}
+    try:
+        for source in sources:
+            if source == 'power':
+                df = readPowerProfiling(resultPath, sampleRate=powerSampleRate)
+            else:
+                df = readTrace(resultPath, source)
+            ret[source] = compactTrace(df) if df is not None else None
+    except Exception as e:
+        return None, '{}: {}\n{}'.format(type(e).__name__, e, traceback.format_exc())
+    return ret, None
+
+
+def readResults(resultPaths, sources=traceSources, processes=None, powerSampleRate=None, errorReport=False):
+    '''Read and merge the traces of multiple FlockLab test results. The result directories are parsed in parallel (process pool).
+    Args:
+        resultPaths:     list of paths to flocklab result directories (unzipped) or a glob pattern (string)
+        sources:         list of trace sources to load (subset of 'gpio', 'power', 'datatrace', 'serial')
+        processes:       number of worker processes (default: number of CPUs, 1: no process pool)
+        powerSampleRate: if provided, power profiling data is aggregated to this sample rate (see readPowerProfiling())
+        errorReport:     if True, errors of single result directories are collected and returned instead of raised
+    Returns:
+        dict with one pandas dataframe per source (None if no data is available), each containing an additional column test_id
+        if errorReport is True: tuple (dict of dataframes, dict mapping test_id to error message)
+    '''
+    if type(resultPaths) == str:
+        resultPaths = sorted(glob.glob(resultPaths))
+    resultPaths = [os.path.normpath(e) for e in resultPaths]
+    for source in sources:
+        if not source in traceSources:
+            raise FlocklabError('ERROR: Unknown trace source "{}" (valid sources: {})!'.format(source, ', '.join(traceSources)))
+    testIds = [os.path.basename(os.path.abspath(e)) for e in resultPaths]
+    testIds = [int(e) if e.isnumeric() else e for e in testIds]
+
+    workerArgs = [(resultPath, sources, powerSampleRate) for resultPath in resultPaths]
+    if processes == 1 or len(resultPaths) <= 1:
+        results = [_readResultWorker(e) for e in workerArgs]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = list(executor.map(_readResultWorker, workerArgs))
+
+    errors = {}
+    dfLists = {source: [] for source in sources}
+    for testId, (ret, error) in zip(testIds, results):
+        if error is not None:
+            if not errorReport:
+                raise FlocklabError('ERROR: Failed to read result of test {}: {}'.format(testId, error))
+            errors[testId] = error
+            continue
+        for source in sources:
+            df = ret[source]
+            if df is not None and len(df) > 0:
+                df.insert(0, 'test_id', testId)
+                dfLists[source].append(df)
+
+    tables = {}
+    for source in sources:
+        if not dfLists[source]:
+            tables[source] = None
+            continue
+        df = pd.concat(dfLists[source], ignore_index=True)
+        # categories differ between tests -> concat falls back to object dtype
+        tables[source] = compactTrace(df)
+
+    if errorReport:
+        return tables, errors
+    return tables
+
+
+###############################################################################
+
+if __name__ == "__main__":
+    pass
@@ -12,18 +12,30 @@ import sys
 import glob
 from copy import copy
 import json
-from rocketlogger.data import RocketLoggerData
+import gzip
+import base64
+from concurrent.futures import ProcessPoolExecutor
 
 from bokeh.plotting import figure, show, save, output_file
-from bokeh.models import ColumnDataSource, Plot, Span, BoxAnnotation, CrosshairTool, HoverTool, CustomJS, Div, Select, CheckboxButtonGroup, CustomJSHover
-from bokeh.models.glyphs import VArea, Line, Circle, Step
+from bokeh.io.state import curstate
+from bokeh.models import ColumnDataSource, Plot, Span, BoxAnnotation, CrosshairTool, HoverTool, CustomJS, Div, Select, CheckboxButtonGroup, CustomJSHover, CustomJSTransform
+from bokeh.models import RadioButtonGroup, LinearColorMapper, FixedTicker
+from bokeh.palettes import Viridis256
+from bokeh.models.glyphs import VArea, Line, Circle, Step, Quad
 from bokeh.models.renderers import GlyphRenderer
-from bokeh.models.ranges import DataRange1d
+from bokeh.models.ranges import DataRange1d, Range1d
 from bokeh.layouts import gridplot, row, column, layout, Spacer
 from bokeh.colors.named import red, green, blue, orange, lightskyblue, mediumpurple, mediumspringgreen, grey
 from bokeh.events import Tap, DoubleTap, ButtonClick
+from bokeh.transform import dodge, transform
+from bokeh.util.browser import view
 
 from .flocklab import FlocklabError
+from .power import readPowerProfiling
+from .traces import readGpioTracing, readDatatrace, readSerial, getResultStartTime, splitDatatrace
+from .gpio import pinOrdering, gpioPinCodes, getGpioEndTime, gpioEdges
+from .pyramid import PowerPyramid, loadPyramidStore
+from .cache import VisualizationCache
 from flocklab import Flocklab
 fl = Flocklab()
 
@@ -35,32 +47,50 @@ warnings.filterwarnings("ignore", category=BokehDeprecationWarning)
 ###############################################################################
 
 def addLinkedCrosshairs(plots):
+    # single callback shared by all plots (cb_obj.origin is the plot in which the mouse moves), sets the crosshairs of all other plots
+    # (the callbacks do not reference the plots, otherwise each plot would reference all other plots and traversing the model graph of a plot would be quadratic)
     js_move = '''
+        var plot = cb_obj.origin
+        var ownTools = plot.toolbar.tools
         var start_x = plot.x_range.start
         var end_x = plot.x_range.end
         var start_y = plot.y_range.start
         var end_y = plot.y_range.end
+        var crossLocation = null
         if(cb_obj.x>=start_x && cb_obj.x<=end_x && cb_obj.y>=start_y && cb_obj.y<=end_y) {
-            cross.spans.height.computed_location=cb_obj.sx
+            crossLocation = cb_obj.sx
         }
-        else {
-            cross.spans.height.computed_location = null
+        for (var k=0; k<crosses.length; k++) {
+            if (!ownTools.includes(crosses[k])) {
+                crosses[k].spans.height.computed_location = crossLocation
+            }
         }
     '''
         # if(cb_obj.y>=start && cb_obj.y<=end && cb_obj.x>=start && cb_obj.x<=end)
         #     { cross.spans.width.computed_location=cb_obj.sy  }
         # else { cross.spans.width.computed_location=null }
     # '''
-    js_leave = '''cross.spans.height.computed_location=null; cross.spans.width.computed_location=null'''
+    js_leave = '''
+        var ownTools = cb_obj.origin.toolbar.tools
+        for (var k=0; k<crosses.length; k++) {
+            if (!ownTools.includes(crosses[k])) {
+                crosses[k].spans.height.computed_location = null
+                crosses[k].spans.width.computed_location = null
+            }
+        }
+    '''
 
+    crosshairs = []
     for currPlot in plots:
         crosshair = CrosshairTool(dimensions = 'height')
         currPlot.add_tools(crosshair)
-        for plot in plots:
-            if plot != currPlot:
-                args = {'cross': crosshair, 'plot': plot}
-                plot.js_on_event('mousemove', CustomJS(args = args, code = js_move))
-                plot.js_on_event('mouseleave', CustomJS(args = args, code = js_leave))
+        crosshairs.append(crosshair)
+    args = {'crosses': crosshairs}
+    moveCallback = CustomJS(args = args, code = js_move)
+    leaveCallback = CustomJS(args = args, code = js_leave)
+    for plot in plots:
+        plot.js_on_event('mousemove', moveCallback)
+        plot.js_on_event('mouseleave', leaveCallback)
 
 
 
@@ -75,32 +105,260 @@ def colorMapping(pin):
     else: return grey
 
 def trace2series(t, v):
+    '''Converts a GPIO trace (edges) into a series which can be plotted as area/line (vertical edges, gaps where the signal is LOW).
+    Args:
+        t: timestamps of edges
+        v: values after edges (0 or 1)
+    Returns:
+        tuple (t, v) of numpy arrays (v contains np.nan for gaps)
+    '''
+    t = np.asarray(t)
+    v = np.asarray(v)
+    if len(t) == 0:
+        return (np.array([], dtype=float), np.array([], dtype=float))
     tNew = np.repeat(t, 2, axis=0)
     # repeat and invert
-    vInv = [0 if e else 1 for e in v]
+    vInv = (v == 0).astype(int)
     # assume first value is 0 always
     vInv[0] = 0
     # interleave
     vNew = np.vstack((vInv, v)).reshape((-1,),order='F')
 
     # insert gaps (np.nan) where signal is LOW (to prevent long unnecessary lines in plots)
-    tNewNew = []
-    vNewNew = []
-    assert len(tNew) == len(vNew)
-    for i in range(len(tNew)-1):
-        tNewNew.append(tNew[i])
-        vNewNew.append(vNew[i])
-        if (vNew[i] == 0 and vNew[i+1] == 0):
-            tNewNew.append(tNew[i])
-            vNewNew.append(np.nan)
-    tNewNew.append(tNew[-1])
-    vNewNew.append(vNew[-1])
-    tNewNew = np.asarray(tNewNew)
-    vNewNew = np.asarray(vNewNew)
+    # a gap is inserted after each sample which is LOW and followed by a LOW sample
+    gap = (vNew[:-1] == 0) & (vNew[1:] == 0)
+    if not gap.any():
+        return (tNew, vNew)
+    counts = np.ones(len(vNew), dtype=np.int64)
+    counts[:-1] += gap
+    tNewNew = np.repeat(tNew, counts)
+    vNewNew = np.repeat(vNew.astype(float), counts)
+    vNewNew[(np.cumsum(counts) - 1)[:-1][gap]] = np.nan
 
     return (tNewNew, vNewNew)
 
-def plotObserverGpio(nodeId, nodeData, prevPlot, absoluteTimeFormatter):
+def trace2pulses(t, v):
+    '''Converts a GPIO trace (edges) into pulses (intervals where the signal is HIGH), e.g. for plotting them as rectangles.
+    Args:
+        t: timestamps of edges
+        v: values after edges (0 or 1)
+    Returns:
+        tuple (start, end) of numpy arrays (pulses which are not terminated by a LOW value are omitted)
+    '''
+    t = np.asarray(t)
+    v = np.asarray(v)
+    prev = np.concatenate(([0], v[:-1]))
+    startIdx = np.flatnonzero((v == 1) & (prev != 1))
+    lowIdx = np.flatnonzero(v == 0)
+    endPos = np.searchsorted(lowIdx, startIdx)
+    closed = endPos < len(lowIdx)
+    return (t[startIdx[closed]], t[lowIdx[endPos[closed]]])
+
+def gpioPinSeries(t, v):
+    '''Converts the GPIO trace (edges) of a single pin into the ready-to-plot arrays of plotObserverGpio() (see trace2series() and trace2pulses()).
+    Args:
+        t: timestamps of edges
+        v: values after edges (0 or 1)
+    Returns:
+        dict {'t': ..., 'v': ... (series, see trace2series()), 'start': ..., 'end': ... (pulses, see trace2pulses())}
+    '''
+    tSeries, vSeries = trace2series(t, v)
+    start, end = trace2pulses(t, v)
+    return {'t': tSeries, 'v': vSeries, 'start': start, 'end': end}
+
+def stepSeries(t, v):
+    '''Converts a series into a step series (value held until next sample) which can be plotted as line (e.g. instead of the Step glyph which is not supported by WebGL).
+    Args:
+        t: timestamps
+        v: values
+    Returns:
+        tuple (t, v) of numpy arrays
+    '''
+    t = np.asarray(t)
+    v = np.asarray(v)
+    if len(t) == 0:
+        return (t, v)
+    return (np.repeat(t, 2)[1:], np.repeat(v, 2)[:-1])
+
+# available downsampling methods for power profiling data (see downsampleIdx())
+downsamplingMethods = ['stride', 'minmax', 'lttb']
+# default max number of plotted serial log lines (all nodes, see prepareSerialData())
+SERIAL_MAX_POINTS = 20000
+
+def downsampleMinMax(y, factor):
+    '''Envelope preserving downsampling: selects the samples with the minimum and maximum value of each bucket of 2*factor samples (i.e. short spikes are preserved).
+    Args:
+        y:      values
+        factor: downsampling factor (number of returned samples is approx. len(y)/factor)
+    Returns:
+        sorted numpy array of indices of the selected samples (first and last sample are always included)
+    '''
+    y = np.asarray(y)
+    n = len(y)
+    bucketSize = 2*int(factor)
+    if factor <= 1 or n <= 2:
+        return np.arange(n)
+    numBuckets = int(np.ceil(n / bucketSize))
+    # pad last (incomplete) bucket with last value
+    buckets = np.concatenate((y, np.full(numBuckets*bucketSize - n, y[-1]))).reshape(numBuckets, bucketSize)
+    offsets = np.arange(numBuckets)*bucketSize
+    idx = np.concatenate(([0, n-1], offsets + np.argmin(buckets, axis=1), offsets + np.argmax(buckets, axis=1)))
+    return np.unique(np.minimum(idx, n-1))
+
+def downsampleLttb(t, y, numOut, preselection=4):
+    '''Shape preserving downsampling with the Largest-Triangle-Three-Buckets (LTTB) algorithm.
+    Candidates are preselected with downsampleMinMax() (approx. preselection*numOut samples, MinMaxLTTB), LTTB then only iterates over the small candidate buckets.
+    Args:
+        t:            timestamps (sorted)
+        y:            values
+        numOut:       number of returned samples
+        preselection: ratio between number of candidates and numOut
+    Returns:
+        sorted numpy array of indices of the selected samples (first and last sample are always included)
+    '''
+    t = np.asarray(t, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(t)
+    if numOut >= n or numOut < 3:
+        return np.arange(n)
+    cand = downsampleMinMax(y, max(1, n // (preselection*numOut)))
+    m = len(cand)
+    if m <= numOut:
+        return cand
+    tc = t[cand]
+    yc = y[cand]
+
+    # first and last point are fixed, remaining points are split into numOut-2 buckets
+    edges = (1 + np.arange(numOut - 1)*(m - 2)/(numOut - 2)).astype(np.int64)
+    edges[-1] = m - 1
+    counts = np.diff(edges)
+    # centroids of all buckets (last point as centroid after last bucket)
+    centroidT = np.append(np.add.reduceat(tc[1:m-1], edges[:-1] - 1) / counts, tc[-1])
+    centroidY = np.append(np.add.reduceat(yc[1:m-1], edges[:-1] - 1) / counts, yc[-1])
+
+    sel = np.empty(numOut, dtype=np.int64)
+    sel[0] = 0
+    sel[-1] = m - 1
+    a = 0
+    for k in range(numOut - 2):
+        lo, hi = edges[k], edges[k+1]
+        # (twice the) area of the triangles of selected point of previous bucket, candidates and centroid of next bucket
+        area = np.abs((tc[a] - centroidT[k+1])*(yc[lo:hi] - yc[a]) - (tc[a] - tc[lo:hi])*(centroidY[k+1] - yc[a]))
+        a = lo + int(np.argmax(area))
+        sel[k+1] = a
+    return cand[sel]
+
+def downsampleIdx(t, y, factor, method='stride'):
+    '''Selects the samples of a trace to plot.
+    Args:
+        t:      timestamps (sorted)
+        y:      values used to select samples (e.g. power)
+        factor: downsampling factor (number of returned samples is approx. len(t)/factor)
+        method: 'stride' (every factor-th sample), 'minmax' (see downsampleMinMax()) or 'lttb' (see downsampleLttb())
+    Returns:
+        sorted numpy array of indices of the selected samples
+    '''
+    if not method in downsamplingMethods:
+        raise FlocklabError('ERROR: Unknown downsampling method "{}" (valid methods: {})!'.format(method, ', '.join(downsamplingMethods)))
+    n = len(t)
+    if factor <= 1:
+        return np.arange(n)
+    if method == 'minmax':
+        return downsampleMinMax(y, factor)
+    elif method == 'lttb':
+        return downsampleLttb(t, y, max(3, int(np.ceil(n / factor))))
+    return np.arange(0, n, int(factor))
+
+def decimateGpioTrace(t, v, factor):
+    '''Reduces the number of edges of a GPIO trace by approx. factor. The trace is split into time buckets and all HIGH pulses starting in the same bucket are merged
+    into a single pulse (from the first rising to the last falling edge), i.e. the envelope of the signal is preserved and short pulses stay visible.
+    Args:
+        t:      timestamps of edges (sorted)
+        v:      values after edges (0 or 1)
+        factor: decimation factor
+    Returns:
+        tuple (t, v) of numpy arrays
+    '''
+    t = np.asarray(t)
+    v = np.asarray(v)
+    if factor <= 1 or len(t) < 4:
+        return t, v
+    # only keep transitions (initial state is 0)
+    isEdge = v != np.concatenate(([0], v[:-1]))
+    t, v = t[isEdge], v[isEdge]
+    start = t[v == 1]
+    end = t[v == 0]
+    if len(start) == 0:
+        return t, v
+    if len(end) < len(start):
+        # signal ends with 1
+        end = np.append(end, t[-1])
+
+    numBuckets = max(1, len(t) // (2*int(factor)))
+    width = (t[-1] - t[0]) / numBuckets
+    if width <= 0:
+        return t, v
+    bucket = np.floor((start - t[0]) / width).astype(np.int64)
+    # merge pulses starting in the same bucket and pulses overlapping with the merged pulse of the previous bucket
+    endMax = np.maximum.accumulate(end)
+    newPulse = np.concatenate(([True], (bucket[1:] != bucket[:-1]) & (start[1:] > endMax[:-1])))
+    first = np.flatnonzero(newPulse)
+    last = np.append(first[1:], len(start)) - 1
+    tNew = np.vstack((start[first], endMax[last])).reshape((-1,), order='F')
+    vNew = np.tile([1, 0], len(first))
+    return tNew, vNew
+
+def allocatePointBudget(counts, maxPoints):
+    '''Distributes a budget of plotted points to traces (max-min fair: traces with less points than the fair share are not downsampled, the remaining budget is shared equally by the other traces).
+    Args:
+        counts:    dict mapping trace key (e.g. (source, nodeId)) to number of points of the trace
+        maxPoints: total number of points
+    Returns:
+        dict mapping trace key to downsampling factor (int, >= 1)
+    '''
+    keys = list(counts.keys())
+    demand = np.array([counts[key] for key in keys], dtype=float)
+    if len(keys) == 0 or demand.sum() <= maxPoints:
+        return {key: 1 for key in keys}
+    sortedDemand = np.sort(demand)
+    served = np.concatenate(([0.], np.cumsum(sortedDemand)[:-1]))
+    # share of the remaining traces if the j smallest traces are not downsampled
+    shares = (maxPoints - served) / (len(keys) - np.arange(len(keys)))
+    cap = max(1., shares[np.argmax(shares <= sortedDemand)])
+    factors = np.maximum(1, np.ceil(demand / cap)).astype(int)
+    return dict(zip(keys, factors.tolist()))
+
+def compactArray(x):
+    '''Smallest binary (typed array) representation of a numeric array: integer valued arrays as uint8 or int32 (if possible), other arrays unchanged.
+    '''
+    x = np.asarray(x)
+    if len(x) == 0 or not np.issubdtype(x.dtype, np.number) or not np.all(np.isfinite(x)) or not np.all(np.mod(x, 1) == 0):
+        return x
+    if x.min() >= 0 and x.max() <= np.iinfo(np.uint8).max:
+        return x.astype(np.uint8)
+    if x.min() >= np.iinfo(np.int32).min and x.max() <= np.iinfo(np.int32).max:
+        return x.astype(np.int32)
+    return x
+
+def thinEvents(t, numOut):
+    '''Thins a sorted series of events (e.g. serial log lines) to at most numOut events: the time range is split into numOut buckets and the first event of each non-empty bucket is kept
+    (bursts remain visible, in contrast to keeping every n-th event).
+    Args:
+        t:      timestamps (sorted)
+        numOut: max number of events
+    Returns:
+        Tuple (idx, omitted) with the indices of the kept events and the number of omitted events following each kept event
+    '''
+    t = np.asarray(t)
+    if len(t) <= numOut:
+        return np.arange(len(t)), np.zeros(len(t), dtype=np.int64)
+    span = t[-1] - t[0]
+    bucket = np.minimum(np.floor((t - t[0]) / span * numOut), numOut - 1) if span > 0 else np.zeros(len(t))
+    idx = np.flatnonzero(np.concatenate(([True], bucket[1:] != bucket[:-1])))
+    omitted = np.diff(np.append(idx, len(t))) - 1
+    return idx, omitted
+
+def plotObserverGpio(nodeId, nodeData, prevPlot, absoluteTimeFormatter, compact=False, webgl=False):
     p = figure(
         title=None,
         x_range=prevPlot.x_range if prevPlot is not None else None,
@@ -112,23 +370,42 @@ def plotObserverGpio(nodeId, nodeData, prevPlot, absoluteTimeFormatter):
         active_drag='xbox_zoom', # not working due to bokeh bug https://github.com/bokeh/bokeh/issues/8766
         active_scroll='xwheel_zoom',
         sizing_mode='stretch_both', # full screen
-        # output_backend="webgl",
+        output_backend='webgl' if webgl else 'canvas',
     )
     length = len(nodeData)
+    lineRenderers = []
     for i, (pin, pinData) in enumerate(nodeData.items()):
         if not 't' in pinData.keys():
             continue
         signalName = '{} (Node {})'.format(pin, nodeId)
-        t, v, = trace2series(pinData['t'], pinData['v'])
-        source = ColumnDataSource(dict(t=t, y1=np.zeros_like(v)+length-i, y2=v+length-i))
+        if not 'start' in pinData:
+            # edges only (not converted by prepareGpioNodeData())
+            pinData = gpioPinSeries(pinData['t'], pinData['v'])
+        t, v = pinData['t'], pinData['v']
+        if compact:
+            # only the signal value is transferred, baseline and offset are applied in the browser
+            source = ColumnDataSource(dict(t=t, v=v.astype(np.float32)))
+            y1, y2 = length-i, dodge('v', length-i)
+        else:
+            source = ColumnDataSource(dict(t=t, y1=np.zeros_like(v)+length-i, y2=v+length-i))
+            y1, y2 = 'y1', 'y2'
         # plot areas
-        vareaGlyph = VArea(x="t", y1="y1", y2="y2", fill_color=colorMapping(pin))
-        varea = p.add_glyph(source, vareaGlyph, name=signalName) # name necessary for hover tooltip
+        if webgl:
+            # VArea is not supported by WebGL -> pulses as rectangles
+            start, end = pinData['start'], pinData['end']
+            quadGlyph = Quad(left='left', right='right', bottom=length-i, top=length-i+1, fill_color=colorMapping(pin), line_color=None)
+            p.add_glyph(ColumnDataSource(dict(left=start, right=end)), quadGlyph, name=signalName)
+        else:
+            vareaGlyph = VArea(x="t", y1=y1, y2=y2, fill_color=colorMapping(pin))
+            varea = p.add_glyph(source, vareaGlyph, name=signalName) # name necessary for hover tooltip
         # plot lines (necessary for tooltip/hover and for visibility if zoomed out!)
-        lineGlyph = Line(x="t", y="y2", line_color=colorMapping(pin).darken(0.2))
-        p.add_glyph(source, lineGlyph, name=signalName) # name necessary for hover tooltip
+        lineGlyph = Line(x="t", y=y2, line_color=colorMapping(pin).darken(0.2))
+        lineRenderers.append(p.add_glyph(source, lineGlyph, name=signalName)) # name necessary for hover tooltip
 
     hover = p.select(dict(type=HoverTool))
+    if webgl:
+        # rectangles do not contain the time of the edges
+        hover.renderers = lineRenderers
     hover.formatters={"@t": absoluteTimeFormatter}
     hover.tooltips = OrderedDict([
         ('Time (rel)', '@t{0.0000000} s'),
@@ -153,7 +430,7 @@ def plotObserverGpio(nodeId, nodeData, prevPlot, absoluteTimeFormatter):
 
     return p
 
-def plotObserverPower(nodeId, nodeData, prevPlot, absoluteTimeFormatter):
+def plotObserverPower(nodeId, nodeData, prevPlot, absoluteTimeFormatter, compact=False, webgl=False):
     p = figure(
         title=None,
         x_range=prevPlot.x_range if prevPlot is not None else None,
@@ -165,28 +442,56 @@ def plotObserverPower(nodeId, nodeData, prevPlot, absoluteTimeFormatter):
         active_drag='xbox_zoom', # not working due to bokeh bug https://github.com/bokeh/bokeh/issues/8766
         active_scroll='xwheel_zoom',
         sizing_mode='stretch_both', # full screen
-        # output_backend="webgl",
+        output_backend='webgl' if webgl else 'canvas',
     )
-    source = ColumnDataSource(dict(
-        t=nodeData['t'],
-        i=nodeData['i'],
-        v=nodeData['v'],
-        p=nodeData['v']*nodeData['i'],
-    ))
+    hoverPower = '@p{0.000000} mW'
+    hoverFormatters = {"@t": absoluteTimeFormatter}
+    if compact and not 'p' in nodeData:
+        # current and voltage as float32, power is computed in the browser (for the plot and the hover)
+        source = ColumnDataSource(dict(
+            t=nodeData['t'],
+            i=nodeData['i'].astype(np.float32),
+            v=nodeData['v'].astype(np.float32),
+        ))
+        powerTransform = CustomJSTransform(args={'source': source}, v_func='''
+            const v = source.data['v'];
+            const p = new Float32Array(xs.length);
+            for (let k = 0; k < xs.length; k++) {
+                p[k] = xs[k] * v[k];
+            }
+            return p;
+        ''')
+        y_p = transform('i', powerTransform)
+        hoverPower = '@v{power} mW'
+        hoverFormatters['@v'] = CustomJSHover(args={'source': source}, code='''
+            if (format == 'power') {
+                return (value * source.data['i'][special_vars.index]).toFixed(6);
+            }
+            return value.toFixed(6);
+        ''')
+    else:
+        pData = nodeData['p'] if 'p' in nodeData else nodeData['v']*nodeData['i']
+        source = ColumnDataSource(dict(
+            t=nodeData['t'],
+            i=nodeData['i'].astype(np.float32) if compact else nodeData['i'],
+            v=nodeData['v'].astype(np.float32) if compact else nodeData['v'],
+            p=pData.astype(np.float32) if compact else pData,
+        ))
+        y_p = 'p'
     line_i = Line(x="t", y="i", line_color='blue')
     line_v = Line(x="t", y="v", line_color='red')
-    line_p = Line(x="t", y="p", line_color='black')
+    line_p = Line(x="t", y=y_p, line_color='black')
     p.add_glyph(source, line_i, name='I (Node {})'.format(nodeId), visible=False)
     p.add_glyph(source, line_v, name='V (Node {})'.format(nodeId), visible=False)
     p.add_glyph(source, line_p, name='P (Node {})'.format(nodeId))
     hover = p.select(dict(type=HoverTool))
-    hover.formatters={"@t": absoluteTimeFormatter}
+    hover.formatters = hoverFormatters
     hover.tooltips = OrderedDict([
       ('Time (rel)', '@t{0.00000000} s'),
       ('Time (abs)', '@t{withOffset:0.00000000} s'),
       ('V', '@v{0.000000} V'),
       ('I', '@i{0.000000} mA'),
-      ('Power', '@p{0.000000} mW'),
+      ('Power', hoverPower),
       ('Signal', '$name'),
     ])
 
@@ -202,7 +507,7 @@ def plotObserverPower(nodeId, nodeData, prevPlot, absoluteTimeFormatter):
 
     return p
 
-def plotObserverDatatrace(nodeId, nodeData, prevPlot, absoluteTimeFormatter, allVariables):
+def plotObserverDatatrace(nodeId, nodeData, prevPlot, absoluteTimeFormatter, allVariables, compact=False, webgl=False):
     p = figure(
         title=None,
         x_range=prevPlot.x_range if prevPlot is not None else None,
@@ -213,34 +518,111 @@ def plotObserverDatatrace(nodeId, nodeData, prevPlot, absoluteTimeFormatter, all
         active_drag='xbox_zoom', # not working due to bokeh bug https://github.com/bokeh/bokeh/issues/8766
         active_scroll='xwheel_zoom',
         sizing_mode='stretch_both', # full screen
-        # output_backend="webgl",
+        output_backend='webgl' if webgl else 'canvas',
     )
 
     colorMap = ['blue', 'red', 'green', 'black', 'cyan', 'yellowgreen', 'deepskyblue', 'indigo', 'orange', 'yellow']
 
+    hoverFormatters = {"@t": absoluteTimeFormatter}
+    hoverAccess = '@access'
+    if compact:
+        # access type as integer code (mapped back to the access type in the hover), same codes for all variables since the hover is shared
+        accessCategories = ['r', 'w']
+        for trace in nodeData.values():
+            accessCategories += sorted(set([str(e) for e in pd.unique(trace['access'])]) - set(accessCategories))
+        hoverAccess = '@access{custom}'
+        hoverFormatters['@access'] = CustomJSHover(code='return {}[value];'.format(json.dumps(accessCategories)))
+
+    circleRenderers = []
     for variable, trace in nodeData.items():
         colorIdx = allVariables.index(variable)
         color = colorMap[colorIdx%len(colorMap)]
+        if compact:
+            source = ColumnDataSource(dict(
+              t=trace['t'],
+              value=compactArray(trace['value']),
+              access=pd.Categorical(np.asarray(trace['access']).astype(str), categories=accessCategories).codes.astype(np.uint8),
+              delay_marker=compactArray(trace['delay_marker']),
+            ))
+        else:
+            source = ColumnDataSource(dict(
+              t=trace['t'],
+              value=trace['value'],
+              access=trace['access'],
+              delay_marker=trace['delay_marker'],
+            ))
+        if webgl:
+            # Step is not supported by WebGL -> line through step series
+            tStep, valueStep = stepSeries(source.data['t'], source.data['value'])
+            line = Line(x="t", y="value", line_color=color)
+            p.add_glyph(ColumnDataSource(dict(t=tStep, value=valueStep)), line, name='{}'.format(variable))
+        else:
+            step = Step(x="t", y="value", line_color=color, mode='after')
+            p.add_glyph(source, step, name='{}'.format(variable))
+        circle = Circle(x="t", y="value", size=4, line_color=color, fill_color="white", line_width=1)
+        circleRenderers.append(p.add_glyph(source, circle, name='{}'.format(variable)))
+
+    hover = p.select(dict(type=HoverTool))
+    if webgl:
+        # step lines do not contain the access info
+        hover.renderers = circleRenderers
+    hover.formatters = hoverFormatters
+    hover.tooltips = OrderedDict([
+      ('Time (rel)', '@t{0.0000000} s'),
+      ('Time (abs)', '@t{withOffset:0.0000000} s'),
+      ('Value', '@value{0}'),
+      ('Access', hoverAccess),
+      ('Delay marker', '@delay_marker'),
+      ('Variable', '$name'),
+    ])
+
+    p.xgrid.grid_line_color = None
+    p.ygrid.grid_line_color = None
+    p.xaxis.visible = False
+    p.yaxis.visible = False
+
+    return p
+
+# marker lane and color per direction of serial log lines (r: output of the target, w: input written to the target)
+serialDirections = OrderedDict([
+    ('r', (1, 'blue')),
+    ('w', (0, 'darkorange')),
+])
+
+def plotObserverSerial(nodeId, nodeData, prevPlot, absoluteTimeFormatter, compact=False, webgl=False):
+    p = figure(
+        title=None,
+        x_range=prevPlot.x_range if prevPlot is not None else None,
+        y_range=Range1d(-1, 2), # fixed lanes of the directions (see serialDirections)
+        plot_height=900,
+        min_border=0,
+        tools=['xpan', 'xwheel_zoom', 'xbox_zoom', 'hover', 'reset'],
+        active_drag='xbox_zoom', # not working due to bokeh bug https://github.com/bokeh/bokeh/issues/8766
+        active_scroll='xwheel_zoom',
+        sizing_mode='stretch_both', # full screen
+        output_backend='webgl' if webgl else 'canvas',
+    )
+    direction = np.asarray(nodeData['direction'])
+    for dirCode, (lane, color) in serialDirections.items():
+        mask = direction == dirCode
+        if not np.any(mask):
+            continue
         source = ColumnDataSource(dict(
-          t=trace['t'],
-          value=trace['value'],
-          access=trace['access'],
-          delay_marker=trace['delay_marker'],
+            t=nodeData['t'][mask],
+            output=nodeData['output'][mask],
+            omitted=compactArray(nodeData['omitted'][mask]) if compact else nodeData['omitted'][mask],
         ))
-        step = Step(x="t", y="value", line_color=color, mode='after')
-        p.add_glyph(source, step, name='{}'.format(variable))
-        circle = Circle(x="t", y="value", size=4, line_color=color, fill_color="white", line_width=1)
-        p.add_glyph(source, circle, name='{}'.format(variable))
-        hover = p.select(dict(type=HoverTool))
-        hover.formatters={"@t": absoluteTimeFormatter}
-        hover.tooltips = OrderedDict([
-          ('Time (rel)', '@t{0.0000000} s'),
-          ('Time (abs)', '@t{withOffset:0.0000000} s'),
-          ('Value', '@value{0}'),
-          ('Access', '@access'),
-          ('Delay marker', '@delay_marker'),
-          ('Variable', '$name'),
-        ])
+        circle = Circle(x="t", y=lane, size=6, line_color=color, fill_color=color, fill_alpha=0.4, line_width=1)
+        p.add_glyph(source, circle, name='serial {} (Node {})'.format(dirCode, nodeId))
+    hover = p.select(dict(type=HoverTool))
+    hover.formatters = {"@t": absoluteTimeFormatter}
+    hover.tooltips = OrderedDict([
+      ('Time (rel)', '@t{0.0000000} s'),
+      ('Time (abs)', '@t{withOffset:0.0000000} s'),
+      ('Output', '@output'),
+      ('Omitted lines', '@omitted'),
+      ('Signal', '$name'),
+    ])
 
     p.xgrid.grid_line_color = None
     p.ygrid.grid_line_color = None
@@ -249,7 +631,7 @@ def plotObserverDatatrace(nodeId, nodeData, prevPlot, absoluteTimeFormatter, all
 
     return p
 
-def plotAll(gpioData, powerData, datatraceData, testNum, absoluteTimeFormatter, interactive=False):
+def plotAll(gpioData, powerData, datatraceData, testNum, absoluteTimeFormatter, interactive=False, render=True, compact=False, sidecar=False, webgl=False, zoomFromUrl=False, serialData=None):
     # determine gpio limits of timestamp value (for vertical lines)
     gpioLimits = None
     if gpioData:
@@ -274,7 +656,7 @@ def plotAll(gpioData, powerData, datatraceData, testNum, absoluteTimeFormatter,
     gpioPlots = OrderedDict()
     p = None
     for nodeId, nodeData in gpioData.items():
-        p = plotObserverGpio(nodeId, nodeData, prevPlot=p, absoluteTimeFormatter=absoluteTimeFormatter)
+        p = plotObserverGpio(nodeId, nodeData, prevPlot=p, absoluteTimeFormatter=absoluteTimeFormatter, compact=compact, webgl=webgl)
         gpioPlots.update( {nodeId: p} )
     allPlots += list(gpioPlots.values())
 
@@ -282,7 +664,7 @@ def plotAll(gpioData, powerData, datatraceData, testNum, absoluteTimeFormatter,
     powerPlots = OrderedDict()
     p = allPlots[-1] if allPlots else None
     for nodeId, nodeData in powerData.items():
-        p = plotObserverPower(nodeId, nodeData, prevPlot=p, absoluteTimeFormatter=absoluteTimeFormatter)
+        p = plotObserverPower(nodeId, nodeData, prevPlot=p, absoluteTimeFormatter=absoluteTimeFormatter, compact=compact, webgl=webgl)
         powerPlots.update( {nodeId: p} )
     allPlots += list(powerPlots.values())
 
@@ -291,10 +673,18 @@ def plotAll(gpioData, powerData, datatraceData, testNum, absoluteTimeFormatter,
     p = allPlots[-1] if allPlots else None
     allVariables = sorted(list(set(list(itertools.chain.from_iterable([nodeData.keys() for nodeId, nodeData in datatraceData.items()])))))
     for nodeId, nodeData in datatraceData.items():
-        p = plotObserverDatatrace(nodeId, nodeData, prevPlot=p, absoluteTimeFormatter=absoluteTimeFormatter, allVariables=allVariables)
+        p = plotObserverDatatrace(nodeId, nodeData, prevPlot=p, absoluteTimeFormatter=absoluteTimeFormatter, allVariables=allVariables, compact=compact, webgl=webgl)
         datatracePlots.update( {nodeId: p} )
     allPlots += list(datatracePlots.values())
 
+    # plot serial log
+    serialPlots = OrderedDict()
+    p = allPlots[-1] if allPlots else None
+    for nodeId, nodeData in (serialData or OrderedDict()).items():
+        p = plotObserverSerial(nodeId, nodeData, prevPlot=p, absoluteTimeFormatter=absoluteTimeFormatter, compact=compact, webgl=webgl)
+        serialPlots.update( {nodeId: p} )
+    allPlots += list(serialPlots.values())
+
     ## time scale axis: create linked dummy plot to get shared x axis without scaling height of bottom most plot
     # figure out last plot for linking x-axis
     p = allPlots[-1] if allPlots else None
@@ -308,7 +698,7 @@ def plotAll(gpioData, powerData, datatraceData, testNum, absoluteTimeFormatter,
         active_scroll='xwheel_zoom',
         height_policy='fit',
         width_policy='fit',
-        # output_backend="webgl",
+        output_backend='webgl' if webgl else 'canvas',
     )
     source = ColumnDataSource(dict(x=[0, np.inf], y1=[0, 0], y2=[0, 0]))
     vareaGlyph = VArea(x="x", y1="y1", y2="y2", fill_color='grey')
@@ -320,14 +710,126 @@ def plotAll(gpioData, powerData, datatraceData, testNum, absoluteTimeFormatter,
     allPlots += [timePlot]
 
     # arrange all plots in grid and render it
-    createAppAndRender(gpioPlots, powerPlots, datatracePlots, timePlot, testNum, gpioLimits, interactive=interactive)
+    return createAppAndRender(gpioPlots, powerPlots, datatracePlots, timePlot, testNum, gpioLimits, interactive=interactive, render=render, sidecar=sidecar, zoomFromUrl=zoomFromUrl, serialPlots=serialPlots)
+
+# data types which can be moved to sidecar files (typed arrays in javascript)
+sidecarDtypes = ['float64', 'float32', 'int32', 'uint32', 'int16', 'uint16', 'int8', 'uint8']
+
+# loader of sidecar files (sources and payload are defined by writeDataSidecar())
+sidecarLoaderJs = '''
+var typedArrays = {float64: Float64Array, float32: Float32Array, int32: Int32Array, uint32: Uint32Array, int16: Int16Array, uint16: Uint16Array, int8: Int8Array, uint8: Uint8Array};
+function load(doc) {
+    var compressed = Uint8Array.from(atob(payload), function(c) { return c.charCodeAt(0); });
+    var stream = new Blob([compressed]).stream().pipeThrough(new DecompressionStream('gzip'));
+    new Response(stream).arrayBuffer().then(function(buffer) {
+        sources.forEach(function(s) {
+            var data = {};
+            s[1].forEach(function(c) { data[c[0]] = new typedArrays[c[1]](buffer, c[2], c[3]); });
+            doc.get_model_by_name(s[0]).data = data;
+        });
+    });
+}
+function waitForDocument() {
+    if (window.Bokeh !== undefined && Bokeh.documents.length > 0) {
+        load(Bokeh.documents[0]);
+    } else {
+        setTimeout(waitForDocument, 50);
+    }
+}
+waitForDocument();
+'''
+
+def writeDataSidecar(layout, sidecarFile):
+    '''Moves the data of all ColumnDataSources of a layout (which contain numeric arrays only) to a gzip compressed sidecar file. The sidecar file is a javascript file
+    (base64 encoded payload and loader, works for html files opened from the local file system) which fills the (empty) data sources once the bokeh document is loaded.
+    Requires a browser with support for DecompressionStream.
+    Args:
+        layout:      bokeh layout (before saving it)
+        sidecarFile: path of the sidecar file (javascript)
+    Returns:
+        Number of uncompressed bytes moved to the sidecar file
+    '''
+    chunks = []
+    offset = 0
+    sources = []
+    for k, source in enumerate(layout.select(dict(type=ColumnDataSource))):
+        data = source.data
+        if len(data) == 0 or not all([isinstance(arr, np.ndarray) and arr.dtype.name in sidecarDtypes for arr in data.values()]):
+            continue
+        if source.name is None:
+            source.name = 'flocklab_data_{}'.format(k)
+        columns = []
+        for col, arr in data.items():
+            arr = np.ascontiguousarray(arr, dtype=arr.dtype.newbyteorder('<'))
+            # align arrays to 8 bytes (required for typed array views)
+            padding = -offset % 8
+            chunks.append(b'\0'*padding)
+            offset += padding
+            columns.append([col, arr.dtype.name, offset, len(arr)])
+            chunks.append(arr.tobytes())
+            offset += arr.nbytes
+        sources.append([source.name, columns])
+        source.data = {col: arr[:0] for col, arr in data.items()}
+    payload = base64.b64encode(gzip.compress(b''.join(chunks))).decode('ascii')
+    with open(sidecarFile, 'w') as f:
+        f.write('(function() {\n')
+        f.write('var sources = {};\n'.format(json.dumps(sources)))
+        f.write('var payload = "{}";\n'.format(payload))
+        f.write(sidecarLoaderJs.lstrip('\n'))
+        f.write('})();\n')
+    return offset
+
+def groupRenderers(plots, groupKey):
+    '''Groups the glyph renderers of plots in a single pass.
+    Args:
+        plots:    iterable of bokeh plots
+        groupKey: function mapping the name of a renderer to the key of its group (e.g. signal name)
+    Returns:
+        dict {key: [renderers]}
+    '''
+    groups = {}
+    for p in plots:
+        for r in p.renderers:
+            if isinstance(r, GlyphRenderer) and r.name is not None:
+                groups.setdefault(groupKey(r.name), []).append(r)
+    return groups
+
+
+# sets the visibility of all renderers according to the active buttons (groups[k]: index of the button of renderers[k])
+toggleGroupsJs = '''
+    var active = new Set(cb_obj.active);
+    for (var k=0; k<renderers.length; k++) {
+        renderers[k].visible = active.has(groups[k]);
+    }
+'''
+
 
-def createAppAndRender(gpioPlots, powerPlots, datatracePlots, timePlot, testNum, gpioLimits, interactive=False):
-    '''arrange all plots in grid, add tools, and render it
+def createGroupToggleCallback(labels, renderGroups):
+    '''Creates a callback for a CheckboxButtonGroup which shows/hides groups of renderers (flat list of renderers and their group indices, i.e. linear in the number of renderers).
+    Args:
+        labels:       labels of the CheckboxButtonGroup
+        renderGroups: dict {label: [renderers]} (see groupRenderers())
+    Returns:
+        CustomJS callback
+    '''
+    renderers = []
+    groups = []
+    for k, label in enumerate(labels):
+        groupRenderersList = renderGroups.get(label, [])
+        renderers.extend(groupRenderersList)
+        groups.extend([k]*len(groupRenderersList))
+    return CustomJS(args={'renderers': renderers, 'groups': groups}, code=toggleGroupsJs)
+
+
+def createAppAndRender(gpioPlots, powerPlots, datatracePlots, timePlot, testNum, gpioLimits, interactive=False, render=True, sidecar=False, zoomFromUrl=False, serialPlots=None):
+    '''arrange all plots in grid, add tools, and render it (if render is False, the layout is only returned, e.g. for adding it to a bokeh server document)
+    If sidecar is True, the plot data is written to a compressed sidecar file next to the output file (see writeDataSidecar()).
+    If zoomFromUrl is True, the html file zooms to the time window given in the URL (e.g. <file>.html#t=10.5,12.5, used by the overview, see plotOverview()).
     '''
-    allPlots = list(gpioPlots.values()) + list(powerPlots.values()) + list(datatracePlots.values()) + [timePlot]
+    serialPlots = serialPlots if serialPlots is not None else OrderedDict()
+    allPlots = list(gpioPlots.values()) + list(powerPlots.values()) + list(datatracePlots.values()) + list(serialPlots.values()) + [timePlot]
     # determine all nodeIds
-    allNodeIds = sorted(list(set(list(gpioPlots.keys()) + list(powerPlots.keys()) + list(datatracePlots.keys()))))
+    allNodeIds = sorted(list(set(list(gpioPlots.keys()) + list(powerPlots.keys()) + list(datatracePlots.keys()) + list(serialPlots.keys()))))
 
     # : handle case where no gpio data is available
     # vertical line for start and end of test
@@ -392,7 +894,9 @@ def createAppAndRender(gpioPlots, powerPlots, datatracePlots, timePlot, testNum,
     mt_box.fill_alpha = 0.1
     mt_box.visible = False
 
-    ## add tools and utils to all plots
+    ## add tools and utils to all plots (callbacks are shared by all plots)
+    tapCallback = CustomJS(args={'marker_start': mt_marker_start, 'marker_end': mt_marker_end, 'box': mt_box}, code=js_click)
+    doubleTapCallback = CustomJS(code='cb_obj.origin.reset.emit()')
     for p in allPlots:
         # adding vlines
         if gpioLimits is not None:
@@ -404,11 +908,10 @@ def createAppAndRender(gpioPlots, powerPlots, datatracePlots, timePlot, testNum,
         p.add_layout(mt_marker_start)
         p.add_layout(mt_marker_end)
         p.add_layout(mt_box)
-        args = {'marker_start': mt_marker_start, 'marker_end': mt_marker_end, 'box': mt_box, 'p': p}
-        p.js_on_event(Tap, CustomJS(args = args, code = js_click))
+        p.js_on_event(Tap, tapCallback)
 
         # add functionality to reset by double-click
-        p.js_on_event(DoubleTap, CustomJS(args=dict(p=p), code='p.reset.emit()'))
+        p.js_on_event(DoubleTap, doubleTapCallback)
 
     ## add linked vertical selection line to all plots
     addLinkedCrosshairs(allPlots)
@@ -440,6 +943,8 @@ def createAppAndRender(gpioPlots, powerPlots, datatracePlots, timePlot, testNum,
             colList.append(powerPlots[nodeId])
         if (nodeId in datatracePlots):
             colList.append(datatracePlots[nodeId])
+        if (nodeId in serialPlots):
+            colList.append(serialPlots[nodeId])
         if not colList:
             raise Exception("ERROR: No plot for {nodeId} available, even though nodeId is present!".format(nodeId=nodeId))
         plotCol = column(colList, sizing_mode='stretch_both')
@@ -659,6 +1164,8 @@ def createAppAndRender(gpioPlots, powerPlots, datatracePlots, timePlot, testNum,
         serviceNames.append("PWR")
     if datatracePlots:
         serviceNames.append("DT")
+    if serialPlots:
+        serviceNames.append("SER")
     serviceMap = dict([(name, serviceNames.index(name)) for name in serviceNames])
     checkboxServices = CheckboxButtonGroup(
         labels=serviceNames,
@@ -673,6 +1180,7 @@ def createAppAndRender(gpioPlots, powerPlots, datatracePlots, timePlot, testNum,
             'gpioPlots': gpioPlots,
             'powerPlots': powerPlots,
             'datatracePlots': datatracePlots,
+            'serialPlots': serialPlots,
             'serviceMap': serviceMap,
         },
         code="""
@@ -694,6 +1202,12 @@ def createAppAndRender(gpioPlots, powerPlots, datatracePlots, timePlot, testNum,
                     datatracePlots[nodeId].visible = this.active.includes(serviceMap['DT']);
                 }
             }
+            // Serial log plots
+            if ('SER' in serviceMap) {
+                for (var nodeId in serialPlots) {
+                    serialPlots[nodeId].visible = this.active.includes(serviceMap['SER']);
+                }
+            }
         """
     ))
 
@@ -733,83 +1247,38 @@ def createAppAndRender(gpioPlots, powerPlots, datatracePlots, timePlot, testNum,
     # checkboxes for GPIO pins
     # FIXME: if gpio pin in the middle is disabled, space remains reserved and is not available for rest of the plot
     if gpioPlots:
-        renderObjs = list(itertools.chain.from_iterable([p.select(GlyphRenderer) for p in gpioPlots.values()]))
-        gpioPins = sorted(list(set([g.name.split(' ')[0] for g in renderObjs])))
-        renderObjsDict = {}
-        for pin in gpioPins:
-            renderObjsDict[pin] = [r for r in renderObjs if pin == r.name.split(' ')[0]]
+        renderGroups = groupRenderers(gpioPlots.values(), lambda name: name.split(' ')[0])
+        gpioPins = sorted(renderGroups.keys())
         checkboxGpio = CheckboxButtonGroup(
             labels=gpioPins,
             active=list(range(len(gpioPins))),
             width_policy='min',
         )
-        checkboxGpio.js_on_change('active', CustomJS(
-            args={
-                'gpioPins': gpioPins,
-                'renderObjs': renderObjsDict,
-            },
-            code="""
-                for (var i=0; i<gpioPins.length; i++) {
-                    for (var k=0; k<renderObjs[gpioPins[i]].length; k++) {
-                        renderObjs[gpioPins[i]][k].visible = this.active.includes(i);
-                    }
-                }
-            """
-        ))
+        checkboxGpio.js_on_change('active', createGroupToggleCallback(gpioPins, renderGroups))
         checkboxSignalsList.append(checkboxGpio)
 
     # checkboxes for Power signals (I, V, P)
     if powerPlots:
-        renderObjs = list(itertools.chain.from_iterable([p.select(GlyphRenderer) for p in powerPlots.values()]))
+        renderGroups = groupRenderers(powerPlots.values(), lambda name: name.split(' ')[0])
         powerSignals = ['V', 'I', 'P']
-        renderObjsDict = {}
-        for signal in powerSignals:
-            renderObjsDict[signal] = [r for r in renderObjs if signal == r.name.split(' ')[0]]
         checkboxPower = CheckboxButtonGroup(
             labels=powerSignals,
             active=[powerSignals.index('P')],
             width_policy='min',
         )
-        checkboxPower.js_on_change('active', CustomJS(
-            args={
-                'powerSignals': powerSignals,
-                'renderObjs': renderObjsDict,
-            },
-            code="""
-                for (var i=0; i<powerSignals.length; i++) {
-                    for (var k=0; k<renderObjs[powerSignals[i]].length; k++) {
-                        renderObjs[powerSignals[i]][k].visible = this.active.includes(i);
-                    }
-                }
-            """
-        ))
+        checkboxPower.js_on_change('active', createGroupToggleCallback(powerSignals, renderGroups))
         checkboxSignalsList.append(checkboxPower)
 
     # checkboxes for datatrace variables
     if datatracePlots:
-        renderObjs = list(itertools.chain.from_iterable([p.select(GlyphRenderer) for p in datatracePlots.values()]))
-        variables = sorted(list(set([g.name for g in renderObjs])))
-        renderObjsDict = {}
-        for variable in variables:
-            renderObjsDict[variable] = [r for r in renderObjs if variable == r.name]
+        renderGroups = groupRenderers(datatracePlots.values(), lambda name: name)
+        variables = sorted(renderGroups.keys())
         checkboxDatatrace = CheckboxButtonGroup(
             labels=variables,
             active=list(range(len(variables))),
             width_policy='min',
         )
-        checkboxDatatrace.js_on_change('active', CustomJS(
-            args={
-                'variables': variables,
-                'renderObjs': renderObjsDict,
-            },
-            code="""
-                for (var i=0; i<variables.length; i++) {
-                    for (var k=0; k<renderObjs[variables[i]].length; k++) {
-                        renderObjs[variables[i]][k].visible = this.active.includes(i);
-                    }
-                }
-            """
-        ))
+        checkboxDatatrace.js_on_change('active', createGroupToggleCallback(variables, renderGroups))
         checkboxSignalsList.append(checkboxDatatrace)
 
     checkboxSignalsRow = row(
@@ -853,22 +1322,439 @@ def createAppAndRender(gpioPlots, powerPlots, datatracePlots, timePlot, testNum,
     )
 
     # render all plots
-    if interactive:
-        show(finalLayout)
+    if render and (sidecar or zoomFromUrl):
+        if curstate().file is None:
+            raise FlocklabError('ERROR: Output file required for writing a sidecar file (see output_file())!')
+        filename = curstate().file.filename
+        postamble = ''
+        if sidecar:
+            sidecarFile = os.path.splitext(filename)[0] + '.data.js'
+            writeDataSidecar(finalLayout, sidecarFile)
+            postamble += '<script src="{}" defer></script>'.format(os.path.basename(sidecarFile))
+        if zoomFromUrl:
+            timePlot.name = 'flocklab_time_plot'
+            postamble += '<script>{}</script>'.format(zoomFromUrlJs)
+        save(finalLayout, template='{{% block postamble %}}{}{{% endblock %}}'.format(postamble))
+        if interactive:
+            view(filename)
+    elif render:
+        if interactive:
+            show(finalLayout)
+        else:
+            save(finalLayout)
+    return finalLayout
+
+
+
+# zooms to the time window given in the URL (#t=<start>,<end>) once the bokeh document is loaded
+zoomFromUrlJs = '''
+(function() {
+    var match = /t=([-+0-9.eE]+),([-+0-9.eE]+)/.exec(window.location.hash);
+    if (match === null) {
+        return;
+    }
+    function waitForDocument() {
+        if (window.Bokeh !== undefined && Bokeh.documents.length > 0) {
+            Bokeh.documents[0].get_model_by_name('flocklab_time_plot').x_range.setv({start: parseFloat(match[1]), end: parseFloat(match[2])});
+        } else {
+            setTimeout(waitForDocument, 50);
+        }
+    }
+    waitForDocument();
+})();
+'''
+
+# metrics of the overview heatmap (key in the result of aggregateOverview(): label)
+overviewMetrics = OrderedDict([
+    ('power', 'Power [mW]'),
+    ('gpio', 'GPIO edges [1/s]'),
+    ('datatrace', 'Datatrace events [1/s]'),
+])
+# number of buckets around the clicked bucket shown in the detailed view (overview drill down)
+OVERVIEW_DRILLDOWN_BUCKETS = 5
+
+
+def _bucketCounts(tList, nodeIdxList, t0, dt, numNodes, numBuckets, weightsList=None):
+    '''Number of samples (or sum of weights) per node and time bucket (array aggregation with a single bincount).
+    '''
+    if not tList:
+        return None
+    t = np.concatenate(tList)
+    nodeIdx = np.concatenate(nodeIdxList)
+    bucket = np.clip(np.floor((t - t0) / dt).astype(np.int64), 0, numBuckets - 1)
+    weights = np.concatenate(weightsList) if weightsList is not None else None
+    counts = np.bincount(nodeIdx*numBuckets + bucket, weights=weights, minlength=numNodes*numBuckets)
+    return counts.reshape((numNodes, numBuckets)).astype(float)
+
+
+def _pyramidBucketMeans(pyramid, maxRecords):
+    '''Start times (as stored in the pyramid, i.e. without timeOffset) and mean power of the buckets of the finest level of a PowerPyramid with at most maxRecords buckets
+    (all buckets of a level contain the same number of samples).
+    '''
+    level = len(pyramid.levels) - 1
+    while level > 1 and len(pyramid.levels[level-1]) <= maxRecords:
+        level -= 1
+    levelData = pyramid.levels[level]
+    return levelData['t'], levelData['power_mW_mean'].astype(float)
+
+
+def aggregateOverview(gpioDf, powerDf, datatraceDf, refTime, showPps=False, showRst=False, numBuckets=1000, powerPyramids=None):
+    '''Aggregates the data of all nodes into time buckets (nodes x time matrices) for the overview heatmap (see plotOverview()).
+    The full resolution traces are aggregated (before decimation / downsampling for the plots), i.e. the metrics do not depend on the downsampling options.
+    Args:
+        gpioDf:        GPIO trace as pandas dataframe (see readGpioTracing()), None if not available
+        powerDf:       power profiling data as pandas dataframe (see readPowerProfiling()), None if not available
+        datatraceDf:   datatrace data as pandas dataframe (see readDatatrace()), None if not available
+        refTime:       reference time (subtracted from all timestamps, same as in prepareVisualizationData())
+        showPps:       include edges of the PPS signal
+        showRst:       include edges of the nRST signal
+        numBuckets:    number of time buckets
+        powerPyramids: power pyramids per node with absolute timestamps (e.g. from a pyramid store, see PyramidStore.powerPyramid()), used instead of powerDf
+    Returns:
+        dict with nodeIds, t0 (start of first bucket), dt (bucket width) and one array (shape: number of nodes x numBuckets) per metric which is available (see overviewMetrics):
+        power (mean power of the samples in the bucket), gpio (GPIO edges per second, all pins), datatrace (datatrace events per second, all variables).
+        Buckets without data of a node are NaN for power, nodes without data of a service are NaN for all metrics.
+    '''
+    # time and node ID (and power) per event of each source (relative time)
+    series = OrderedDict()
+    if gpioDf is not None and len(gpioDf) > 0:
+        gpioPins = [pin for pin in pinOrdering if (pin != 'nRST' or showRst) and (pin != 'PPS' or showPps)]
+        edges = gpioEdges(gpioDf[gpioDf.pin_name.isin(gpioPins).to_numpy()])
+        series['gpio'] = (edges.timestamp.to_numpy() - refTime, edges.node_id.to_numpy(), None)
+    if powerPyramids is not None:
+        powerSeries = [(nodeId,) + _pyramidBucketMeans(pyramid, 64*numBuckets) for nodeId, pyramid in powerPyramids.items()]
+        series['power'] = (
+            np.concatenate([t for _, t, _ in powerSeries]) - refTime if powerSeries else np.array([]),
+            np.concatenate([np.full(len(t), nodeId, dtype=np.int64) for nodeId, t, _ in powerSeries]) if powerSeries else np.array([], dtype=np.int64),
+            np.concatenate([p for _, _, p in powerSeries]) if powerSeries else np.array([]),
+        )
+    elif powerDf is not None and len(powerDf) > 0:
+        series['power'] = (powerDf.timestamp.to_numpy() - refTime, powerDf.node_id.to_numpy(), powerDf.current_mA.to_numpy()*powerDf.voltage_V.to_numpy())
+    if datatraceDf is not None and len(datatraceDf) > 0:
+        series['datatrace'] = (datatraceDf.timestamp.to_numpy() - refTime, datatraceDf.node_id.to_numpy(), None)
+    series = OrderedDict([(source, e) for source, e in series.items() if len(e[0]) > 0])
+    if not series:
+        raise FlocklabError('ERROR: No data for overview available!')
+
+    nodeIds = sorted(set([nodeId for t, nodes, _ in series.values() for nodeId in np.unique(nodes).tolist()]))
+    t0 = min([np.min(t) for t, _, _ in series.values()])
+    t1 = max([np.max(t) for t, _, _ in series.values()])
+    dt = (t1 - t0) / numBuckets if t1 > t0 else 1.
+    overview = {'nodeIds': nodeIds, 't0': t0, 'dt': dt}
+
+    for source, (t, nodes, weights) in series.items():
+        nodeIdx = np.searchsorted(nodeIds, nodes)
+        counts = _bucketCounts([t], [nodeIdx], t0, dt, len(nodeIds), numBuckets)
+        if weights is not None:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values = _bucketCounts([t], [nodeIdx], t0, dt, len(nodeIds), numBuckets, weightsList=[weights]) / counts
+        else:
+            values = counts / dt
+        # nodes without any data of a source are NaN
+        values[~np.isin(nodeIds, nodes)] = np.nan
+        overview[source] = values
+    return overview
+
+
+def plotOverview(overview, testNum, absoluteTimeFormatter, detailFiles=None, webgl=False):
+    '''Plots the overview heatmap (nodes x time, one image per metric, selectable with buttons).
+    Args:
+        overview:    aggregated data (see aggregateOverview())
+        testNum:     test number (title)
+        absoluteTimeFormatter: formatter for hover info (see createAbsoluteTimeFormatter())
+        detailFiles: dict {nodeId: html file}, clicking on a cell opens the detailed view of the node (zoomed to the clicked time, see createAppAndRender()).
+                     If None, clicks are not handled (e.g. handled by a bokeh server callback, see overviewCell()).
+        webgl:       render with WebGL
+    Returns:
+        Tuple (layout, figure)
+    '''
+    nodeIds = overview['nodeIds']
+    numNodes = len(nodeIds)
+    metrics = [metric for metric in overviewMetrics.keys() if metric in overview]
+    numBuckets = overview[metrics[0]].shape[1]
+    tEnd = overview['t0'] + numBuckets*overview['dt']
+
+    p = figure(
+        title=overviewMetrics[metrics[0]],
+        x_range=(overview['t0'], tEnd),
+        y_range=(0, numNodes),
+        plot_height=max(200, 20*numNodes + 60),
+        min_border=0,
+        tools=['xpan', 'xwheel_zoom', 'xbox_zoom', 'reset'],
+        active_scroll='xwheel_zoom',
+        sizing_mode='stretch_width',
+        output_backend='webgl' if webgl else 'canvas',
+    )
+    # nodes from top to bottom (image rows are drawn from bottom to top)
+    ticks = [numNodes - 1 - k + 0.5 for k in range(numNodes)]
+    p.yaxis.ticker = FixedTicker(ticks=ticks)
+    p.yaxis.major_label_overrides = dict([(tick, str(nodeId)) for tick, nodeId in zip(ticks, nodeIds)])
+    p.xgrid.grid_line_color = None
+    p.ygrid.grid_line_color = None
+    p.xaxis.major_label_text_font_size = '10pt'
+
+    images = []
+    for k, metric in enumerate(metrics):
+        values = overview[metric][::-1]
+        finite = values[np.isfinite(values)]
+        mapper = LinearColorMapper(
+            palette=Viridis256,
+            low=finite.min() if len(finite) else 0,
+            high=finite.max() if len(finite) else 1,
+            nan_color=(0, 0, 0, 0),
+        )
+        images.append(p.image(image=[values.astype(np.float32)], x=overview['t0'], y=0, dw=tEnd - overview['t0'], dh=numNodes, color_mapper=mapper, visible=(k == 0), name=metric))
+
+    nodeFormatter = CustomJSHover(code='''
+        var nodeIds = {};
+        var k = nodeIds.length - 1 - Math.floor(value);
+        return (k >= 0 && k < nodeIds.length) ? String(nodeIds[k]) : '';
+    '''.format(json.dumps([int(nodeId) for nodeId in nodeIds])))
+    hover = HoverTool(
+        renderers=images,
+        tooltips=[
+            ('Node', '$y{custom}'),
+            ('Time (rel)', '$x{0.000} s'),
+            ('Time (abs)', '$x{withOffset:0.000} s'),
+            ('Value', '@image{0.000}'),
+        ],
+        formatters={'$y': nodeFormatter, '$x': absoluteTimeFormatter},
+    )
+    p.add_tools(hover)
+
+    metricButtons = RadioButtonGroup(labels=[overviewMetrics[metric] for metric in metrics], active=0, width_policy='min')
+    metricButtons.js_on_change('active', CustomJS(
+        args={'images': images, 'p': p, 'labels': [overviewMetrics[metric] for metric in metrics]},
+        code='''
+            for (var k=0; k<images.length; k++) {
+                images[k].visible = (k == cb_obj.active);
+            }
+            p.title.text = labels[cb_obj.active];
+        '''
+    ))
+
+    if detailFiles is not None:
+        p.js_on_event(Tap, CustomJS(
+            args={'files': [detailFiles.get(nodeId, '') for nodeId in nodeIds], 'halfWindow': (OVERVIEW_DRILLDOWN_BUCKETS/2.)*overview['dt']},
+            code='''
+                var k = files.length - 1 - Math.floor(cb_obj.y);
+                if (k >= 0 && k < files.length && files[k] != '') {
+                    window.open(files[k] + '#t=' + (cb_obj.x - halfWindow) + ',' + (cb_obj.x + halfWindow));
+                }
+            '''
+        ))
+        hint = 'click on a cell to open the detailed view of the node'
     else:
-        save(finalLayout)
+        hint = 'click on a cell to show the detailed view of the node'
 
+    titleDiv = Div(text='<h2 style="margin:0">FlockLab Test {testNum}</h2>'.format(testNum=testNum), margin=(0, 5, 0, 5), align='center')
+    hintDiv = Div(text='<i>{}</i>'.format(hint), margin=(0, 5, 0, 5), align='center')
+    overviewLayout = column([row([titleDiv, metricButtons, hintDiv]), p], sizing_mode='stretch_width')
+    return overviewLayout, p
 
 
-def visualizeFlocklabTrace(resultPath, outputDir=None, interactive=False, showPps=False, showRst=False, downsamplingFactor=1):
-    '''Plots FlockLab results using bokeh.
+def overviewCell(overview, x, y):
+    '''Node and time window (drill down) of a position in the overview heatmap (see plotOverview()).
+    Returns:
+        Tuple (nodeId, start, end), None if the position is outside of the heatmap
+    '''
+    nodeIds = overview['nodeIds']
+    k = len(nodeIds) - 1 - int(np.floor(y))
+    if k < 0 or k >= len(nodeIds):
+        return None
+    halfWindow = (OVERVIEW_DRILLDOWN_BUCKETS/2.)*overview['dt']
+    return nodeIds[k], x - halfWindow, x + halfWindow
+
+
+def splitGpioData(gpioDf, refTime, showPps=False, showRst=False, tEnd=None):
+    '''Sorts a GPIO trace dataframe and splits it into the arrays of the nodes (single pass), input of prepareGpioNodeData().
     Args:
-        resultPath: path to the flocklab results (unzipped)
-        outputDir:  directory to store the resulting html file in (default: current working directory)
-        interactive: switch to turn on/off automatic display of generated bokeh plot
+        gpioDf:  GPIO trace as pandas dataframe (see readGpioTracing())
+        refTime: reference time (subtracted from all timestamps)
+        showPps: include PPS signal
+        showRst: include nRST signal
+        tEnd:    end of the time window the trace is limited to (absolute time, see gpioWindow())
+    Returns:
+        Tuple (nodeArrays, pinList, tEnd) with nodeArrays: OrderedDict {nodeId: (t, pins, v)} (sorted by pin code and time),
+        pinList: codes of the plotted pins (pins which are never HIGH in the whole trace (all nodes) are omitted), tEnd: global end of the trace (relative time)
+    '''
+    # determine global end of gpio trace (for adding edge back to 0 at the end of trace for signals which end with 1)
+    tEnd = getGpioEndTime(gpioDf, tMax=tEnd) - refTime
+
+    nodes = gpioDf.node_id.to_numpy()
+    pins = gpioPinCodes(gpioDf.pin_name) # raises an exception for unknown pin names
+    t = gpioDf.timestamp.to_numpy() - refTime
+    v = gpioDf.value.to_numpy()
+    order = np.lexsort((t, pins, nodes))
+    nodes, pins, t, v = nodes[order], pins[order], t[order], v[order]
+
+    # pins which are toggled to 1 at least once in the whole GPIO tracing (all nodes)
+    toggledPins = set(np.unique(pins[v == 1]).tolist())
+    pinList = [pinOrdering.index(pin) for pin in pinOrdering if (pin != 'nRST' or showRst) and (pin != 'PPS' or showPps) and pinOrdering.index(pin) in toggledPins]
+
+    starts = np.flatnonzero(np.concatenate(([True], nodes[1:] != nodes[:-1])))
+    ends = np.append(starts[1:], len(nodes))
+    nodeArrays = OrderedDict()
+    for start, end, nodeId in zip(starts.tolist(), ends.tolist(), nodes[starts].tolist()):
+        nodeArrays[nodeId] = (t[start:end], pins[start:end], v[start:end])
+    return nodeArrays, pinList, tEnd
+
+
+def prepareGpioNodeData(t, pins, v, pinList, tEnd, decimationFactor=1):
+    '''Converts the GPIO trace of a single node into the ready-to-plot per-pin series and pulses (see gpioPinSeries()).
+    Signals which end with 1 are closed at tEnd (see getGpioEndTime()).
+    Args:
+        t, pins, v:       timestamps (relative), pin codes and values of the node, sorted by pin code and time (see splitGpioData())
+        pinList:          codes of the plotted pins (in plot order)
+        tEnd:             end of the trace (relative time)
+        decimationFactor: decimation factor (see decimateGpioTrace(), default: no decimation)
+    Returns:
+        OrderedDict {pin: {'t': ..., 'v': ..., 'start': ..., 'end': ...}}
+    '''
+    # row ranges of the pins
+    starts = np.flatnonzero(np.concatenate(([True], pins[1:] != pins[:-1])))
+    ends = np.append(starts[1:], len(pins))
+    pinRanges = dict(zip(pins[starts].tolist(), zip(starts.tolist(), ends.tolist())))
+
+    nodeData = OrderedDict()
+    for pinIdx in pinList:
+        if pinIdx in pinRanges:
+            start, end = pinRanges[pinIdx]
+            tPin = t[start:end]
+            vPin = v[start:end]
+            if vPin[-1] == 1:
+                tPin = np.append(tPin, tEnd)
+                vPin = np.append(vPin, 0)
+            if decimationFactor > 1:
+                tPin, vPin = decimateGpioTrace(tPin, vPin, decimationFactor)
+            nodeData.update({pinOrdering[pinIdx]: gpioPinSeries(tPin, vPin)})
+    return nodeData
+
+
+def prepareGpioData(gpioDf, refTime, showPps=False, showRst=False, decimationFactors={}, tEnd=None):
+    '''Converts a GPIO trace dataframe into the per-node and per-pin traces used for plotting (see splitGpioData() and prepareGpioNodeData()).
+    Args:
+        gpioDf:  GPIO trace as pandas dataframe (see readGpioTracing())
+        refTime: reference time (subtracted from all timestamps)
+        showPps: include PPS signal
+        showRst: include nRST signal
+        decimationFactors: dict mapping node ID to decimation factor (see decimateGpioTrace(), default: no decimation)
+        tEnd:    end of the time window the trace is limited to (absolute time, see gpioWindow())
+    Returns:
+        OrderedDict {nodeId: OrderedDict {pin: {'t': ..., 'v': ..., 'start': ..., 'end': ...}}}
+    '''
+    nodeArrays, pinList, tEndRel = splitGpioData(gpioDf, refTime, showPps=showPps, showRst=showRst, tEnd=tEnd)
+    gpioData = OrderedDict()
+    for nodeId, (t, pins, v) in nodeArrays.items():
+        gpioData.update({nodeId: prepareGpioNodeData(t, pins, v, pinList, tEndRel, decimationFactors.get(nodeId, 1))})
+    return gpioData
+
+
+def splitPowerData(powerDf, refTime):
+    '''Sorts a power profiling dataframe and splits it into the arrays of the nodes (single pass), input of preparePowerNodeData().
+    Args:
+        powerDf: power profiling data as pandas dataframe (see readPowerProfiling())
+        refTime: reference time (subtracted from all timestamps)
+    Returns:
+        OrderedDict {nodeId: (t, i, v)} (sorted by time)
+    '''
+    nodes = powerDf.node_id.to_numpy()
+    t = powerDf.timestamp.to_numpy() - refTime
+    order = np.lexsort((t, nodes))
+    nodes, t = nodes[order], t[order]
+    i = powerDf.current_mA.to_numpy()[order]
+    v = powerDf.voltage_V.to_numpy()[order]
+    starts = np.flatnonzero(np.concatenate(([True], nodes[1:] != nodes[:-1])))
+    ends = np.append(starts[1:], len(nodes))
+    return OrderedDict([(nodeId, (t[start:end], i[start:end], v[start:end])) for start, end, nodeId in zip(starts.tolist(), ends.tolist(), nodes[starts].tolist())])
+
+
+def preparePowerNodeData(t, i, v, downsamplingFactor=1, downsamplingMethod='stride'):
+    '''Downsamples the power profiling data of a single node (see downsampleIdx()).
+    Returns:
+        dict {'t': ..., 'i': ..., 'v': ...}
+    '''
+    idx = downsampleIdx(t, i*v, downsamplingFactor, method=downsamplingMethod)
+    return {
+      't': t[idx],
+      'i': i[idx],
+      'v': v[idx],
+    }
+
+
+def _prepareNodeWorker(args):
+    '''Prepares the GPIO and power profiling data of a single node (executed in worker process).
+    '''
+    gpioArgs, powerArgs = args
+    return (prepareGpioNodeData(*gpioArgs) if gpioArgs is not None else None,
+            preparePowerNodeData(*powerArgs) if powerArgs is not None else None)
+
+
+def prepareSerialData(serialDf, refTime, maxPoints=None, decimationFactors={}):
+    '''Converts a serial log dataframe into the per-node marker series used for plotting.
+    The log is sorted and split into nodes in a single pass. Nodes with many lines are thinned (see thinEvents()), the number of omitted lines is shown in the hover.
+    Args:
+        serialDf:          serial log as pandas dataframe (see readSerial())
+        refTime:           reference time (subtracted from all timestamps)
+        maxPoints:         max number of markers (all nodes, distributed with allocatePointBudget(), default: no limit)
+        decimationFactors: dict mapping node ID to decimation factor (e.g. from a global point budget, default: no decimation)
+    Returns:
+        OrderedDict {nodeId: {'t': ..., 'output': ..., 'direction': ..., 'omitted': ...}}
+    '''
+    nodes = serialDf.node_id.to_numpy()
+    t = serialDf.timestamp.to_numpy() - refTime
+    order = np.lexsort((t, nodes))
+    nodes, t = nodes[order], t[order]
+    output = serialDf.output.to_numpy()[order]
+    direction = serialDf.direction.to_numpy()[order]
+
+    starts = np.flatnonzero(np.concatenate(([True], nodes[1:] != nodes[:-1])))
+    ends = np.append(starts[1:], len(nodes))
+    counts = OrderedDict(zip(nodes[starts].tolist(), (ends - starts).tolist()))
+    budgetFactors = allocatePointBudget(counts, maxPoints) if maxPoints is not None else {}
+
+    serialData = OrderedDict()
+    for start, end, nodeId in zip(starts.tolist(), ends.tolist(), nodes[starts].tolist()):
+        factor = max(budgetFactors.get(nodeId, 1), decimationFactors.get(nodeId, 1))
+        idx, omitted = thinEvents(t[start:end], int(np.ceil((end - start) / factor)))
+        serialData.update({nodeId: {
+            't': t[start:end][idx],
+            'output': output[start:end][idx],
+            'direction': direction[start:end][idx],
+            'omitted': omitted,
+        }})
+    return serialData
+
+
+def createAbsoluteTimeFormatter(refTime):
+    '''Custom hover tooltip formatter for adding absolute time to hover info without adding another series of data (to prevent data duplication).
+    Args:
+        refTime: reference time (absolute time of relative time 0)
+    Returns:
+        CustomJSHover object
+    '''
+    return CustomJSHover(
+        args=dict(offsetSource=ColumnDataSource(dict(offset=[refTime]))),
+        code="""
+            var numFormatter = Bokeh.require('@bokehjs/core/util/templating').DEFAULT_FORMATTERS.numeral;
+            var formatSplit = format.split(':');
+            if (formatSplit.length == 2 && formatSplit[0] == 'withOffset') {
+                return numFormatter(special_vars.data_x + offsetSource.data.offset[0], formatSplit[1], special_vars);
+            } else {
+                return numFormatter(special_vars.data_x, format, special_vars)
+            }
+    """)
+
+
+def checkResultPath(resultPath):
+    '''Checks and normalizes the path to a FlockLab result directory.
+    Args:
+        resultPath: path to the flocklab results (unzipped) or to a file in the result directory
+    Returns:
+        Tuple (normalized result path, test number)
     '''
     # check if resultPath is not empty
-    if resultPath.strip() == '' or resultPath is None:
+    if resultPath is None or resultPath.strip() == '':
         raise Exception('ERROR: No FlockLab result directory provided as argument!')
 
     # check for correct path
@@ -877,209 +1763,417 @@ def visualizeFlocklabTrace(resultPath, outputDir=None, interactive=False, showPp
 
     resultPath = os.path.normpath(resultPath) # remove trailing slash if there is one
     testNum = os.path.basename(os.path.abspath(resultPath))
+    return resultPath, testNum
 
-    ## try to read gpio tracing data
-    gpioPath = os.path.join(resultPath, 'gpiotracing.csv')
-    requiredGpioCols = ['timestamp', 'node_id', 'pin_name', 'value']
-    gpioAvailable = False
-
-    if os.path.isfile(gpioPath):
-        # Read gpio data csv to pandas dataframe (instruct pandas with float_precision to not sacrifice accuracy for the sake of speed)
-        gpioDf = pd.read_csv(gpioPath, float_precision='round_trip')
-        # sanity check: column names
-        for col in requiredGpioCols:
-            if not col in gpioDf.columns:
-                raise Exception('ERROR: Required column ({}) in gpiotracing.csv file is missing.'.format(col))
-
-        if len(gpioDf) > 0:
-            # sanity check node_id data type
-            if not 'int' in str(gpioDf.node_id.dtype):
-                raise Exception('ERROR: GPIO trace file (gpiotracing.csv) has wrong format!')
-
-            gpioAvailable = True
-
-    ## try to read power profiling data
-    powerPath = os.path.join(resultPath, 'powerprofiling.csv')
-    powerRldFiles = glob.glob(os.path.join(resultPath, './powerprofiling*.rld'))
-    requiredPowerCols = ['timestamp', 'node_id', 'current_mA', 'voltage_V']
-    powerAvailable = False
-
-    if os.path.isfile(powerPath):
-        # Read power data csv to pandas dataframe (instruct pandas with float_precision to not sacrifice accuracy for the sake of speed)
-        powerDf = pd.read_csv(powerPath, float_precision='round_trip')
-        # sanity check: column names
-        for col in requiredPowerCols:
-            if not col in powerDf.columns:
-                raise Exception('ERROR: Required column ({}) in powerprofiling.csv file is missing.'.format(col))
-
-        if len(powerDf) > 0:
-            # sanity check node_id data type
-            if not 'int' in str(powerDf.node_id.dtype):
-                raise Exception('ERROR: GPIO trace file (gpiotracing.csv) has wrong format!')
-
-            powerAvailable = True
-    elif powerRldFiles:
-        powerDfList = []
-        for powerRldFile in powerRldFiles:
-            sp = os.path.basename(powerRldFile).split('.')
-            obsId = int(sp[1])
-            nodeId = int(sp[2])
-            tempDf = pd.DataFrame()
-            rld = RocketLoggerData(powerRldFile)
-            rld.merge_channels()
-            ts = rld.get_time(time_reference='network')
-            tempDf['timestamp'] = ts.astype('uint64') / 1e9   # convert to s
-            tempDf['observer_id'] = obsId
-            tempDf['node_id'] = nodeId
-            tempDf['current_mA'] = rld.get_data('I1') * 1e3 # convert to mA
-            tempDf['voltage_V'] = rld.get_data('V2') - rld.get_data('V1') # voltage difference
-            powerDfList.append(tempDf)
-
-        powerDf = pd.concat(powerDfList)
-        if len(powerDf) > 0:
-            powerAvailable = True
 
-    ## try to read datatrace data
-    datatracePath = os.path.join(resultPath, 'datatrace.csv')
-    requiredDatatraceCols = ['timestamp', 'node_id', 'variable', 'value']
-    datatraceAvailable = False
-
-    if os.path.isfile(datatracePath):
-        # Read datatrace data csv to pandas dataframe (instruct pandas with float_precision to not sacrifice accuracy for the sake of speed)
-        datatraceDf = pd.read_csv(datatracePath, float_precision='round_trip')
-        # sanity check: column names
-        for col in requiredDatatraceCols:
-            if not col in datatraceDf.columns:
-                raise Exception('ERROR: Required column ({}) in datatrace.csv file is missing.'.format(col))
+def readVisualizationTraces(resultPath, loadPower=True, tStart=None, tEnd=None, nodes=None, serialRegex=None):
+    '''Reads the trace files of a FlockLab result which are plotted by the visualization (see prepareVisualizationData() for the arguments).
+    Returns:
+        OrderedDict with one pandas dataframe per source (gpio, power, datatrace, serial), None if no data is available
+    '''
+    ## try to read gpio tracing data (incl. the signal states at the start of the time window)
+    gpioDf = readGpioTracing(resultPath, tStart=tStart, tEnd=tEnd, nodes=nodes, includeState=True)
 
-        if len(datatraceDf) > 0:
-            # sanity check node_id data type
-            if not 'int' in str(datatraceDf.node_id.dtype):
-                raise Exception('ERROR: GPIO trace file (gpiotracing.csv) has wrong format!')
+    ## try to read power profiling data (powerprofiling.csv or powerprofiling*.rld)
+    powerDf = readPowerProfiling(resultPath, tStart=tStart, tEnd=tEnd, nodes=nodes) if loadPower else None
 
-            datatraceAvailable = True
+    ## try to read datatrace data
+    datatraceDf = readDatatrace(resultPath, tStart=tStart, tEnd=tEnd, nodes=nodes)
+
+    ## try to read serial log (filtered while loading)
+    serialDf = readSerial(resultPath, tStart=tStart, tEnd=tEnd, nodes=nodes, regex=serialRegex)
+
+    return OrderedDict([('gpio', gpioDf), ('power', powerDf), ('datatrace', datatraceDf), ('serial', serialDf)])
+
+
+def prepareVisualizationData(resultPath, showPps=False, showRst=False, downsamplingFactor=1, downsamplingMethod='stride', maxPoints=None, loadPower=True, refTime=None, tStart=None, tEnd=None, nodes=None,
+                             serialRegex=None, serialMaxPoints=SERIAL_MAX_POINTS, processes=None, cache=False, overview=False, powerPyramids=None):
+    '''Reads the FlockLab results and prepares the GPIO, power, datatrace and serial data for plotting (see visualizeFlocklabTrace() for the arguments).
+    Args (additional):
+        loadPower: read power profiling data (disable if the power data is provided otherwise, e.g. by a pyramid store)
+        refTime:   candidate for the reference time (e.g. start of power data from a pyramid store), the earliest timestamp of all data is used
+        tStart:    start of time window (absolute time in s, default: start of test)
+        tEnd:      end of time window (absolute time in s, default: end of test)
+        nodes:     list of node IDs (default: all nodes)
+        processes: number of worker processes for the per-node preparation of GPIO and power data (conversion to plot series, decimation and downsampling,
+                   default: number of CPUs, 1: no process pool)
+        cache:     cache the loaded traces and the prepared data in the result directory (see VisualizationCache): the prepared data is reused if all arguments are the same,
+                   the loaded traces are reused if the time window, the node selection and the serial filter are the same (i.e. the trace files are not parsed again)
+        overview:  additionally aggregate the full resolution traces for the overview heatmap (see aggregateOverview())
+        powerPyramids: power pyramids per node used for the power metric of the overview instead of the power profiling data (e.g. with loadPower=False, see aggregateOverview())
+    Returns:
+        Tuple (gpioData, powerData, datatraceData, serialData, refTime) where refTime is the absolute time of relative time 0,
+        with overview: tuple (gpioData, powerData, datatraceData, serialData, refTime, overviewData)
+    '''
+    if not downsamplingMethod in downsamplingMethods:
+        raise FlocklabError('ERROR: Unknown downsampling method "{}" (valid methods: {})!'.format(downsamplingMethod, ', '.join(downsamplingMethods)))
+
+    # parameters of the cached data (see VisualizationCache)
+    traceParams = OrderedDict([('loadPower', loadPower), ('tStart', tStart), ('tEnd', tEnd), ('nodes', sorted(nodes) if nodes is not None else None), ('serialRegex', serialRegex)])
+    prepParams = OrderedDict(list(traceParams.items()) + [
+        ('showPps', showPps), ('showRst', showRst), ('downsamplingFactor', downsamplingFactor), ('downsamplingMethod', downsamplingMethod),
+        ('maxPoints', maxPoints), ('refTime', refTime), ('serialMaxPoints', serialMaxPoints), ('overview', overview), ('overviewPyramids', powerPyramids is not None),
+    ])
+    cacheStore = VisualizationCache(resultPath) if cache else None
+    if cacheStore is not None:
+        prepared = cacheStore.load('prepared', prepParams)
+        if prepared is not None:
+            if overview:
+                overviewData = dict(prepared['overview'])
+                overviewData['nodeIds'] = [int(e) for e in overviewData['nodeIds']]
+                return prepared['gpio'], prepared['power'], prepared['datatrace'], prepared['serial'], prepared['refTime'], overviewData
+            return prepared['gpio'], prepared['power'], prepared['datatrace'], prepared['serial'], prepared['refTime']
+
+    traces = cacheStore.load('traces', traceParams) if cacheStore is not None else None
+    if traces is None:
+        traces = readVisualizationTraces(resultPath, loadPower=loadPower, tStart=tStart, tEnd=tEnd, nodes=nodes, serialRegex=serialRegex)
+        if cacheStore is not None:
+            cacheStore.save('traces', traceParams, traces)
+    gpioDf, powerDf, datatraceDf, serialDf = traces['gpio'], traces['power'], traces['datatrace'], traces['serial']
+    del traces
+    gpioAvailable = gpioDf is not None and len(gpioDf) > 0
+    powerAvailable = powerDf is not None and len(powerDf) > 0
+    datatraceAvailable = datatraceDf is not None and len(datatraceDf) > 0
+    serialAvailable = serialDf is not None and len(serialDf) > 0
 
     # handle case where there is no data to plot
-    if (not gpioAvailable) and (not powerAvailable) and (not datatraceAvailable):
+    if (not gpioAvailable) and (not powerAvailable) and (not datatraceAvailable) and (not serialAvailable) and (loadPower or refTime is None):
         print('ERROR: No data for plotting available!')
         sys.exit(1)
 
     # determine first timestamp globally (used as reference for relative time)
-    refTime = np.inf
+    refTime = np.inf if refTime is None else refTime
     if gpioAvailable:
         refTime = min( refTime, np.min(gpioDf.timestamp) )
     if powerAvailable:
         refTime = min( refTime, np.min(powerDf.timestamp) )
     if datatraceAvailable:
         refTime = min( refTime, np.min(datatraceDf.timestamp) )
-
-    # generate custom hover tooltip formatter for adding absolute time to hover info without adding another series of data (to prevent data duplication)
-    absoluteTimeFormatter = CustomJSHover(
-        args=dict(offsetSource=ColumnDataSource(dict(offset=[refTime]))),
-        code="""
-            var numFormatter = Bokeh.require('@bokehjs/core/util/templating').DEFAULT_FORMATTERS.numeral;
-            var formatSplit = format.split(':');
-            if (formatSplit.length == 2 && formatSplit[0] == 'withOffset') {
-                return numFormatter(special_vars.data_x + offsetSource.data.offset[0], formatSplit[1], special_vars);
-            } else {
-                return numFormatter(special_vars.data_x, format, special_vars)
-            }
-    """)
-
-    ## prepare gpio data
-    gpioData = OrderedDict()
-    pinOrdering = ['INT1', 'INT2', 'LED1', 'LED2', 'LED3', 'SIG1', 'SIG2', 'PPS', 'nRST']
+    if serialAvailable and refTime == np.inf:
+        # the serial log is only used as reference if there is no other data (reference consistent with getResultStartTime())
+        refTime = np.min(serialDf.timestamp)
+
+    # overview of the full resolution data (before decimation and downsampling)
+    overviewData = aggregateOverview(gpioDf, powerDf, datatraceDf, refTime, showPps=showPps, showRst=showRst, powerPyramids=powerPyramids) if overview else None
+
+    # determine downsampling factors per source and node based on the number of samples to stay within the point budget
+    budgetFactors = {}
+    if maxPoints is not None:
+        counts = OrderedDict()
+        if gpioAvailable:
+            gpioPins = [pin for pin in pinOrdering if (pin != 'nRST' or showRst) and (pin != 'PPS' or showPps)]
+            for nodeId, count in gpioDf[gpioDf.pin_name.isin(gpioPins)].node_id.value_counts().items():
+                counts[('gpio', nodeId)] = count
+        if powerAvailable:
+            for nodeId, count in powerDf.node_id.value_counts().items():
+                counts[('power', nodeId)] = int(np.ceil(count / downsamplingFactor))
+        if datatraceAvailable:
+            for nodeId, count in datatraceDf.node_id.value_counts().items():
+                counts[('datatrace', nodeId)] = count
+        if serialAvailable:
+            for nodeId, count in serialDf.node_id.value_counts().items():
+                counts[('serial', nodeId)] = count
+        budgetFactors = allocatePointBudget(counts, maxPoints)
+
+    ## prepare gpio and power data per node (trace conversion, decimation and downsampling of the nodes in parallel)
+    gpioArgs = OrderedDict()
     if gpioAvailable:
-        gpioDf['timestampRelative'] = gpioDf.timestamp - refTime
-        gpioDf.sort_values(by=['node_id', 'pin_name', 'timestamp'], inplace=True)
-        # determine global end of gpio trace (for adding edge back to 0 at the end of trace for signals which end with 1)
-        tEnd = gpioDf[(gpioDf.pin_name=='nRST') & (gpioDf.value==0)].timestampRelative.to_numpy()[-1]
-
-        # Generate gpioData dict from pandas dataframe
-        for nodeId, nodeGrp in gpioDf.groupby('node_id'):
-            pinList = copy(pinOrdering)
-            nodeData = OrderedDict()
-            pinGrps = nodeGrp.groupby('pin_name')
-            if not set(pinGrps.groups.keys()).issubset(set(pinOrdering)):
-                raise FlocklabError('ERROR: GPIO tracing file contains unknown pin names!')
-            if not showRst:
-                pinList.remove('nRST')
-            if not showPps:
-                pinList.remove('PPS')
-            for pin in pinList:
-                if pin in pinGrps.groups.keys():
-                    pinGrp = pinGrps.get_group(pin)
-                    # check if pin is ever toggled to 1 in the whole GPIO tracing (all nodes)
-                    if (gpioDf[(gpioDf.pin_name==pin)].value==1).any():
-                        t = pinGrp.timestampRelative.to_numpy()
-                        v = pinGrp.value.to_numpy()
-                        if len(v):
-                            if v[-1] == 1:
-                                t = np.append(t, tEnd)
-                                v = np.append(v, 0)
-                        trace = {'t': t, 'v': v}
-                        nodeData.update({pin: trace})
-            gpioData.update({nodeId: nodeData})
-
-
-    ## prepare power data
-    powerData = OrderedDict()
+        gpioNodeArrays, gpioPinList, gpioEnd = splitGpioData(gpioDf, refTime, showPps=showPps, showRst=showRst, tEnd=tEnd)
+        for nodeId, (t, pins, v) in gpioNodeArrays.items():
+            gpioArgs[nodeId] = (t, pins, v, gpioPinList, gpioEnd, budgetFactors.get(('gpio', nodeId), 1))
+        del gpioNodeArrays
+    powerArgs = OrderedDict()
     if powerAvailable:
-        powerDf['timestampRelative'] = powerDf.timestamp - refTime
-        powerDf.sort_values(by=['node_id', 'timestamp'], inplace=True)
-
-        # Get overview of available data
-        powerNodeList = sorted(list(set(powerDf.node_id)))
-        # print('powerNodeList:', powerNodeList)
-
-        # Generate powerData dict from pandas dataframe
-        for nodeId, nodeGrp in powerDf.groupby('node_id'):
-            # print(nodeId)
-            trace = {
-              't': nodeGrp['timestampRelative'].to_numpy()[::downsamplingFactor],
-              'i': nodeGrp['current_mA'].to_numpy()[::downsamplingFactor],
-              'v': nodeGrp['voltage_V'].to_numpy()[::downsamplingFactor],
-            }
-            powerData.update({nodeId: trace})
+        for nodeId, (t, i, v) in splitPowerData(powerDf, refTime).items():
+            powerArgs[nodeId] = (t, i, v, downsamplingFactor*budgetFactors.get(('power', nodeId), 1), downsamplingMethod)
+        del powerDf
+    prepNodeIds = sorted(set(gpioArgs.keys()) | set(powerArgs.keys()))
+    workerArgs = [(gpioArgs.get(nodeId), powerArgs.get(nodeId)) for nodeId in prepNodeIds]
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes == 1 or len(workerArgs) <= 1:
+        results = [_prepareNodeWorker(e) for e in workerArgs]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = list(executor.map(_prepareNodeWorker, workerArgs))
+    gpioData = OrderedDict([(nodeId, gpioNodeData) for nodeId, (gpioNodeData, _) in zip(prepNodeIds, results) if gpioNodeData is not None])
+    powerData = OrderedDict([(nodeId, powerTrace) for nodeId, (_, powerTrace) in zip(prepNodeIds, results) if powerTrace is not None])
 
-    ## prepare datatrace data
+    ## prepare datatrace data (variable names are resolved once, all nodes and variables are split with a single sort)
     datatraceData = OrderedDict()
     if datatraceAvailable:
-        datatraceDf['timestampRelative'] = datatraceDf.timestamp - refTime
-        datatraceDf.sort_values(by=['node_id', 'variable', 'timestamp'], inplace=True)
-
-        # Generate datatraceData dict from pandas dataframe
-        for nodeId, nodeGrp in datatraceDf.groupby('node_id'):
-            nodeData = OrderedDict()
-            for variableName, variableGrp in nodeGrp.groupby('variable'):
-                trace = {
-                  't': variableGrp['timestampRelative'].to_numpy(),
-                  'value': variableGrp['value'].to_numpy(),
-                  'access': variableGrp['access'].to_numpy(),
-                  'delay_marker': variableGrp['delay_marker'].to_numpy(),
-                }
-                addrToVarMap = fl.getDtAddrToVarMap(testConfigFile=resultPath)
-                variableNameMapped = addrToVarMap[variableName] if variableName in addrToVarMap else variableName
-                nodeData.update({variableNameMapped: trace})
+        addrToVarMap = fl.getDtAddrToVarMap(testConfigFile=resultPath)
+        for nodeId, nodeData in splitDatatrace(datatraceDf, refTime, addrToVarMap).items():
+            factor = budgetFactors.get(('datatrace', nodeId), 1)
+            if factor > 1:
+                for variable, trace in nodeData.items():
+                    idx = downsampleIdx(trace['t'], trace['value'], factor, method=downsamplingMethod)
+                    nodeData[variable] = OrderedDict([(col, val[idx]) for col, val in trace.items()])
             datatraceData.update({nodeId: nodeData})
 
+    ## prepare serial data
+    serialData = OrderedDict()
+    if serialAvailable:
+        serialFactors = {nodeId: factor for (source, nodeId), factor in budgetFactors.items() if source == 'serial'}
+        serialData = prepareSerialData(serialDf, refTime, maxPoints=serialMaxPoints, decimationFactors=serialFactors)
+
+    if cacheStore is not None:
+        prepared = OrderedDict([('gpio', gpioData), ('power', powerData), ('datatrace', datatraceData), ('serial', serialData), ('refTime', refTime)])
+        if overview:
+            prepared['overview'] = overviewData
+        cacheStore.save('prepared', prepParams, prepared)
+
+    if overview:
+        return gpioData, powerData, datatraceData, serialData, refTime, overviewData
+    return gpioData, powerData, datatraceData, serialData, refTime
+
+
+def absoluteTime(timeSpec, refTime):
+    '''Converts a time specification into absolute time.
+    Args:
+        timeSpec: number (or numeric string) in s, relative to refTime if smaller than 1e9, UNIX timestamp otherwise, or date/time string (e.g. '2021-11-30 12:00:05.5', UTC if no timezone is specified)
+        refTime:  reference time for relative times (absolute time in s)
+    Returns:
+        absolute time in s (None if timeSpec is None)
+    '''
+    if timeSpec is None:
+        return None
+    try:
+        value = float(timeSpec)
+    except ValueError:
+        try:
+            ts = pd.Timestamp(timeSpec)
+        except ValueError:
+            raise FlocklabError('ERROR: Invalid time "{}"!'.format(timeSpec))
+        if ts.tzinfo is None:
+            ts = ts.tz_localize('UTC')
+        return ts.value / 1e9
+    if value < 1e9:
+        if refTime is None:
+            raise FlocklabError('ERROR: Relative time "{}" cannot be resolved (no data available)!'.format(timeSpec))
+        return refTime + value
+    return value
+
+
+def visualizeFlocklabTrace(resultPath, outputDir=None, interactive=False, showPps=False, showRst=False, downsamplingFactor=1, downsamplingMethod='stride', maxPoints=None, compact=False, sidecar=False, webgl=False, start=None, end=None, nodes=None, overview=False,
+                           serialRegex=None, serialMaxPoints=SERIAL_MAX_POINTS, processes=None, cache=False):
+    '''Plots FlockLab results using bokeh.
+    Args:
+        resultPath: path to the flocklab results (unzipped)
+        outputDir:  directory to store the resulting html file in (default: current working directory)
+        interactive: switch to turn on/off automatic display of generated bokeh plot
+        downsamplingFactor: downsampling factor for power profiling data
+        downsamplingMethod: downsampling method for power profiling data ('stride', 'minmax' or 'lttb', see downsampleIdx())
+        maxPoints: if provided, power profiling, GPIO and datatrace data is downsampled per node such that the total number of plotted samples (power samples, GPIO edges, datatrace samples) does not exceed maxPoints (see allocatePointBudget())
+        compact: compact data representation in the html file (float32 current/voltage, power and GPIO baselines computed in the browser, integer coded datatrace values)
+        sidecar: write plot data to a compressed sidecar file (flocklab_plot_<testid>.data.js, see writeDataSidecar()) instead of embedding it into the html file
+        webgl: render plots with WebGL (GPIO pulses as rectangles, datatrace steps as lines since VArea and Step are not supported by WebGL)
+        start: start of time window (see absoluteTime(), relative times refer to the start of the test), only data within the window is read from the result files
+        end: end of time window (see absoluteTime())
+        nodes: list of node IDs to plot (default: all nodes), data of other nodes is not read from the result files
+        overview: plot an overview heatmap of all nodes (power, GPIO activity and datatrace event rate over time, see plotOverview()) instead of the stacked plots of all nodes.
+                  The detailed view of each node is written to a separate html file (flocklab_plot_<testid>_<nodeid>.html) which is opened by clicking on the overview.
+        serialRegex: regular expression, only serial log lines with matching output are plotted (filtered while loading, default: all lines)
+        serialMaxPoints: max number of plotted serial log lines (all nodes), the serial log is thinned accordingly (see thinEvents(), None: no limit)
+        processes: number of worker processes for the data preparation (see prepareVisualizationData()), the bokeh plots are created in the main process
+        cache: cache the loaded traces and the prepared data in the result directory (see prepareVisualizationData()), e.g. for changing display options (compact, sidecar, webgl, overview)
+               without parsing the trace files again
+    '''
+    resultPath, testNum = checkResultPath(resultPath)
+
+    # the time axis of a windowed plot is relative to the start of the whole test (same as the plot without window)
+    refTime, tStart, tEnd = None, None, None
+    if start is not None or end is not None or nodes is not None:
+        refTime = getResultStartTime(resultPath)
+        tStart = absoluteTime(start, refTime)
+        tEnd = absoluteTime(end, refTime)
+        if tStart is not None and tEnd is not None and tStart > tEnd:
+            raise FlocklabError('ERROR: Start of time window is after its end!')
+
+    prepared = prepareVisualizationData(
+        resultPath,
+        showPps=showPps,
+        showRst=showRst,
+        downsamplingFactor=downsamplingFactor,
+        downsamplingMethod=downsamplingMethod,
+        maxPoints=maxPoints,
+        refTime=refTime,
+        tStart=tStart,
+        tEnd=tEnd,
+        nodes=nodes,
+        serialRegex=serialRegex,
+        serialMaxPoints=serialMaxPoints,
+        processes=processes,
+        cache=cache,
+        overview=overview,
+    )
+    gpioData, powerData, datatraceData, serialData, refTime = prepared[:5]
+    absoluteTimeFormatter = createAbsoluteTimeFormatter(refTime)
+
     # set output file path
     if outputDir is None:
-        output_file(os.path.join(os.getcwd(), "flocklab_plot_{}.html".format(testNum)), title="{}".format(testNum))
-    else:
-        output_file(os.path.join(outputDir, "flocklab_plot_{}.html".format(testNum)), title="{}".format(testNum))
+        outputDir = os.getcwd()
+    plotFile = os.path.join(outputDir, "flocklab_plot_{}.html".format(testNum))
+
+    if overview:
+        # detailed view per node (separate html files which are opened from the overview)
+        detailFiles = OrderedDict()
+        for nodeId in sorted(set(gpioData.keys()) | set(powerData.keys()) | set(datatraceData.keys()) | set(serialData.keys())):
+            detailFile = os.path.join(outputDir, "flocklab_plot_{}_{}.html".format(testNum, nodeId))
+            output_file(detailFile, title="{} (node {})".format(testNum, nodeId))
+            plotAll(
+                gpioData=OrderedDict([(nodeId, gpioData[nodeId])]) if nodeId in gpioData else OrderedDict(),
+                powerData=OrderedDict([(nodeId, powerData[nodeId])]) if nodeId in powerData else OrderedDict(),
+                datatraceData=OrderedDict([(nodeId, datatraceData[nodeId])]) if nodeId in datatraceData else OrderedDict(),
+                serialData=OrderedDict([(nodeId, serialData[nodeId])]) if nodeId in serialData else OrderedDict(),
+                testNum=testNum,
+                absoluteTimeFormatter=createAbsoluteTimeFormatter(refTime),
+                compact=compact,
+                sidecar=sidecar,
+                webgl=webgl,
+                zoomFromUrl=True,
+            )
+            detailFiles[nodeId] = os.path.basename(detailFile)
+        overviewLayout, _ = plotOverview(prepared[5], testNum, absoluteTimeFormatter, detailFiles=detailFiles, webgl=webgl)
+        output_file(plotFile, title="{}".format(testNum))
+        if interactive:
+            show(overviewLayout)
+        else:
+            save(overviewLayout)
+        return
+
+    output_file(plotFile, title="{}".format(testNum))
 
     # generate plots
     plotAll(
         gpioData=gpioData,
         powerData=powerData,
         datatraceData=datatraceData,
+        serialData=serialData,
         testNum=testNum,
         absoluteTimeFormatter=absoluteTimeFormatter,
         interactive=interactive,
+        compact=compact,
+        sidecar=sidecar,
+        webgl=webgl,
     )
 
 
+def _pyramidPowerTrace(pyramid, t0, t1, maxPoints):
+    '''Power trace of a time window from a PowerPyramid in the format used by plotObserverPower().
+    '''
+    _, window = pyramid.window(t0, t1, maxPoints=maxPoints)
+    return {'t': window['t'], 'i': window['current_mA'], 'v': window['voltage_V'], 'p': window['power_mW']}
+
+
+def serveFlocklabTrace(resultPath, port=5006, showPps=False, showRst=False, pointsPerPlot=4000, openBrowser=True, usePyramidStore=False, webgl=False, overview=False,
+                       serialRegex=None, serialMaxPoints=SERIAL_MAX_POINTS, processes=None, cache=False):
+    '''Plots FlockLab results using a bokeh server (instead of a static html file).
+    The full resolution power profiling data is kept in the python process (multi-resolution pyramid per node, see PowerPyramid). Whenever the visible time window changes,
+    the power plots only receive the data of the visible window, downsampled (min/max) to pointsPerPlot points. GPIO and datatrace data is transferred completely.
+    Args:
+        resultPath:      path to the flocklab results (unzipped)
+        port:            port of the bokeh server
+        showPps:         include PPS signal
+        showRst:         include nRST signal
+        pointsPerPlot:   max number of points per power plot
+        openBrowser:     open the visualization in the browser
+        usePyramidStore: use the (memory mapped) pyramid store next to the result directory instead of reading the power profiling data (store is built if it does not exist or is outdated, see buildPyramidStore())
+        webgl:           render plots with WebGL (see visualizeFlocklabTrace())
+        overview:        show an overview heatmap of all nodes (see plotOverview()), clicking on a cell shows the detailed view of the node below the overview
+        serialRegex:     regular expression for filtering the serial log (see visualizeFlocklabTrace())
+        serialMaxPoints: max number of plotted serial log lines (see visualizeFlocklabTrace())
+        processes:       number of worker processes for the data preparation (see prepareVisualizationData())
+        cache:           cache the loaded traces and the prepared data in the result directory (see prepareVisualizationData())
+    '''
+    from bokeh.server.server import Server
+
+    resultPath, testNum = checkResultPath(resultPath)
+    if usePyramidStore:
+        store = loadPyramidStore(resultPath)
+        # power metric of the overview from the pyramid store (absolute time)
+        storePyramids = OrderedDict([(nodeId, store.powerPyramid(nodeId)) for nodeId in store.powerNodes()]) if overview else None
+        prepared = prepareVisualizationData(resultPath, showPps=showPps, showRst=showRst, loadPower=False, refTime=store.powerStart(), serialRegex=serialRegex, serialMaxPoints=serialMaxPoints, processes=processes,
+                                            cache=cache, overview=overview, powerPyramids=storePyramids)
+        pyramids = OrderedDict([(nodeId, store.powerPyramid(nodeId, timeOffset=prepared[4])) for nodeId in store.powerNodes()])
+    else:
+        prepared = prepareVisualizationData(resultPath, showPps=showPps, showRst=showRst, serialRegex=serialRegex, serialMaxPoints=serialMaxPoints, processes=processes, cache=cache, overview=overview)
+        pyramids = OrderedDict([(nodeId, PowerPyramid(nodeData['t'], nodeData['i'], nodeData['v'])) for nodeId, nodeData in prepared[1].items()])
+    gpioData, powerData, datatraceData, serialData, refTime = prepared[:5]
+    overviewData = prepared[5] if overview else None
+    del powerData, prepared
+
+    def createLayout(doc, nodeIds=None):
+        # stacked plots (of the selected nodes) with power data of the visible time window
+        selectedPyramids = OrderedDict([(nodeId, pyramid) for nodeId, pyramid in pyramids.items() if nodeIds is None or nodeId in nodeIds])
+        finalLayout = plotAll(
+            gpioData=OrderedDict([(nodeId, nodeData) for nodeId, nodeData in gpioData.items() if nodeIds is None or nodeId in nodeIds]),
+            powerData=OrderedDict([(nodeId, _pyramidPowerTrace(pyramid, None, None, pointsPerPlot)) for nodeId, pyramid in selectedPyramids.items()]),
+            datatraceData=OrderedDict([(nodeId, nodeData) for nodeId, nodeData in datatraceData.items() if nodeIds is None or nodeId in nodeIds]),
+            serialData=OrderedDict([(nodeId, nodeData) for nodeId, nodeData in serialData.items() if nodeIds is None or nodeId in nodeIds]),
+            testNum=testNum,
+            absoluteTimeFormatter=createAbsoluteTimeFormatter(refTime),
+            render=False,
+            webgl=webgl,
+        )
+        powerSources = OrderedDict([
+            (nodeId, finalLayout.select_one(dict(type=GlyphRenderer, name='P (Node {})'.format(nodeId))).data_source)
+            for nodeId in selectedPyramids.keys()
+        ])
+        # x ranges of all plots are linked
+        xRange = list(finalLayout.select(dict(type=Plot)))[0].x_range
+        updatePending = [False]
+
+        def updatePowerData():
+            updatePending[0] = False
+            if xRange.start is None or xRange.end is None:
+                return
+            for nodeId, pyramid in selectedPyramids.items():
+                powerSources[nodeId].data = _pyramidPowerTrace(pyramid, xRange.start, xRange.end, pointsPerPlot)
+
+        def xRangeChanged(attr, old, new):
+            # multiple range changes within one tick (start and end) result in a single update
+            if not updatePending[0]:
+                updatePending[0] = True
+                doc.add_next_tick_callback(updatePowerData)
+
+        xRange.on_change('start', xRangeChanged)
+        xRange.on_change('end', xRangeChanged)
+        return finalLayout, xRange
+
+    def createDocument(doc):
+        doc.title = '{}'.format(testNum)
+        if not overview:
+            finalLayout, _ = createLayout(doc)
+            doc.add_root(finalLayout)
+            return
+        overviewLayout, overviewPlot = plotOverview(overviewData, testNum, createAbsoluteTimeFormatter(refTime), webgl=webgl)
+        detailCol = column([], sizing_mode='stretch_width')
+
+        def showDetail(event):
+            cell = overviewCell(overviewData, event.x, event.y)
+            if cell is None:
+                return
+            nodeId, start, end = cell
+            detailLayout, xRange = createLayout(doc, nodeIds=[nodeId])
+            xRange.start = start
+            xRange.end = end
+            detailCol.children = [detailLayout]
+
+        overviewPlot.on_event(Tap, showDetail)
+        doc.add_root(column([overviewLayout, detailCol], sizing_mode='stretch_width'))
+
+    server = Server({'/': createDocument}, port=port, num_procs=1)
+    server.start()
+    print('Serving visualization of test {} on http://localhost:{}/ (press Ctrl+C to stop)'.format(testNum, port))
+    if openBrowser:
+        server.io_loop.add_callback(server.show, '/')
+    try:
+        server.io_loop.start()
+    except KeyboardInterrupt:
+        pass
+
+
 ###############################################################################
 
 if __name__ == "__main__":